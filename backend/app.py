@@ -1,26 +1,71 @@
 import os
+import json
+import time
+
+_import_started = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
-from backend.model.predict import get_prediction
-from backend.model.ensemble import ensemble_predict
-from backend.model.shap_explainer import explain_ensemble_prediction
-from backend.model.counterfactual import generate_counterfactuals
-from backend.model.advisor import generate_advisory
-from backend.utils.config import STATES, CROPS, SEASONS
+from backend.model.predict import get_prediction, get_batch_predictions
+from backend.model.ensemble import ensemble_predict, ensemble_predict_batch
+from backend.model.risk_table import predict_risk
+from backend.model.advisor import LANGUAGES
+from backend.preprocessing.feature_engineering import build_feature_context
+from backend.utils.config import STATES, CROPS, SEASONS, USE_RISK_TABLE
 from backend.utils.helpers import setup_logger, log_step
 from backend.utils.historical_trends import get_historical_data
-from backend.utils.pdf_export import generate_pdf_report
+from backend.utils.startup import start_prewarm_thread, startup_report
+from backend.utils.memory import memory_report
+
+# SHAP (shap), counterfactuals and PDF export (reportlab) are imported inside
+# the endpoints that use them, to keep worker boot fast
 
 app = Flask(__name__)
 CORS(app)
 
 logger = setup_logger(__name__)
 
+APP_IMPORT_SECONDS = time.perf_counter() - _import_started
+start_prewarm_thread()
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
     return jsonify({'status': 'healthy', 'service': 'Crop Failure Early Warning System'})
 
+@app.route('/api/diagnostics/startup', methods=['GET'])
+def startup_diagnostics():
+    """
+    Worker startup diagnostics: app import time, which lazy subsystems are
+    loaded, and pre-warm progress. With ?profile=1, also an import-time
+    profile of the app (runs `python -X importtime` once per worker).
+    """
+    try:
+        include_profile = request.args.get('profile') == '1'
+        return jsonify(startup_report(APP_IMPORT_SECONDS, include_profile=include_profile))
+    except Exception as e:
+        logger.error(f"Startup diagnostics failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/diagnostics/memory', methods=['GET'])
+def memory_diagnostics():
+    """
+    Memory diagnostics: this worker's RSS/PSS and, under the pre-fork
+    gunicorn config (backend/serving.py), the master and every worker.
+    """
+    try:
+        return jsonify(memory_report())
+    except Exception as e:
+        logger.error(f"Memory diagnostics failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/diagnostics/response-cache', methods=['GET'])
+def response_cache_diagnostics():
+    """Explain/advisory response cache: size, model version and hit/miss counters (this worker)."""
+    from backend.model.response_cache import get_response_cache
+    
+    return jsonify(get_response_cache().info())
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """Get frontend configuration (states, crops, seasons)."""
@@ -108,6 +153,8 @@ def predict_ensemble():
     }
     
     Response includes ensemble score, base model scores, and confidence.
+    'source' is 'risk_table' when served from the nightly precomputed table
+    (see backend/model/risk_table.py), or 'live'.
     """
     try:
         data = request.get_json()
@@ -133,10 +180,13 @@ def predict_ensemble():
         log_step(f"Ensemble Prediction Request", "in_progress", 
                 f"(State: {state}, District: {district}, Crop: {crop}, Season: {season})")
         
-        # Get ensemble prediction
-        result = ensemble_predict(state, district, crop, season)
+        # Serve from the precomputed risk table when its row is fresh
+        if USE_RISK_TABLE:
+            result, source = predict_risk(state, district, crop, season)
+        else:
+            result, source = ensemble_predict(state, district, crop, season), 'live'
         
-        log_step(f"Ensemble Prediction Request", "success", f"(Risk: {result['risk_level']})")
+        log_step(f"Ensemble Prediction Request", "success", f"(Risk: {result['risk_level']}, source: {source})")
         
         return jsonify({
             'state': state,
@@ -150,7 +200,8 @@ def predict_ensemble():
             'confidence': result['confidence'],
             'models_used': result['models_used'],
             'raw_features': result['raw_features'],
-            'normalized_features': result['normalized_features']
+            'normalized_features': result['normalized_features'],
+            'source': source
         })
     
     except Exception as e:
@@ -167,10 +218,16 @@ def explain():
         'state': str,
         'district': str,
         'crop': str,
-        'season': str
+        'season': str,
+        'counterfactual_mode': 'scenarios' | 'search'  (optional, default 'scenarios')
     }
     
-    Response includes feature importance and what-if scenarios.
+    Response includes feature importance and what-if scenarios. In 'search'
+    mode the fixed scenarios are replaced by 'minimal_counterfactual': the
+    smallest multi-feature change that lowers the risk tier.
+    
+    explanation.explained_model names the model the attributions describe;
+    with a compressed ensemble variant that is the full ensemble.
     """
     try:
         data = request.get_json()
@@ -179,6 +236,7 @@ def explain():
         district = data.get('district')
         crop = data.get('crop')
         season = data.get('season')
+        counterfactual_mode = data.get('counterfactual_mode', 'scenarios')
         
         # Validate inputs
         if not all([state, district, crop, season]):
@@ -193,31 +251,38 @@ def explain():
         if season not in SEASONS:
             return jsonify({'error': 'Invalid season'}), 400
         
-        log_step(f"Explanation Request", "in_progress", 
-                f"({state}/{district}/{crop}/{season})")
+        if counterfactual_mode not in ('scenarios', 'search'):
+            return jsonify({'error': 'Invalid counterfactual_mode'}), 400
         
-        # Get ensemble prediction first
-        prediction = ensemble_predict(state, district, crop, season)
+        from backend.model.response_cache import explanation_bundle
         
-        # Get SHAP explanation
-        explanation = explain_ensemble_prediction(state, district, crop, season)
+        log_step(f"Explanation Request", "in_progress", 
+                f"({state}/{district}/{crop}/{season})")
         
-        # Generate counterfactuals
-        counterfactuals = generate_counterfactuals(
-            state, district, crop, season, prediction
-        )
+        # Run ingestion once; all stages share the same features
+        context = build_feature_context(state, district, crop, season)
         
-        log_step(f"Explanation Request", "success")
+        # Prediction, SHAP explanation and counterfactuals (cached per feature fingerprint)
+        bundle = explanation_bundle(context, counterfactual_mode)
+        prediction = bundle['prediction']
         
-        return jsonify({
+        response = {
             'prediction': {
                 'risk_level': prediction['risk_level'],
                 'probability': prediction['ensemble_probability'],
                 'confidence': prediction['confidence']
             },
-            'explanation': explanation,
-            'counterfactuals': counterfactuals
-        })
+            'explanation': bundle['explanation']
+        }
+        
+        if counterfactual_mode == 'search':
+            response['minimal_counterfactual'] = bundle['minimal_counterfactual']
+        else:
+            response['counterfactuals'] = bundle['counterfactuals']
+        
+        log_step(f"Explanation Request", "success")
+        
+        return jsonify(response)
     
     except Exception as e:
         logger.error(f"Explanation failed: {str(e)}")
@@ -234,10 +299,17 @@ def advisory():
         'district': str,
         'crop': str,
         'season': str,
-        'language': str (optional: 'en', 'hi', 'mr', 'kn', 'ta')
+        'language': str (optional: 'en', 'hi', 'mr', 'kn', 'ta'),
+        'languages': [str, ...] (optional: render several languages at once)
     }
     
-    Response includes actionable recommendations.
+    An unsupported 'language' falls back to English; 'languages' must be a
+    list of supported codes (400 otherwise).
+    
+    Response includes actionable recommendations: 'advisory' in the first
+    requested language, 'advisories' keyed by every requested language, and
+    the language-independent 'plan', which /api/advisory/render turns into
+    other languages without recomputing anything.
     """
     try:
         data = request.get_json()
@@ -247,6 +319,7 @@ def advisory():
         crop = data.get('crop')
         season = data.get('season')
         language = data.get('language', 'en')
+        languages = data.get('languages')
         
         # Validate inputs
         if not all([state, district, crop, season]):
@@ -261,27 +334,26 @@ def advisory():
         if season not in SEASONS:
             return jsonify({'error': 'Invalid season'}), 400
         
-        if language not in ['en', 'hi', 'mr', 'kn', 'ta']:
-            language = 'en'
+        from backend.model.advisor import get_advisory_engine
+        from backend.model.response_cache import cached_advisory
         
-        log_step(f"Advisory Request", "in_progress", 
-                f"({state}/{district}/{crop}/{season}/{language})")
+        if languages is None:
+            languages = [language if language in LANGUAGES else 'en']
+        else:
+            try:
+                languages = get_advisory_engine().validate_languages(languages)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        # Get ensemble prediction
-        prediction = ensemble_predict(state, district, crop, season)
+        log_step(f"Advisory Request", "in_progress", 
+                f"({state}/{district}/{crop}/{season}/{','.join(languages)})")
         
-        # Get SHAP explanation
-        explanation = explain_ensemble_prediction(state, district, crop, season)
+        # Run ingestion once; all stages share the same features
+        context = build_feature_context(state, district, crop, season)
         
-        # Generate counterfactuals
-        counterfactuals = generate_counterfactuals(
-            state, district, crop, season, prediction
-        )
-        
-        # Generate advisory
-        advisory_result = generate_advisory(
-            prediction, explanation, counterfactuals, language
-        )
+        # Explanation bundle and plan are cached per feature fingerprint; each language is a render
+        bundle, plan, advisories = cached_advisory(context, languages)
+        prediction = bundle['prediction']
         
         log_step(f"Advisory Request", "success")
         
@@ -291,32 +363,71 @@ def advisory():
                 'probability': prediction['ensemble_probability'],
                 'confidence': prediction['confidence']
             },
-            'advisory': advisory_result
+            'advisory': advisories[languages[0]],
+            'advisories': advisories,
+            'plan': plan
         })
     
     except Exception as e:
         logger.error(f"Advisory failed: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/advisory/render', methods=['POST'])
+def advisory_render():
+    """
+    Render a computed advisory in other languages (e.g. when the user
+    switches language), without prediction, explanation or counterfactuals.
+    
+    Request JSON:
+    {
+        'plan': {...} (the 'plan' returned by /api/advisory),
+        'languages': [str, ...] (default: all supported languages)
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        from backend.model.advisor import get_advisory_engine
+        
+        engine = get_advisory_engine()
+        plan = engine.validate_plan(data.get('plan'))
+        languages = engine.validate_languages(data.get('languages') or list(LANGUAGES))
+        
+        return jsonify({'advisories': engine.render_languages(plan, languages)})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Advisory rendering failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/batch-predict', methods=['POST'])
 def batch_predict():
-    """Batch prediction endpoint."""
+    """
+    Batch prediction endpoint.
+    
+    Request JSON:
+    {
+        'predictions': [{'state': str, 'district': str, 'crop': str, 'season': str}, ...],
+        'model': str (optional: 'rf' (default) or 'ensemble')
+    }
+    
+    All items are scored together in one vectorised pass; results are
+    returned in request order with a per-item status.
+    """
     try:
         data = request.get_json()
         predictions = data.get('predictions', [])
+        model = data.get('model', 'rf')
         
-        results = []
-        for pred_req in predictions:
-            try:
-                result = get_prediction(
-                    pred_req['state'],
-                    pred_req['district'],
-                    pred_req['crop'],
-                    pred_req['season']
-                )
-                results.append({'status': 'success', 'data': result})
-            except Exception as e:
-                results.append({'status': 'error', 'error': str(e)})
+        log_step("Batch Prediction Request", "in_progress", f"({len(predictions)} items, model: {model})")
+        
+        if model == 'ensemble':
+            results = ensemble_predict_batch(predictions)
+        else:
+            results = get_batch_predictions(predictions)
+        
+        log_step("Batch Prediction Request", "success")
         
         return jsonify({'results': results})
     
@@ -324,6 +435,154 @@ def batch_predict():
         logger.error(f"Batch prediction failed: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/batch-explain', methods=['POST'])
+def batch_explain():
+    """
+    Batch SHAP explanation endpoint.
+    
+    Request JSON:
+    {
+        'predictions': [{'state': str, 'district': str, 'crop': str, 'season': str}, ...]
+    }
+    
+    All items are explained together in one TreeSHAP pass per model;
+    results are returned in request order with a per-item status. Each
+    explanation's explained_model says which ensemble variant it describes.
+    """
+    try:
+        data = request.get_json()
+        predictions = data.get('predictions', [])
+        
+        from backend.model.shap_explainer import explain_ensemble_batch
+        
+        log_step("Batch Explanation Request", "in_progress", f"({len(predictions)} items)")
+        
+        results = explain_ensemble_batch(predictions)
+        
+        log_step("Batch Explanation Request", "success")
+        
+        return jsonify({'results': results})
+    
+    except Exception as e:
+        logger.error(f"Batch explanation failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/sweep', methods=['POST'])
+def submit_sweep_job():
+    """
+    Submit a background prediction sweep.
+    
+    Request JSON (every key optional; omitted lists mean all of them):
+    {
+        'states': [str, ...],
+        'districts': [str, ...],
+        'crops': [str, ...],
+        'seasons': [str, ...],
+        'model': str ('ensemble' (default) or 'rf'),
+        'chunk_size': int
+    }
+    
+    Returns 202 with the job record; poll /api/jobs/<job_id> for progress
+    and read /api/jobs/<job_id>/results or /stream for results.
+    """
+    try:
+        from backend.jobs import submit_sweep
+        
+        job = submit_sweep(request.get_json(silent=True) or {})
+        return jsonify(job), 202
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Sweep job submission failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Most recent sweep jobs, newest first."""
+    from backend.jobs import get_sweep_job_manager
+    
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'jobs': get_sweep_job_manager().store.list(limit)})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Sweep job status and progress counters."""
+    from backend.jobs import get_job
+    
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """
+    Page through a sweep job's finished results in item order.
+    
+    Query parameters: offset (item index, default 0) and limit (default 100,
+    at most SWEEP_RESULTS_PAGE_MAX). While the job runs a page ends at the
+    first item still being scored and next_offset points at it (the page
+    may be empty); poll again from next_offset. next_offset is null after
+    the last result.
+    """
+    from backend.jobs import get_sweep_job_manager
+    from backend.utils.config import SWEEP_RESULTS_PAGE_MAX
+    
+    store = get_sweep_job_manager().store
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), SWEEP_RESULTS_PAGE_MAX)
+    results, next_offset = store.results_page(job_id, offset, limit)
+    
+    return jsonify({
+        'job': job,
+        'results': results,
+        'next_offset': next_offset
+    })
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def job_stream(job_id):
+    """
+    Read a sweep job's results incrementally as NDJSON, one line per item,
+    in the order they were stored.
+    
+    Each call returns at most `limit` results (default and maximum
+    SWEEP_RESULTS_PAGE_MAX) stored after the `after` cursor (default 0) and
+    returns immediately. The X-Stream-Cursor header is the `after` value for
+    the next call; X-Stream-Finished is 'true' once every result has been
+    read.
+    """
+    from flask import Response
+    from backend.jobs import get_job, read_job_stream
+    from backend.utils.config import SWEEP_RESULTS_PAGE_MAX
+    
+    if get_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    after = max(request.args.get('after', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', SWEEP_RESULTS_PAGE_MAX, type=int), 1), SWEEP_RESULTS_PAGE_MAX)
+    results, cursor, finished = read_job_stream(job_id, after, limit)
+    
+    body = ''.join(json.dumps(result) + '\n' for result in results)
+    return Response(body, mimetype='application/x-ndjson', headers={
+        'X-Stream-Cursor': str(cursor),
+        'X-Stream-Finished': 'true' if finished else 'false'
+    })
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a sweep job; chunks already running finish, the rest are skipped."""
+    from backend.jobs import get_sweep_job_manager
+    
+    job = get_sweep_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 @app.route('/api/historical-trends', methods=['POST'])
 def historical_trends():
     """
@@ -380,6 +639,8 @@ def export_pdf():
         if not prediction_data:
             return jsonify({'error': 'Missing prediction_data'}), 400
         
+        from backend.utils.pdf_export import generate_pdf_report
+        
         log_step("PDF Export", "in_progress")
         
         pdf_buffer = generate_pdf_report(prediction_data, historical_data)
@@ -407,7 +668,7 @@ def get_model_info():
     """Get model training information and accuracy."""
     try:
         from backend.utils.config import MODEL_PATH
-        import pickle
+        from backend.model.registry import get_model_registry
         
         model_info = {
             "model_type": "Random Forest Classifier",
@@ -456,21 +717,19 @@ def get_model_info():
         # Try to load actual model parameters and metrics if available
         if os.path.exists(MODEL_PATH):
             try:
-                with open(MODEL_PATH, 'rb') as f:
-                    model = pickle.load(f)
-                    model_info["n_estimators_actual"] = model.n_estimators
-                    model_info["max_depth_actual"] = model.max_depth
+                registry = get_model_registry()
+                model = registry.load(MODEL_PATH)
+                model_info["n_estimators_actual"] = model.n_estimators
+                model_info["max_depth_actual"] = model.max_depth
                 
                 # Load training metrics if available
-                metrics_path = MODEL_PATH.replace('.pkl', '_metrics.pkl')
-                if os.path.exists(metrics_path):
-                    with open(metrics_path, 'rb') as f:
-                        metrics = pickle.load(f)
-                        model_info["accuracy"] = int(metrics.get('accuracy', 0.9) * 100)
-                        model_info["f1_score"] = round(metrics.get('f1_score', 0), 4)
-                        model_info["roc_auc"] = round(metrics.get('roc_auc', 0), 4)
-                        model_info["cv_mean"] = round(metrics.get('cv_mean', 0), 4)
-                        model_info["cv_std"] = round(metrics.get('cv_std', 0), 4)
+                metrics = registry.load_optional(MODEL_PATH.replace('.pkl', '_metrics.pkl'))
+                if metrics is not None:
+                    model_info["accuracy"] = int(metrics.get('accuracy', 0.9) * 100)
+                    model_info["f1_score"] = round(metrics.get('f1_score', 0), 4)
+                    model_info["roc_auc"] = round(metrics.get('roc_auc', 0), 4)
+                    model_info["cv_mean"] = round(metrics.get('cv_mean', 0), 4)
+                    model_info["cv_std"] = round(metrics.get('cv_std', 0), 4)
             except:
                 pass
         
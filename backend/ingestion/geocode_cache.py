@@ -0,0 +1,202 @@
+"""
+Geocode Cache - District coordinates without a network round-trip
+
+District coordinates never change, so resolved (lat, lon) pairs are kept
+in an in-memory LRU backed by a persistent SQLite store. Failed lookups
+are cached too (negative caching) with a short expiry, so an unknown
+district or an unreachable geocoding API does not cost a 5s timeout on
+every request.
+
+Pre-warm the store offline from the configured STATES list with:
+    python -m backend.ingestion.geocode_cache
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from backend.utils.config import (
+    STATES, GEOCODE_CACHE_PATH, GEOCODE_CACHE_SIZE,
+    GEOCODE_NEGATIVE_TTL, GEOCODE_ERROR_TTL
+)
+from backend.utils.helpers import setup_logger, log_step
+
+logger = setup_logger(__name__)
+
+
+class GeocodeCache:
+    """In-memory LRU in front of a persistent SQLite store of district coordinates."""
+
+    def __init__(self, db_path=GEOCODE_CACHE_PATH, max_entries=GEOCODE_CACHE_SIZE,
+                 negative_ttl=GEOCODE_NEGATIVE_TTL, error_ttl=GEOCODE_ERROR_TTL):
+        """
+        Args:
+            db_path: SQLite file for the persistent store (None for memory only)
+            max_entries: LRU capacity
+            negative_ttl: Seconds to remember a district the API could not find
+            error_ttl: Seconds to remember a failed (network/API error) lookup
+        """
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # key -> (lat, lon, expires_at)
+        self._db = None
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS geocode ('
+                    ' state TEXT NOT NULL, district TEXT NOT NULL,'
+                    ' lat REAL, lon REAL, expires_at REAL,'
+                    ' PRIMARY KEY (state, district))'
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Geocode store unavailable at {db_path}: {e}. Using memory only.")
+                self._db = None
+
+    @staticmethod
+    def _key(state, district):
+        return (state or '').strip().lower(), (district or '').strip().lower()
+
+    def get(self, state, district):
+        """
+        Look up cached coordinates.
+
+        Returns:
+            (lat, lon) on a hit, (None, None) on a cached failure,
+            or None on a miss.
+        """
+        key = self._key(state, district)
+        now = time.time()
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    'SELECT lat, lon, expires_at FROM geocode WHERE state = ? AND district = ?', key
+                ).fetchone()
+                if row is not None:
+                    entry = row
+                    self._remember(key, entry)
+
+            if entry is None:
+                return None
+
+            lat, lon, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                # Expired negative entry: treat as a miss so the lookup is retried
+                self._lru.pop(key, None)
+                return None
+
+            self._lru.move_to_end(key)
+            return lat, lon
+
+    def put(self, state, district, lat, lon, ttl=None):
+        """Store coordinates (or a failure when lat/lon are None) for a district."""
+        key = self._key(state, district)
+        entry = (lat, lon, time.time() + ttl if ttl is not None else None)
+
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO geocode (state, district, lat, lon, expires_at)'
+                        ' VALUES (?, ?, ?, ?, ?)', key + entry
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to persist geocode for {district}, {state}: {e}")
+
+    def _remember(self, key, entry):
+        """Insert into the LRU, evicting the least recently used entry. Caller holds the lock."""
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def resolve(self, state, district, geocoder, force=False):
+        """
+        Return cached coordinates, calling `geocoder(state, district)` on a miss
+        (or always, if `force` is set).
+
+        The geocoder returns (lat, lon), or (None, None) if the district is
+        unknown, and raises on transport/API errors.
+        """
+        if not force:
+            cached = self.get(state, district)
+            if cached is not None:
+                return cached
+
+        try:
+            lat, lon = geocoder(state, district)
+        except Exception as e:
+            logger.warning(f"Geocoding failed for {district}, {state}: {e}")
+            self.put(state, district, None, None, ttl=self.error_ttl)
+            return None, None
+
+        if lat is None or lon is None:
+            self.put(state, district, None, None, ttl=self.negative_ttl)
+            return None, None
+
+        self.put(state, district, lat, lon)
+        return lat, lon
+
+
+# Singleton instance
+_geocode_cache = None
+_geocode_cache_lock = threading.Lock()
+
+
+def get_geocode_cache():
+    """Get or create singleton geocode cache."""
+    global _geocode_cache
+    if _geocode_cache is None:
+        with _geocode_cache_lock:
+            if _geocode_cache is None:
+                _geocode_cache = GeocodeCache()
+    return _geocode_cache
+
+
+def prewarm_geocode_cache(states=STATES):
+    """
+    Resolve every district in `states` into the persistent store.
+
+    Already-cached districts are skipped, so the job can be re-run to fill
+    in districts that failed previously.
+
+    Returns:
+        {'resolved': int, 'cached': int, 'failed': [(state, district), ...]}
+    """
+    from backend.ingestion.openweather import OpenWeatherIngestion
+
+    log_step("Geocode Cache Pre-warm", "in_progress")
+
+    cache = get_geocode_cache()
+    ingestion = OpenWeatherIngestion()
+    summary = {'resolved': 0, 'cached': 0, 'failed': []}
+
+    for state, districts in states.items():
+        for district in districts:
+            cached = cache.get(state, district)
+            if cached is not None and cached[0] is not None:
+                summary['cached'] += 1
+                continue
+            lat, lon = cache.resolve(state, district, ingestion.geocode_remote, force=True)
+            if lat is None:
+                summary['failed'].append((state, district))
+            else:
+                summary['resolved'] += 1
+
+    log_step("Geocode Cache Pre-warm", "success",
+             f"(resolved: {summary['resolved']}, cached: {summary['cached']}, failed: {len(summary['failed'])})")
+    return summary
+
+
+if __name__ == '__main__':
+    prewarm_geocode_cache()
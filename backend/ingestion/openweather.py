@@ -1,9 +1,11 @@
-import requests
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from backend.utils.config import OPENWEATHER_API_KEY
+from backend.utils.config import OPENWEATHER_API_KEY, CURRENT_WEATHER_TTL, CURRENT_WEATHER_STALE_TTL
 from backend.utils.helpers import setup_logger, log_step, mock_weather_data
+from backend.utils.http_client import get_http_client
+from backend.utils.ttl_cache import get_weather_cache, weather_cache_key
+from backend.ingestion.geocode_cache import get_geocode_cache
 
 logger = setup_logger(__name__)
 
@@ -16,45 +18,60 @@ class OpenWeatherIngestion:
         self.geo_url = "https://api.openweathermap.org/geo/1.0/direct"
 
     def geocode(self, state, district):
-        """Resolve coordinates for a district using OpenWeather geocoding API."""
-        try:
-            q = f"{district},{state},IN"
-            params = {"q": q, "limit": 1, "appid": self.api_key}
-            resp = requests.get(self.geo_url, params=params, timeout=5)
-            if resp.status_code == 200:
-                results = resp.json()
-                if results:
-                    item = results[0]
-                    return item.get("lat"), item.get("lon")
-        except Exception as e:
-            logger.warning(f"Geocoding failed for {district}, {state}: {e}")
+        """Resolve coordinates for a district, consulting the geocode cache first."""
+        return get_geocode_cache().resolve(state, district, self.geocode_remote)
+    
+    def geocode_remote(self, state, district):
+        """
+        Resolve coordinates for a district using OpenWeather geocoding API.
+        Returns (None, None) if the district is unknown; raises on API errors.
+        """
+        q = f"{district},{state},IN"
+        params = {"q": q, "limit": 1, "appid": self.api_key}
+        resp = get_http_client().get(self.geo_url, params=params, timeout=5)
+        resp.raise_for_status()
+        results = resp.json()
+        if results:
+            item = results[0]
+            return item.get("lat"), item.get("lon")
         return None, None
     
     def fetch_current_weather(self, lat, lon):
-        """Fetch current weather for coordinates."""
+        """Fetch current weather for coordinates (cached per 10-minute bucket)."""
         try:
-            url = f"{self.base_url}/weather?lat={lat}&lon={lon}&appid={self.api_key}&units=metric"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                log_step("OpenWeather API - Current", "success")
-                return {
-                    'temperature': data['main']['temp'],
-                    'rainfall': data['rain'].get('1h', 0) if 'rain' in data else 0,
-                    'humidity': data['main']['humidity']
-                }
+            weather = get_weather_cache().get_or_fetch(
+                weather_cache_key(lat, lon, 'current'),
+                lambda: self._fetch_current_weather_live(lat, lon),
+                ttl=CURRENT_WEATHER_TTL,
+                stale_ttl=CURRENT_WEATHER_STALE_TTL
+            )
+            return dict(weather)
         except Exception as e:
             logger.warning(f"OpenWeather API failed: {e}. Using mock data.")
         
-        return mock_weather_data("Unknown", "Unknown")
+        return dict(mock_weather_data("Unknown", "Unknown"), source='mock')
+    
+    def _fetch_current_weather_live(self, lat, lon):
+        """Call the OpenWeather current-weather endpoint; raises on failure."""
+        url = f"{self.base_url}/weather?lat={lat}&lon={lon}&appid={self.api_key}&units=metric"
+        response = get_http_client().get(url, timeout=5)
+        response.raise_for_status()
+        
+        data = response.json()
+        log_step("OpenWeather API - Current", "success")
+        return {
+            'temperature': data['main']['temp'],
+            'rainfall': data['rain'].get('1h', 0) if 'rain' in data else 0,
+            'humidity': data['main']['humidity'],
+            'source': 'live'
+        }
     
     def fetch_historical_weather(self, state, district):
         """Fetch historical weather patterns (mock implementation)."""
         log_step("OpenWeather - Historical", "success (mock)")
         
         # In production, integrate with weatherapi.com or similar for historical data
-        return mock_weather_data(state, district)
+        return dict(mock_weather_data(state, district), source='mock')
 
 def get_weather_data(state, district):
     """Public interface for weather data."""
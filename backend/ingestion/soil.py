@@ -3,6 +3,15 @@ from backend.utils.helpers import setup_logger, log_step
 
 logger = setup_logger(__name__)
 
+# Soil type encoding used as a model feature
+SOIL_TYPE_ENCODING = {
+    'Sandy Loam': 1,
+    'Clay Loam': 2,
+    'Silt Loam': 3,
+    'Clay': 4,
+    'Loam': 5
+}
+
 class SoilIngestion:
     """Fetch soil data from NBSS&LUP Soil Database."""
     
@@ -26,18 +35,9 @@ def get_soil_data(district):
     soil_ing = SoilIngestion()
     soil_props = soil_ing.fetch_soil_properties(district)
     
-    # Encode soil type
-    soil_type_encoding = {
-        'Sandy Loam': 1,
-        'Clay Loam': 2,
-        'Silt Loam': 3,
-        'Clay': 4,
-        'Loam': 5
-    }
-    
     return {
         'soil_type': soil_props['soil_type'],
-        'soil_type_encoded': soil_type_encoding.get(soil_props['soil_type'], 0),
+        'soil_type_encoded': SOIL_TYPE_ENCODING.get(soil_props['soil_type'], 0),
         'organic_carbon': soil_props['organic_carbon'],
         'soil_depth': soil_props['soil_depth']
     }
@@ -0,0 +1,482 @@
+"""
+Sweep Jobs - Background prediction sweeps over states, crops and seasons
+
+A full sweep (every district in STATES x every crop in CROPS x every
+season in SEASONS, ~13.7k combinations) is too long for one request. It
+is submitted as a job instead:
+- The sweep spec expands to items in a fixed order. The items are split
+  into chunks, and each chunk is scored with one vectorised batch call.
+- Chunks run on a small thread pool in the process that accepted the
+  job. The loaded models are shared and the request thread returns at
+  once.
+- Progress and per-item results are written to a SQLite store
+  (SWEEP_DB_PATH) as each chunk finishes. Any gunicorn worker can
+  therefore poll a job, page through its results or read them
+  incrementally as NDJSON while it runs. Both reads are bounded and
+  resumable (an item index or a row cursor), so no request holds a sync
+  worker for the length of the job.
+- Each job records the pid and start time of the process that runs it
+  (pids are reused, e.g. by a restarted container). A job whose process
+  died is claimed by exactly one process that opens the job manager, and
+  only its missing chunks are scored.
+
+Usage (offline):
+    python -m backend.jobs                  # full all-India ensemble sweep
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from backend.utils.config import (
+    STATES, CROPS, SEASONS, SWEEP_DB_PATH, SWEEP_WORKERS, SWEEP_CHUNK_SIZE,
+    SWEEP_RESULTS_PAGE_MAX
+)
+from backend.utils.helpers import setup_logger, log_step
+
+logger = setup_logger(__name__)
+
+JOB_STATES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+SWEEP_MODELS = ('ensemble', 'rf')
+
+
+def expand_sweep(spec):
+    """
+    Validate a sweep spec and expand it into prediction items.
+
+    Spec (every key optional):
+        {
+            'states': [state, ...] (default: all STATES),
+            'districts': [district, ...] (filter within the states),
+            'crops': [crop, ...] (default: all CROPS),
+            'seasons': [season, ...] (default: all SEASONS),
+            'model': 'ensemble' (default) or 'rf',
+            'chunk_size': int (default: SWEEP_CHUNK_SIZE)
+        }
+
+    Returns:
+        (normalized spec, list of {'state', 'district', 'crop', 'season'})
+
+    Raises ValueError for unknown states, crops, seasons or models, and
+    for list fields that are not lists of names.
+    """
+    spec = dict(spec or {})
+    for key in ('states', 'districts', 'crops', 'seasons'):
+        value = spec.get(key)
+        if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            raise ValueError(f"'{key}' must be a list of names")
+    states = spec.get('states') or list(STATES)
+    crops = spec.get('crops') or list(CROPS)
+    seasons = spec.get('seasons') or list(SEASONS)
+    model = spec.get('model', 'ensemble')
+    chunk_size = int(spec.get('chunk_size') or SWEEP_CHUNK_SIZE)
+
+    unknown = [s for s in states if s not in STATES]
+    if unknown:
+        raise ValueError(f"Unknown states: {', '.join(unknown)}")
+    unknown = [c for c in crops if c not in CROPS]
+    if unknown:
+        raise ValueError(f"Unknown crops: {', '.join(unknown)}")
+    unknown = [s for s in seasons if s not in SEASONS]
+    if unknown:
+        raise ValueError(f"Unknown seasons: {', '.join(unknown)}")
+    if model not in SWEEP_MODELS:
+        raise ValueError(f"Unknown model: {model} (choose from {', '.join(SWEEP_MODELS)})")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    district_filter = set(spec.get('districts') or [])
+    items = [
+        {'state': state, 'district': district, 'crop': crop, 'season': season}
+        for state in states
+        for district in STATES[state]
+        if not district_filter or district in district_filter
+        for crop in crops
+        for season in seasons
+    ]
+    if not items:
+        raise ValueError("Sweep spec matches no districts")
+
+    normalized = {
+        'states': states,
+        'districts': sorted(district_filter) or None,
+        'crops': crops,
+        'seasons': seasons,
+        'model': model,
+        'chunk_size': chunk_size
+    }
+    return normalized, items
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start_time(pid):
+    """Start time of a process in clock ticks since boot (Linux /proc), or None."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesised command name start at field 3; starttime is field 22
+            return int(f.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _current_owner():
+    """(pid, start time) identifying this process as a job owner."""
+    pid = os.getpid()
+    return pid, _process_start_time(pid)
+
+
+def _owner_alive(owner_pid, owner_started):
+    """True if the process recorded as a job's owner is still running."""
+    if not owner_pid or not _process_alive(owner_pid):
+        return False
+    if owner_started is None:
+        return True  # No start time recorded; the pid is all we can check
+    started = _process_start_time(owner_pid)
+    return started is None or started == owner_started
+
+
+class JobStore:
+    """SQLite store of sweep jobs and their per-item results."""
+
+    def __init__(self, db_path=SWEEP_DB_PATH):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')  # Readers in other workers do not block writers
+            self._db.executescript(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY, status TEXT NOT NULL, spec TEXT NOT NULL,'
+                ' total INTEGER NOT NULL, done INTEGER NOT NULL DEFAULT 0,'
+                ' failed INTEGER NOT NULL DEFAULT 0, chunks INTEGER NOT NULL,'
+                ' owner_pid INTEGER, owner_started INTEGER, error TEXT,'
+                ' created_at REAL NOT NULL, started_at REAL, finished_at REAL);'
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' job_id TEXT NOT NULL, idx INTEGER NOT NULL, chunk INTEGER NOT NULL,'
+                ' status TEXT NOT NULL, item TEXT NOT NULL, data TEXT,'
+                ' PRIMARY KEY (job_id, idx));'
+            )
+            # Stores created before owner start times were recorded
+            columns = {row['name'] for row in self._db.execute('PRAGMA table_info(jobs)')}
+            if 'owner_started' not in columns:
+                self._db.execute('ALTER TABLE jobs ADD COLUMN owner_started INTEGER')
+            self._db.commit()
+
+    def create(self, spec, total, chunks):
+        job_id = uuid.uuid4().hex[:16]
+        owner_pid, owner_started = _current_owner()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO jobs (id, status, spec, total, chunks, owner_pid, owner_started, created_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued', json.dumps(spec), total, chunks, owner_pid, owner_started, time.time())
+            )
+            self._db.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._db.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+            self._db.commit()
+
+    def claim(self, job_id, seen_owner, new_owner):
+        """
+        Take over an orphaned job if its owner is still the (pid, start time)
+        `seen_owner` read from unfinished(); False if another process got it first.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET owner_pid = ?, owner_started = ?'
+                " WHERE id = ? AND status IN ('queued', 'running')"
+                ' AND owner_pid IS ? AND owner_started IS ?', (*new_owner, job_id, *seen_owner)
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def mark_running(self, job_id):
+        """Set a job running; started_at keeps the first start when a job is resumed."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (time.time(), job_id)
+            )
+            self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['spec'] = json.loads(job['spec'])
+        return job
+
+    def list(self, limit=20):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [self.get(row['id']) for row in rows]
+
+    def unfinished(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, owner_pid, owner_started FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        return [(row['id'], (row['owner_pid'], row['owner_started'])) for row in rows]
+
+    def completed_chunks(self, job_id):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT DISTINCT chunk FROM results WHERE job_id = ?', (job_id,)
+            ).fetchall()
+        return {row['chunk'] for row in rows}
+
+    def save_chunk(self, job_id, chunk, start, items, results):
+        """Store one chunk's results and advance the job's counters atomically."""
+        rows = []
+        failed = 0
+        for offset, (item, result) in enumerate(zip(items, results)):
+            ok = result.get('status') == 'success'
+            failed += not ok
+            rows.append((
+                job_id, start + offset, chunk, result.get('status', 'error'), json.dumps(item),
+                json.dumps(result.get('data') if ok else {'error': result.get('error')})
+            ))
+        with self._lock:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO results (job_id, idx, chunk, status, item, data)'
+                ' VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+            self._db.execute(
+                'UPDATE jobs SET done = (SELECT COUNT(*) FROM results WHERE job_id = ?),'
+                " failed = (SELECT COUNT(*) FROM results WHERE job_id = ? AND status != 'success')"
+                ' WHERE id = ?', (job_id, job_id, job_id)
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _result(row):
+        result = {'index': row['idx'], 'status': row['status'], **json.loads(row['item'])}
+        data = json.loads(row['data'])
+        if row['status'] == 'success':
+            result['data'] = data
+        else:
+            result.update(data)
+        return result
+
+    def results(self, job_id, offset=0, limit=100):
+        """Stored results in item order, starting at index `offset` (only finished items)."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT idx, status, item, data FROM results WHERE job_id = ? AND idx >= ?'
+                ' ORDER BY idx LIMIT ?', (job_id, offset, limit)
+            ).fetchall()
+        return [self._result(row) for row in rows]
+
+    def results_page(self, job_id, offset=0, limit=100):
+        """
+        One page of results in item order. Chunks finish out of order, so
+        while the job runs the page stops at the first index without a
+        result and next_offset points at it; following next_offset never
+        skips an item. Once the job has finished nothing more can arrive,
+        and items lost with a failed chunk are skipped.
+
+        Returns:
+            (results, next_offset or None after the last result)
+        """
+        job = self.get(job_id)
+        results = self.results(job_id, offset, limit)
+        if job['status'] in FINISHED_STATES:
+            more = len(results) == limit and results[-1]['index'] + 1 < job['total']
+            return results, results[-1]['index'] + 1 if more else None
+
+        contiguous = 0
+        while contiguous < len(results) and results[contiguous]['index'] == offset + contiguous:
+            contiguous += 1
+        next_offset = offset + contiguous
+        return results[:contiguous], next_offset if next_offset < job['total'] else None
+
+    def results_after(self, job_id, after_rowid=0, limit=1000):
+        """
+        Results stored after row `after_rowid`, in the order chunks finished.
+        Returns (results, last rowid) so callers can stream incrementally.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT rowid, idx, status, item, data FROM results WHERE job_id = ? AND rowid > ?'
+                ' ORDER BY rowid LIMIT ?', (job_id, after_rowid, limit)
+            ).fetchall()
+        last = rows[-1]['rowid'] if rows else after_rowid
+        return [self._result(row) for row in rows], last
+
+
+class SweepJobManager:
+    """Runs sweep jobs in chunks on a thread pool and records them in the JobStore."""
+
+    def __init__(self, store=None, max_workers=SWEEP_WORKERS):
+        self.store = store or JobStore()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sweep')
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self.resume_orphaned()
+
+    def submit(self, spec):
+        """Queue a sweep; returns the job record (status 'queued')."""
+        spec, items = expand_sweep(spec)
+        chunk_size = spec['chunk_size']
+        n_chunks = -(-len(items) // chunk_size)
+        job_id = self.store.create(spec, len(items), n_chunks)
+        log_step("Sweep Job", "in_progress", f"({job_id}: {len(items)} items, {n_chunks} chunks)")
+        self._start(job_id, spec, items)
+        return self.store.get(job_id)
+
+    def _start(self, job_id, spec, items, skip_chunks=()):
+        chunk_size = spec['chunk_size']
+        chunks = [
+            (chunk, start, items[start:start + chunk_size])
+            for chunk, start in enumerate(range(0, len(items), chunk_size))
+            if chunk not in skip_chunks
+        ]
+        self.store.mark_running(job_id)
+        if not chunks:
+            self._finish(job_id)
+            return
+
+        remaining = {'count': len(chunks)}
+        counter_lock = threading.Lock()
+
+        def run_chunk(chunk, start, chunk_items):
+            try:
+                if not self._is_cancelled(job_id):
+                    self.store.save_chunk(job_id, chunk, start, chunk_items, _score(spec['model'], chunk_items))
+            except Exception as e:
+                logger.error(f"Sweep job {job_id} chunk {chunk} failed: {e}")
+                self.store.update(job_id, error=str(e))
+            finally:
+                with counter_lock:
+                    remaining['count'] -= 1
+                    last = remaining['count'] == 0
+                if last:
+                    self._finish(job_id)
+
+        for chunk, start, chunk_items in chunks:
+            self._pool.submit(run_chunk, chunk, start, chunk_items)
+
+    def _is_cancelled(self, job_id):
+        if job_id in self._cancelled:
+            return True
+        job = self.store.get(job_id)
+        return job is None or job['status'] == 'cancelled'
+
+    def _finish(self, job_id):
+        job = self.store.get(job_id)
+        if self._is_cancelled(job_id):
+            status = 'cancelled'
+        elif job['done'] < job['total']:
+            status = 'failed'
+        else:
+            status = 'completed'
+        self.store.update(job_id, status=status, finished_at=time.time())
+        log_step("Sweep Job", "success" if status == 'completed' else status,
+                 f"({job_id}: {job['done']}/{job['total']} items, {job['failed']} errors)")
+
+    def cancel(self, job_id):
+        """Stop scheduling further chunks of a job run by this process."""
+        job = self.store.get(job_id)
+        if job is None or job['status'] in FINISHED_STATES:
+            return job
+        with self._lock:
+            self._cancelled.add(job_id)
+        # Also marks jobs run by another worker, which stops at its next chunk
+        self.store.update(job_id, status='cancelled', finished_at=time.time())
+        return self.store.get(job_id)
+
+    def resume_orphaned(self):
+        """Restart unfinished jobs whose owning process no longer exists."""
+        owner = _current_owner()
+        for job_id, seen_owner in self.store.unfinished():
+            if seen_owner == owner or _owner_alive(*seen_owner):
+                continue
+            if not self.store.claim(job_id, seen_owner, owner):
+                continue
+            job = self.store.get(job_id)
+            spec, items = expand_sweep(job['spec'])
+            done = self.store.completed_chunks(job_id)
+            logger.info(f"Resuming sweep job {job_id} ({len(done)}/{job['chunks']} chunks done)")
+            self._start(job_id, spec, items, skip_chunks=done)
+
+
+def _score(model, items):
+    """Score one chunk with a single vectorised batch call."""
+    if model == 'rf':
+        from backend.model.predict import get_batch_predictions
+        return get_batch_predictions(items)
+    from backend.model.ensemble import ensemble_predict_batch
+    return ensemble_predict_batch(items)
+
+
+# Singleton instance
+_sweep_job_manager = None
+_sweep_job_manager_lock = threading.Lock()
+
+
+def get_sweep_job_manager():
+    """Get or create singleton sweep job manager."""
+    global _sweep_job_manager
+    if _sweep_job_manager is None:
+        with _sweep_job_manager_lock:
+            if _sweep_job_manager is None:
+                _sweep_job_manager = SweepJobManager()
+    return _sweep_job_manager
+
+
+def submit_sweep(spec):
+    """Submit a sweep job; returns its record."""
+    return get_sweep_job_manager().submit(spec)
+
+
+def get_job(job_id):
+    """Job record (status, progress counters, spec) or None."""
+    return get_sweep_job_manager().store.get(job_id)
+
+
+def read_job_stream(job_id, after=0, limit=SWEEP_RESULTS_PAGE_MAX):
+    """
+    Next batch of a job's results in the order they were stored, for
+    incremental reads while it runs. Pass the returned cursor as `after`
+    on the next call.
+
+    Returns:
+        (results, cursor, finished) - finished is True once the job has
+        finished and every stored result has been returned
+    """
+    store = get_sweep_job_manager().store
+    job = store.get(job_id)
+    batch, cursor = store.results_after(job_id, after, limit)
+    finished = job is None or (job['status'] in FINISHED_STATES and len(batch) < limit)
+    return batch, cursor, finished
+
+
+if __name__ == '__main__':
+    manager = get_sweep_job_manager()
+    job = manager.submit({})
+    while job['status'] not in FINISHED_STATES:
+        time.sleep(2)
+        job = manager.store.get(job['id'])
+        logger.info(f"{job['id']}: {job['done']}/{job['total']} ({job['status']})")
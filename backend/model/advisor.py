@@ -8,87 +8,250 @@ Generates farmer-friendly, actionable recommendations based on:
 - Best practices
 
 NO LLM - fully rule-driven, deterministic, multilingual
+
+Computation and rendering are separate: compute_advisory() decides the
+content once (template ids plus counterfactual details), and
+render_advisory() turns that plan into text for any language.
+Switching language therefore only needs a render.
+
+The multilingual templates below are compiled once at import into tuples
+indexed by enum ids (language, risk level, action, feature), with the
+English fallback and the opportunity line format already resolved. A
+render is then tuple indexing plus one str.format per opportunity, which
+keeps bulk rendering (e.g. SMS broadcasts to thousands of districts)
+cheap. Run `python -m backend.model.advisor` to verify the compiled
+tables against the source templates and benchmark rendering.
 """
 
+import random
+import time
+import tracemalloc
 from backend.utils.helpers import setup_logger, log_step
 
 logger = setup_logger(__name__)
 
+# Immediate actions (ACTION_TEMPLATES ids) per risk level
+RISK_ACTIONS = {
+    'High': ('consult_extension_officer', 'monitor_every_2_3_days'),
+    'Medium': ('monitor_every_3_5_days',),
+    'Low': ('continue_normal_practices',)
+}
+
+# SHAP feature name fragment -> FEATURE_RECOMMENDATIONS key, checked in order
+FEATURE_RECOMMENDATION_KEYS = (
+    ('ndvi', 'ndvi_mean'),
+    ('rainfall', 'rainfall_deviation'),
+    ('moisture', 'soil_moisture_index'),
+    ('pest', 'pest_frequency'),
+    ('temperature', 'temperature_anomaly')
+)
+
+# Risk-based templates
+RISK_TEMPLATES = {
+    'Low': {
+        'en': "Your crop has LOW failure risk. Current conditions are favorable.",
+        'hi': "आपकी फसल पर कम जोखिम है। वर्तमान स्थितियां अनुकूल हैं।",
+        'mr': "तुमच्या पिकीला कमी जोखीम आहे. वर्तमान परिस्थिती अनुकूल आहेत.",
+        'kn': "ನಿಮ್ಮ ಬೆಳೆಗೆ ಕಡಿಮೆ ಅಪಾಯವಿದೆ. ಪ್ರಸ್ತುತ ಪರಿಸ್ಥಿತಿಗಳು ಅನುಕೂಲವಾಗಿವೆ.",
+        'ta': "உங்கள் பயிர் குறைந்த ஆபத்தில் உள்ளது. நடப்பு நிலைமைகள் சாதகமாக உள்ளன."
+    },
+    'Medium': {
+        'en': "Your crop has MEDIUM failure risk. Monitor closely and take precautions.",
+        'hi': "आपकी फसल पर मध्यम जोखिम है। बारीकी से निगरानी करें और सावधानियां बरतें।",
+        'mr': "तुमच्या पिकीला मध्यम जोखीम आहे. बारकाईने निरीक्षण करा आणि सावधानी घ्या.",
+        'kn': "ನಿಮ್ಮ ಬೆಳೆಗೆ ಮಧ್ಯಮ ಅಪಾಯವಿದೆ. ನಿಕಟವಾಗಿ ನೋಂದಾಯಿಸಿ ಮತ್ತು ಜಾಗರೂಕತೆ ವಹಿಸಿ.",
+        'ta': "உங்கள் பயிர் நடுத்தர ஆபத்தில் உள்ளது. நெருக்கமாக கண்காணிக்கவும் மற்றும் எச்சரிக்கை மெறுவும்."
+    },
+    'High': {
+        'en': "Your crop has HIGH failure risk. Urgent action required!",
+        'hi': "आपकी फसल पर उच्च जोखिम है। तत्काल कार्रवाई आवश्यक है!",
+        'mr': "तुमच्या पिकीला उच्च जोखीम आहे. तातडीने कार्रवाई आवश्यक आहे!",
+        'kn': "ನಿಮ್ಮ ಬೆಳೆಗೆ ಹೆಚ್ಚಿನ ಅಪಾಯವಿದೆ. ತುರ್ತು ಕ್ರಮ ಅವಶ್ಯಕ!",
+        'ta': "உங்கள் பயிர் அதிக ஆபத்தில் உள்ளது. உடனடி நடவடிக்கை தேவை!"
+    }
+}
+
+# Feature-specific recommendations
+FEATURE_RECOMMENDATIONS = {
+    'ndvi_mean': {
+        'en': 'Improve vegetation health through irrigation, fertilization, and pest management.',
+        'hi': 'सिंचाई, उर्वरीकरण और कीट प्रबंधन के माध्यम से वनस्पति स्वास्थ्य में सुधार करें।',
+        'mr': 'सिंचन, खतिज आणि कीटक व्यवस्थापन माध्यमातून वनस्पती आरोग्य सुधार करा.',
+        'kn': 'ನೀರಾವರ, ಸಾರಜನಕ ಸಮೃದ್ಧಿ ಮತ್ತು ಕೀಟ ನಿರ್ವಹಣೆ ಮೂಲಕ ಸಸ್ಯ ಆರೋಗ್ಯ ಸುಧಾರಿಸಿ.',
+        'ta': 'நீர்ப்பாசனம், உரം மற்றும் பூச்சி நிர்வாहம் மூலம் தாவರ ஆரோக்கியம் மேம்படுத்தவும்.'
+    },
+    'rainfall_deviation': {
+        'en': 'Manage water stress: use drip irrigation, mulching, and water conservation techniques.',
+        'hi': 'जल तनाव का प्रबंधन करें: ड्रिप सिंचाई, मल्चिंग और जल संरक्षण तकनीकों का उपयोग करें।',
+        'mr': 'पाणी ताणाची व्यवस्थापना: ड्रिप सिंचन, मल्चिंग आणि जल संरक्षण तंत्र वापरा.',
+        'kn': 'ಜಲ ಒತ್ತಡ ನಿರ್ವಹಿಸಿ: ಸೂಕ್ಷ್ಮ ನೀರಾವರ, ಮಲ್ಚಿಂಗ್ ಮತ್ತು ಜಲ ಸಂರಕ್ಷಣ ತಂತ್ರ ಬಳಸಿ.',
+        'ta': 'நீர் அழுத்தத்தை நிர்வகிக்கவும்: சொட்டு நீர்ப்பாசனம், முல்ச்ஞ் மற்றும் நீர் சேமிப்பு நுட்ப ஐ பயன்படுத்தவும்.'
+    },
+    'soil_moisture_index': {
+        'en': 'Increase soil moisture: optimize irrigation schedule, add organic matter, use mulch.',
+        'hi': 'मिट्टी की नमी बढ़ाएं: सिंचाई कार्यक्रम को अनुकूलित करें, जैविक पदार्थ जोड़ें, मल्च का उपयोग करें।',
+        'mr': 'मातीची ओलावा वाढवा: सिंचन वेळापत्रक अनुकूलित करा, जैविक पदार्थ जोडा, मल्च वापरा.',
+        'kn': 'ಮಣ್ಣಿನ ಆರ್ದ್ರತೆ ಹೆಚ್ಚಿಸಿ: ನೀರಾವರ ವೇಳಾಪಟ್ಟಿ ಉತ್ತಮ ಮಾಡಿ, ಜೈವಿಕ ವಸ್ತು ಸೇರಿಸಿ, ಮಲ್ಚ್ ಬಳಸಿ.',
+        'ta': 'மண் ஈரப்பதம் அதிகரிக்கவும்: பாசனம் அட்டவணை மேம்படுத்தவும், இயற்கை பொருள் சேர்க்கவும், முல்ச் பயன்படுத்தவும்.'
+    },
+    'pest_frequency': {
+        'en': 'Control pests: use integrated pest management (IPM), crop rotation, natural predators.',
+        'hi': 'कीटों पर नियंत्रण: एकीकृत कीट प्रबंधन (IPM), फसल चक्र, प्राकृतिक शिकारियों का उपयोग करें।',
+        'mr': 'कीटांवर नियंत्रण: संकलित कीटक व्यवस्थापन (IPM), पिक परिवर्तन, नैसर्गिक शिकारी वापरा.',
+        'kn': 'ಕೀಟಗಳನ್ನು ನಿಯಂತ್ರಿಸಿ: ಸಂಯೋಜಿತ ಕೀಟ ನಿರ್ವಹಣೆ (IPM), ಫಸಲ್ ತಿರುವು, ನೈಸರ್ಗಿಕ ಶಿಕಾರಿಗಳನ್ನು ಬಳಸಿ.',
+        'ta': 'பூச்சிகளைக் கட்டுப்படுத்தவும்: ஒருங்கிணைந்த பூச்சி நிர்வாहம் (IPM), பயிர் சுழற்சி, இயற்கை வேட்டைக்கார ஐ பயன்படுத்தவும்.'
+    },
+    'temperature_anomaly': {
+        'en': 'Mitigate heat stress: select heat-tolerant varieties, adjust sowing dates, use shade netting.',
+        'hi': 'गर्मी के तनाव को कम करें: गर्मी-सहिष्णु किस्में चुनें, बुवाई की तारीख समायोजित करें, छाया नेट का उपयोग करें।',
+        'mr': 'उष्णता ताण कमी करा: उष्णता-सहन करणारी वर्गणे निवडा, बुवाई तारीख समायोजित करा, सावळी जाळी वापरा.',
+        'kn': 'ಶಾಖ ಒತ್ತಡ ತಗ್ಗಿಸಿ: ಶಾಖ-ಸಹಿಷ್ಣು ಭೇದಗಳನ್ನು ಆಯ್ಕೆ ಮಾಡಿ, ಬಿತ್ತನೆ ದಿನಾಂಕ ಸರಿಹೊಂದಿಸಿ, ನೆರಳು ನೆಟ್ಟಿಂಗ ಬಳಸಿ.',
+        'ta': 'வெப்ப அழுத்தத்தைக் குறைக்கவும்: வெப்பம்-சகிப்புத்தன்மையுள்ள ཛ种்கள் தேர்ந்தெடுக்கவும், விதை நாட்கள் சரிசெய்யவும், நிழல் வலை பயன்படுத்தவும்.'
+    }
+}
+
+# Fixed action/contact sentences, by id
+ACTION_TEMPLATES = {
+    'consult_extension_officer': {
+        'en': 'Consult local agricultural extension officer immediately',
+        'hi': 'तुरंत स्थानीय कृषि विस्तार अधिकारी से सलाह लें',
+        'mr': 'ताशकरीने स्थानिक कृषी विस्तार अधिकाऱ्यांचा सल्ला घ्या',
+        'kn': 'ತಕ್ಷಣವೇ ಸ್ಥಳೀಯ ಕೃষಿ ವಿಸ್ತರಣ ಅಧಿಕಾರಿಗೆ ಸಂಪರ್ಕಿಸಿ',
+        'ta': 'உடனடியாக ஸ்தानीய கृषि விस्तार அधिकारีyoto ಸಂಪರ್ಕಿಸಿ'
+    },
+    'monitor_every_2_3_days': {
+        'en': 'Increase monitoring frequency to every 2-3 days',
+        'hi': 'निगरानी की आवृत्ति को हर 2-3 दिन में बढ़ाएं',
+        'mr': 'निरीक्षणाची वारंवारता २-३ दिनांत वाढवा',
+        'kn': 'ಪ್ರತಿ ೨-೩ ದಿನಗಳಿಗೊಮ್ಮೆ ನಿಗಾ ಆವೃತ್ತಿ ಹೆಚ್ಚಿಸಿ',
+        'ta': 'கண்காணிப்பு அதிர frequency 2-3 நாட்களிற்கு அதிகரிக்கவும்'
+    },
+    'monitor_every_3_5_days': {
+        'en': 'Monitor crop condition every 3-5 days',
+        'hi': 'हर 3-5 दिन में फसल की स्थिति की निगरानी करें',
+        'mr': 'प्रत्येक ३-५ दिनांत पिकीची स्थिति निरीक्षण करा',
+        'kn': 'ಪ್ರತಿ ೩-೫ ದಿನಗಳಿಗೊಮ್ಮೆ ಬೆಳೆಯ ಸ್ಥಿತಿ ಪರಿಶೀಲಿಸಿ',
+        'ta': 'ஒவ್வொரு 3-5 நாட்களிற்கு பயிர் நிலையை கண்காணிக்கவும்'
+    },
+    'continue_normal_practices': {
+        'en': 'Continue normal farming practices',
+        'hi': 'सामान्य कृषि प्रथाओं को जारी रखें',
+        'mr': 'सामान्य शेतकरी पद्धती सुरू ठेवा',
+        'kn': 'ಸಾಮಾನ್ಯ ಕೃಷಿ ಅಭ್ಯಾಸ ಮುಂದುವರಿಸಿ',
+        'ta': 'சாதாரண விவசாய நடைமுறை தொடரவும்'
+    },
+    'contact_extension_office': {
+        'en': 'Contact your local agricultural extension office for personalized guidance.',
+        'hi': 'व्यक्तिगत मार्गदर्शन के लिए अपने स्थानीय कृषि विस्तार कार्यालय से संपर्क करें।',
+        'mr': 'व्यक्तिगत मार्गदर्शनासाठी आपल्या स्थानिक कृषी विस्तार कार्यालयांचा संपर्क साधा.',
+        'kn': 'ವ್ಯಕ್ತಿಗತ ಮಾರ್ಗದರ್ಶನಕ್ಕಾಗಿ ನಿಮ್ಮ ಸ್ಥಳೀಯ ಕೃಷಿ ವಿಸ್ತರಣ ಕಚೇರಿಯನ್ನು ಸಂಪರ್ಕಿಸಿ.',
+        'ta': 'ஆளுக்ற கार्यदर्शनಕ್ಕಾಗಿ ನಿಮ್ಮ ಸ್ಥಳೀಯ कृषि विস्तार कार्यालयाशी संपर्क साधा.'
+    }
+}
+
+# Word for "Risk" in counterfactual opportunity lines
+RISK_LABELS = {
+    'en': 'Risk',
+    'hi': 'जोखिम',
+    'mr': 'जोखीम',
+    'kn': 'ಅಪಾಯ',
+    'ta': 'ஆபத்து'
+}
+
+# Enum ids: a value's position in these tuples
+LANGUAGES = ('en', 'hi', 'mr', 'kn', 'ta')
+RISK_LEVELS = ('Low', 'Medium', 'High')
+ACTIONS = tuple(ACTION_TEMPLATES)
+RECOMMENDATIONS = tuple(FEATURE_RECOMMENDATIONS)
+
+LANGUAGE_IDS = {language: i for i, language in enumerate(LANGUAGES)}
+RISK_LEVEL_IDS = {risk_level: i for i, risk_level in enumerate(RISK_LEVELS)}
+ACTION_IDS = {action: i for i, action in enumerate(ACTIONS)}
+RECOMMENDATION_IDS = {key: i for i, key in enumerate(RECOMMENDATIONS)}
+
+
+def _localized(templates, language):
+    """Template text in `language`, falling back to English."""
+    return templates.get(language, templates['en'])
+
+
+def _compile_tables():
+    """
+    Index every template as table[language id][item id], English fallback
+    included, plus one opportunity format string per language.
+    """
+    def table(templates, ids):
+        return tuple(
+            tuple(_localized(templates[item], language) for item in ids)
+            for language in LANGUAGES
+        )
+
+    return (
+        table(RISK_TEMPLATES, RISK_LEVELS),
+        table(ACTION_TEMPLATES, ACTIONS),
+        table(FEATURE_RECOMMENDATIONS, RECOMMENDATIONS),
+        tuple(f"{{}}: {{}} ({_localized(RISK_LABELS, language)}: {{}})" for language in LANGUAGES)
+    )
+
+
+SUMMARY_TABLE, ACTION_TABLE, RECOMMENDATION_TABLE, OPPORTUNITY_FORMATS = _compile_tables()
+CONTACT_ACTION = ACTION_IDS['contact_extension_office']
+
 
 class AdvisoryEngine:
     """Rule-based advisory system for farmer recommendations."""
     
     def __init__(self):
-        """Initialize advice templates and rules."""
+        """Reference the module's templates (compiled once at import, never rebuilt)."""
         self.language = 'en'  # Default to English
+        self.risk_templates = RISK_TEMPLATES
+        self.feature_recommendations = FEATURE_RECOMMENDATIONS
+        self.action_templates = ACTION_TEMPLATES
+        self.risk_labels = RISK_LABELS
+    
+    def compute_advisory(self, prediction, explanation, counterfactuals):
+        """
+        Decide the advisory content once, independent of language.
         
-        # Risk-based templates
-        self.risk_templates = {
-            'Low': {
-                'en': "Your crop has LOW failure risk. Current conditions are favorable.",
-                'hi': "आपकी फसल पर कम जोखिम है। वर्तमान स्थितियां अनुकूल हैं।",
-                'mr': "तुमच्या पिकीला कमी जोखीम आहे. वर्तमान परिस्थिती अनुकूल आहेत.",
-                'kn': "ನಿಮ್ಮ ಬೆಳೆಗೆ ಕಡಿಮೆ ಅಪಾಯವಿದೆ. ಪ್ರಸ್ತುತ ಪರಿಸ್ಥಿತಿಗಳು ಅನುಕೂಲವಾಗಿವೆ.",
-                'ta': "உங்கள் பயிர் குறைந்த ஆபத்தில் உள்ளது. நடப்பு நிலைமைகள் சாதகமாக உள்ளன."
-            },
-            'Medium': {
-                'en': "Your crop has MEDIUM failure risk. Monitor closely and take precautions.",
-                'hi': "आपकी फसल पर मध्यम जोखिम है। बारीकी से निगरानी करें और सावधानियां बरतें।",
-                'mr': "तुमच्या पिकीला मध्यम जोखीम आहे. बारकाईने निरीक्षण करा आणि सावधानी घ्या.",
-                'kn': "ನಿಮ್ಮ ಬೆಳೆಗೆ ಮಧ್ಯಮ ಅಪಾಯವಿದೆ. ನಿಕಟವಾಗಿ ನೋಂದಾಯಿಸಿ ಮತ್ತು ಜಾಗರೂಕತೆ ವಹಿಸಿ.",
-                'ta': "உங்கள் பயிர் நடுத்தர ஆபத்தில் உள்ளது. நெருக்கமாக கண்காணிக்கவும் மற்றும் எச்சரிக்கை மெறுவும்."
-            },
-            'High': {
-                'en': "Your crop has HIGH failure risk. Urgent action required!",
-                'hi': "आपकी फसल पर उच्च जोखिम है। तत्काल कार्रवाई आवश्यक है!",
-                'mr': "तुमच्या पिकीला उच्च जोखीम आहे. तातडीने कार्रवाई आवश्यक आहे!",
-                'kn': "ನಿಮ್ಮ ಬೆಳೆಗೆ ಹೆಚ್ಚಿನ ಅಪಾಯವಿದೆ. ತುರ್ತು ಕ್ರಮ ಅವಶ್ಯಕ!",
-                'ta': "உங்கள் பயிர் அதிக ஆபத்தில் உள்ளது. உடனடி நடவடிக்கை தேவை!"
+        Returns:
+            {
+                'risk_level': 'High',
+                'immediate_actions': ['consult_extension_officer', ...],  # ACTION_TEMPLATES ids
+                'preventive_measures': ['rainfall_deviation', ...],  # FEATURE_RECOMMENDATIONS keys
+                'opportunities': [{'scenario', 'actionable', 'new_risk_level'}, ...],
+                'confidence': 0.87
             }
-        }
+        """
+        risk_level = prediction['risk_level']
         
-        # Feature-specific recommendations
-        self.feature_recommendations = {
-            'ndvi_mean': {
-                'en': 'Improve vegetation health through irrigation, fertilization, and pest management.',
-                'hi': 'सिंचाई, उर्वरीकरण और कीट प्रबंधन के माध्यम से वनस्पति स्वास्थ्य में सुधार करें।',
-                'mr': 'सिंचन, खतिज आणि कीटक व्यवस्थापन माध्यमातून वनस्पती आरोग्य सुधार करा.',
-                'kn': 'ನೀರಾವರ, ಸಾರಜನಕ ಸಮೃದ್ಧಿ ಮತ್ತು ಕೀಟ ನಿರ್ವಹಣೆ ಮೂಲಕ ಸಸ್ಯ ಆರೋಗ್ಯ ಸುಧಾರಿಸಿ.',
-                'ta': 'நீர்ப்பாசனம், உரം மற்றும் பூச்சி நிர்வாहம் மூலம் தாவರ ஆரோக்கியம் மேம்படுத்தவும்.'
-            },
-            'rainfall_deviation': {
-                'en': 'Manage water stress: use drip irrigation, mulching, and water conservation techniques.',
-                'hi': 'जल तनाव का प्रबंधन करें: ड्रिप सिंचाई, मल्चिंग और जल संरक्षण तकनीकों का उपयोग करें।',
-                'mr': 'पाणी ताणाची व्यवस्थापना: ड्रिप सिंचन, मल्चिंग आणि जल संरक्षण तंत्र वापरा.',
-                'kn': 'ಜಲ ಒತ್ತಡ ನಿರ್ವಹಿಸಿ: ಸೂಕ್ಷ್ಮ ನೀರಾವರ, ಮಲ್ಚಿಂಗ್ ಮತ್ತು ಜಲ ಸಂರಕ್ಷಣ ತಂತ್ರ ಬಳಸಿ.',
-                'ta': 'நீர் அழுத்தத்தை நிர்வகிக்கவும்: சொட்டு நீர்ப்பாசனம், முல்ச்ஞ் மற்றும் நீர் சேமிப்பு நுட்ப ஐ பயன்படுத்தவும்.'
-            },
-            'soil_moisture_index': {
-                'en': 'Increase soil moisture: optimize irrigation schedule, add organic matter, use mulch.',
-                'hi': 'मिट्टी की नमी बढ़ाएं: सिंचाई कार्यक्रम को अनुकूलित करें, जैविक पदार्थ जोड़ें, मल्च का उपयोग करें।',
-                'mr': 'मातीची ओलावा वाढवा: सिंचन वेळापत्रक अनुकूलित करा, जैविक पदार्थ जोडा, मल्च वापरा.',
-                'kn': 'ಮಣ್ಣಿನ ಆರ್ದ್ರತೆ ಹೆಚ್ಚಿಸಿ: ನೀರಾವರ ವೇಳಾಪಟ್ಟಿ ಉತ್ತಮ ಮಾಡಿ, ಜೈವಿಕ ವಸ್ತು ಸೇರಿಸಿ, ಮಲ್ಚ್ ಬಳಸಿ.',
-                'ta': 'மண் ஈரப்பதம் அதிகரிக்கவும்: பாசனம் அட்டவணை மேம்படுத்தவும், இயற்கை பொருள் சேர்க்கவும், முல்ச் பயன்படுத்தவும்.'
-            },
-            'pest_frequency': {
-                'en': 'Control pests: use integrated pest management (IPM), crop rotation, natural predators.',
-                'hi': 'कीटों पर नियंत्रण: एकीकृत कीट प्रबंधन (IPM), फसल चक्र, प्राकृतिक शिकारियों का उपयोग करें।',
-                'mr': 'कीटांवर नियंत्रण: संकलित कीटक व्यवस्थापन (IPM), पिक परिवर्तन, नैसर्गिक शिकारी वापरा.',
-                'kn': 'ಕೀಟಗಳನ್ನು ನಿಯಂತ್ರಿಸಿ: ಸಂಯೋಜಿತ ಕೀಟ ನಿರ್ವಹಣೆ (IPM), ಫಸಲ್ ತಿರುವು, ನೈಸರ್ಗಿಕ ಶಿಕಾರಿಗಳನ್ನು ಬಳಸಿ.',
-                'ta': 'பூச்சிகளைக் கட்டுப்படுத்தவும்: ஒருங்கிணைந்த பூச்சி நிர்வாहம் (IPM), பயிர் சுழற்சி, இயற்கை வேட்டைக்கார ஐ பயன்படுத்தவும்.'
-            },
-            'temperature_anomaly': {
-                'en': 'Mitigate heat stress: select heat-tolerant varieties, adjust sowing dates, use shade netting.',
-                'hi': 'गर्मी के तनाव को कम करें: गर्मी-सहिष्णु किस्में चुनें, बुवाई की तारीख समायोजित करें, छाया नेट का उपयोग करें।',
-                'mr': 'उष्णता ताण कमी करा: उष्णता-सहन करणारी वर्गणे निवडा, बुवाई तारीख समायोजित करा, सावळी जाळी वापरा.',
-                'kn': 'ಶಾಖ ಒತ್ತಡ ತಗ್ಗಿಸಿ: ಶಾಖ-ಸಹಿಷ್ಣು ಭೇದಗಳನ್ನು ಆಯ್ಕೆ ಮಾಡಿ, ಬಿತ್ತನೆ ದಿನಾಂಕ ಸರಿಹೊಂದಿಸಿ, ನೆರಳು ನೆಟ್ಟಿಂಗ ಬಳಸಿ.',
-                'ta': 'வெப்ப அழுத்தத்தைக் குறைக்கவும்: வெப்பம்-சகிப்புத்தன்மையுள்ள ཛ种்கள் தேர்ந்தெடுக்கவும், விதை நாட்கள் சரிசெய்யவும், நிழல் வலை பயன்படுத்தவும்.'
+        # Preventive measures based on top risk features
+        preventive_measures = []
+        for feature_info in explanation['feature_importance'][:3]:
+            key = self._recommendation_key(feature_info['feature'])
+            if key is not None and key not in preventive_measures:
+                preventive_measures.append(key)
+        
+        # Opportunities from counterfactuals
+        opportunities = [
+            {
+                'scenario': cf['scenario'],
+                'actionable': cf['actionable'],
+                'new_risk_level': cf['new_risk_level']
             }
+            for cf in counterfactuals[:3]
+        ]
+        
+        return {
+            'risk_level': risk_level,
+            'immediate_actions': list(RISK_ACTIONS[risk_level]),
+            'preventive_measures': preventive_measures,
+            'opportunities': opportunities,
+            'confidence': prediction.get('confidence', 0.5)
         }
     
-    def generate_advisory(self, prediction, explanation, counterfactuals, language='en'):
+    def render_advisory(self, plan, language='en'):
         """
-        Generate comprehensive advisory for farmer.
+        Render a compute_advisory() plan in one language (English fallback).
         
         Returns:
             {
@@ -97,128 +260,78 @@ class AdvisoryEngine:
                 'preventive_measures': ['Measure 1', 'Measure 2', ...],
                 'opportunities': ['If NDVI improves, risk reduces...', ...],
                 'contact_info': 'Extension officer details',
-                'language': 'en'
+                'language': 'en',
+                'confidence': 0.87
             }
         """
+        language_id = LANGUAGE_IDS.get(language, 0)
+        actions = ACTION_TABLE[language_id]
+        recommendations = RECOMMENDATION_TABLE[language_id]
+        opportunity = OPPORTUNITY_FORMATS[language_id].format
+        return {
+            'summary': SUMMARY_TABLE[language_id][RISK_LEVEL_IDS[plan['risk_level']]],
+            'immediate_actions': [actions[ACTION_IDS[action]] for action in plan['immediate_actions']],
+            'preventive_measures': [
+                recommendations[RECOMMENDATION_IDS[key]] for key in plan['preventive_measures']
+            ],
+            'opportunities': [
+                opportunity(cf['scenario'], cf['actionable'], cf['new_risk_level'])
+                for cf in plan['opportunities']
+            ],
+            'contact_info': actions[CONTACT_ACTION],
+            'language': language,
+            'confidence': plan['confidence']
+        }
+    
+    def render_languages(self, plan, languages):
+        """Render one plan in several languages: {language: advisory}."""
+        return {language: self.render_advisory(plan, language) for language in languages}
+    
+    def render_many(self, plans, language='en'):
+        """Render many plans in one language (bulk/SMS broadcasts), in order."""
+        render = self.render_advisory
+        return [render(plan, language) for plan in plans]
+    
+    def validate_plan(self, plan):
+        """Raise ValueError if a client-supplied plan references unknown templates."""
+        try:
+            valid = (
+                plan['risk_level'] in RISK_LEVEL_IDS
+                and all(action in ACTION_IDS for action in plan['immediate_actions'])
+                and all(key in RECOMMENDATION_IDS for key in plan['preventive_measures'])
+                and all({'scenario', 'actionable', 'new_risk_level'} <= set(cf) for cf in plan['opportunities'])
+            )
+        except (KeyError, TypeError):
+            valid = False
+        if not valid:
+            raise ValueError("Invalid advisory plan")
+        plan.setdefault('confidence', 0.5)
+        return plan
+    
+    def validate_languages(self, languages):
+        """Raise ValueError unless `languages` is a non-empty list of supported language codes."""
+        if not isinstance(languages, list) or not languages:
+            raise ValueError("'languages' must be a non-empty list of language codes")
+        unsupported = [lang for lang in languages if not isinstance(lang, str) or lang not in LANGUAGES]
+        if unsupported:
+            raise ValueError(
+                f"Unsupported languages: {', '.join(map(str, unsupported))} (choose from {', '.join(LANGUAGES)})"
+            )
+        return list(dict.fromkeys(languages))
+    
+    def generate_advisory(self, prediction, explanation, counterfactuals, language='en'):
+        """
+        Generate comprehensive advisory for farmer (compute + render in one language).
+        
+        Returns:
+            render_advisory() result
+        """
         try:
             log_step("Advisory Generation", "in_progress")
             
             self.language = language
-            risk_level = prediction['risk_level']
-            probability = prediction['ensemble_probability']
-            top_features = explanation['feature_importance'][:3]
-            
-            # Summary based on risk level
-            summary = self.risk_templates[risk_level].get(language, self.risk_templates[risk_level]['en'])
-            
-            # Immediate actions
-            immediate_actions = []
-            if risk_level == 'High':
-                immediate_actions = [
-                    self._get_translation(
-                        'Consult local agricultural extension officer immediately',
-                        {
-                            'en': 'Consult local agricultural extension officer immediately',
-                            'hi': 'तुरंत स्थानीय कृषि विस्तार अधिकारी से सलाह लें',
-                            'mr': 'ताशकरीने स्थानिक कृषी विस्तार अधिकाऱ्यांचा सल्ला घ्या',
-                            'kn': 'ತಕ್ಷಣವೇ ಸ್ಥಳೀಯ ಕೃষಿ ವಿಸ್ತರಣ ಅಧಿಕಾರಿಗೆ ಸಂಪರ್ಕಿಸಿ',
-                            'ta': 'உடனடியாக ஸ்தानीய கृषि விस्तार அधिकारีyoto ಸಂಪರ್ಕಿಸಿ'
-                        }, language
-                    ),
-                    self._get_translation(
-                        'Increase monitoring frequency to every 2-3 days',
-                        {
-                            'en': 'Increase monitoring frequency to every 2-3 days',
-                            'hi': 'निगरानी की आवृत्ति को हर 2-3 दिन में बढ़ाएं',
-                            'mr': 'निरीक्षणाची वारंवारता २-३ दिनांत वाढवा',
-                            'kn': 'ಪ್ರತಿ ೨-೩ ದಿನಗಳಿಗೊಮ್ಮೆ ನಿಗಾ ಆವೃತ್ತಿ ಹೆಚ್ಚಿಸಿ',
-                            'ta': 'கண்காணிப்பு அதிர frequency 2-3 நாட்களிற்கு அதிகரிக்கவும்'
-                        }, language
-                    )
-                ]
-            elif risk_level == 'Medium':
-                immediate_actions = [
-                    self._get_translation(
-                        'Monitor crop condition every 3-5 days',
-                        {
-                            'en': 'Monitor crop condition every 3-5 days',
-                            'hi': 'हर 3-5 दिन में फसल की स्थिति की निगरानी करें',
-                            'mr': 'प्रत्येक ३-५ दिनांत पिकीची स्थिति निरीक्षण करा',
-                            'kn': 'ಪ್ರತಿ ೩-೫ ದಿನಗಳಿಗೊಮ್ಮೆ ಬೆಳೆಯ ಸ್ಥಿತಿ ಪರಿಶೀಲಿಸಿ',
-                            'ta': 'ஒவ್வொரு 3-5 நாட்களிற்கு பயிர் நிலையை கண்காணிக்கவும்'
-                        }, language
-                    )
-                ]
-            else:
-                immediate_actions = [
-                    self._get_translation(
-                        'Continue normal farming practices',
-                        {
-                            'en': 'Continue normal farming practices',
-                            'hi': 'सामान्य कृषि प्रथाओं को जारी रखें',
-                            'mr': 'सामान्य शेतकरी पद्धती सुरू ठेवा',
-                            'kn': 'ಸಾಮಾನ್ಯ ಕೃಷಿ ಅಭ್ಯಾಸ ಮುಂದುವರಿಸಿ',
-                            'ta': 'சாதாரண விவசாய நடைமுறை தொடரவும்'
-                        }, language
-                    )
-                ]
-            
-            # Preventive measures based on top risk features
-            preventive_measures = []
-            for feature_info in top_features:
-                feature = feature_info['feature'].lower()
-                if 'ndvi' in feature:
-                    rec = self.feature_recommendations['ndvi_mean'].get(language)
-                elif 'rainfall' in feature:
-                    rec = self.feature_recommendations['rainfall_deviation'].get(language)
-                elif 'moisture' in feature:
-                    rec = self.feature_recommendations['soil_moisture_index'].get(language)
-                elif 'pest' in feature:
-                    rec = self.feature_recommendations['pest_frequency'].get(language)
-                elif 'temperature' in feature:
-                    rec = self.feature_recommendations['temperature_anomaly'].get(language)
-                else:
-                    continue
-                
-                if rec and rec not in preventive_measures:
-                    preventive_measures.append(rec)
-            
-            # Opportunities from counterfactuals
-            opportunities = []
-            for cf in counterfactuals[:3]:
-                opportunity_text = self._get_translation(
-                    f"{cf['scenario']}: {cf['actionable']} (Risk: {cf['new_risk_level']})",
-                    {
-                        'en': f"{cf['scenario']}: {cf['actionable']} (Risk: {cf['new_risk_level']})",
-                        'hi': f"{cf['scenario']}: {cf['actionable']} (जोखिम: {cf['new_risk_level']})",
-                        'mr': f"{cf['scenario']}: {cf['actionable']} (जोखीम: {cf['new_risk_level']})",
-                        'kn': f"{cf['scenario']}: {cf['actionable']} (ಅಪಾಯ: {cf['new_risk_level']})",
-                        'ta': f"{cf['scenario']}: {cf['actionable']} (ஆபத்து: {cf['new_risk_level']})"
-                    }, language
-                )
-                opportunities.append(opportunity_text)
-            
-            # Contact info (template)
-            contact_info = self._get_translation(
-                'Contact your local agricultural extension office for personalized guidance.',
-                {
-                    'en': 'Contact your local agricultural extension office for personalized guidance.',
-                    'hi': 'व्यक्तिगत मार्गदर्शन के लिए अपने स्थानीय कृषि विस्तार कार्यालय से संपर्क करें।',
-                    'mr': 'व्यक्तिगत मार्गदर्शनासाठी आपल्या स्थानिक कृषी विस्तार कार्यालयांचा संपर्क साधा.',
-                    'kn': 'ವ್ಯಕ್ತಿಗತ ಮಾರ್ಗದರ್ಶನಕ್ಕಾಗಿ ನಿಮ್ಮ ಸ್ಥಳೀಯ ಕೃಷಿ ವಿಸ್ತರಣ ಕಚೇರಿಯನ್ನು ಸಂಪರ್ಕಿಸಿ.',
-                    'ta': 'ஆளுக்ற கार्यदर्शनಕ್ಕಾಗಿ ನಿಮ್ಮ ಸ್ಥಳೀಯ कृषि विস्तार कार्यालयाशी संपर्क साधा.'
-                }, language
-            )
-            
-            result = {
-                'summary': summary,
-                'immediate_actions': immediate_actions,
-                'preventive_measures': preventive_measures,
-                'opportunities': opportunities,
-                'contact_info': contact_info,
-                'language': language,
-                'confidence': prediction.get('confidence', 0.5)
-            }
+            plan = self.compute_advisory(prediction, explanation, counterfactuals)
+            result = self.render_advisory(plan, language)
             
             log_step("Advisory Generation", "success")
             
@@ -228,9 +341,15 @@ class AdvisoryEngine:
             logger.error(f"Advisory generation failed: {e}")
             raise
     
-    def _get_translation(self, english_text, translation_dict, language):
-        """Get translated text or fallback to English."""
-        return translation_dict.get(language, translation_dict.get('en', english_text))
+    @staticmethod
+    def _recommendation_key(feature):
+        """FEATURE_RECOMMENDATIONS key for a SHAP feature name, or None."""
+        feature = feature.lower()
+        for fragment, key in FEATURE_RECOMMENDATION_KEYS:
+            if fragment in feature:
+                return key
+        return None
+    
 
 
 # Singleton instance
@@ -249,3 +368,114 @@ def generate_advisory(prediction, explanation, counterfactuals, language='en'):
     """Unified advisory generation API."""
     engine = get_advisory_engine()
     return engine.generate_advisory(prediction, explanation, counterfactuals, language)
+
+
+def compute_advisory(prediction, explanation, counterfactuals):
+    """Language-independent advisory plan (see AdvisoryEngine.compute_advisory)."""
+    return get_advisory_engine().compute_advisory(prediction, explanation, counterfactuals)
+
+
+def render_advisory(plan, languages=('en',)):
+    """Render an advisory plan in each of `languages`: {language: advisory}."""
+    return get_advisory_engine().render_languages(plan, languages)
+
+
+def render_advisory_reference(plan, language='en'):
+    """Uncompiled render straight from the template dicts (reference for verify_rendering)."""
+    risk_label = _localized(RISK_LABELS, language)
+    return {
+        'summary': _localized(RISK_TEMPLATES[plan['risk_level']], language),
+        'immediate_actions': [_localized(ACTION_TEMPLATES[action], language) for action in plan['immediate_actions']],
+        'preventive_measures': [
+            _localized(FEATURE_RECOMMENDATIONS[key], language) for key in plan['preventive_measures']
+        ],
+        'opportunities': [
+            f"{cf['scenario']}: {cf['actionable']} ({risk_label}: {cf['new_risk_level']})"
+            for cf in plan['opportunities']
+        ],
+        'contact_info': _localized(ACTION_TEMPLATES['contact_extension_office'], language),
+        'language': language,
+        'confidence': plan['confidence']
+    }
+
+
+def sample_plans(n_plans, seed=0):
+    """Random but valid advisory plans (one per simulated district)."""
+    rng = random.Random(seed)
+    plans = []
+    for _ in range(n_plans):
+        risk_level = rng.choice(RISK_LEVELS)
+        plans.append({
+            'risk_level': risk_level,
+            'immediate_actions': list(RISK_ACTIONS[risk_level]),
+            'preventive_measures': rng.sample(RECOMMENDATIONS, rng.randint(0, 3)),
+            'opportunities': [
+                {
+                    'scenario': f'Increase soil moisture by {rng.choice((10, 15, 20))}%',
+                    'actionable': 'Increase irrigation frequency or add mulch to retain moisture',
+                    'new_risk_level': rng.choice(RISK_LEVELS)
+                }
+                for _ in range(rng.randint(0, 3))
+            ],
+            'confidence': rng.random()
+        })
+    return plans
+
+
+def verify_rendering(n_plans=2000, seed=0):
+    """Number of (plan, language) renders where compiled and reference output differ."""
+    engine = get_advisory_engine()
+    return sum(
+        engine.render_advisory(plan, language) != render_advisory_reference(plan, language)
+        for plan in sample_plans(n_plans, seed)
+        for language in LANGUAGES + ('xx',)  # Unknown language: English fallback
+    )
+
+
+def benchmark_rendering(n_plans=5000, language='hi', seed=0):
+    """
+    Render n_plans advisories (e.g. an SMS broadcast) with the compiled
+    tables and with the reference renderer.
+
+    Returns:
+        {'plans', 'compiled_us', 'reference_us' (mean per advisory),
+         'compiled_peak_bytes', 'reference_peak_bytes' (peak traced memory
+         while rendering them one at a time)}
+    """
+    engine = get_advisory_engine()
+    plans = sample_plans(n_plans, seed)
+
+    def measure(render):
+        def render_all():
+            for plan in plans:
+                render(plan, language)
+
+        render_all()  # Warm-up
+        start = time.perf_counter()
+        render_all()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        render_all()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed / n_plans * 1e6, peak
+
+    compiled_us, compiled_peak = measure(engine.render_advisory)
+    reference_us, reference_peak = measure(render_advisory_reference)
+    return {
+        'plans': n_plans,
+        'compiled_us': compiled_us,
+        'reference_us': reference_us,
+        'compiled_peak_bytes': compiled_peak,
+        'reference_peak_bytes': reference_peak
+    }
+
+
+if __name__ == '__main__':
+    log_step("Advisory Rendering Benchmark", "in_progress")
+    logger.info(f"Compiled vs reference mismatches: {verify_rendering()}")
+    result = benchmark_rendering()
+    logger.info(f"{result['plans']} advisories: compiled {result['compiled_us']:.2f} us, "
+                f"reference {result['reference_us']:.2f} us per advisory; peak traced memory "
+                f"{result['compiled_peak_bytes']} B vs {result['reference_peak_bytes']} B")
+    log_step("Advisory Rendering Benchmark", "success")
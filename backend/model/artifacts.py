@@ -0,0 +1,360 @@
+"""
+Ensemble Artifact Bundle - Versioned, memory-mapped model format
+
+The ensemble directory's seven pickles are unpickled into private memory
+by every process. A bundle stores the same inference state as plain
+arrays instead:
+
+    backend/model/saved/ensemble/bundle/
+        CURRENT              # Name of the active version, e.g. "v0003"
+        v0003/
+            manifest.json    # Format/version, array index, scalar params, metrics
+            rf.feature.npy, rf.threshold.npy, ... (flattened RF trees)
+            xgb.feature.npy, ...                  (flattened XGBoost trees)
+            scaler.mean.npy, scaler.scale.npy
+            scaler_meta.mean.npy, scaler_meta.scale.npy
+            meta.coef.npy
+
+Arrays are opened with np.load(mmap_mode='r'): loading is near-instant,
+and every process maps the same page-cache pages. A new version is written
+to its own directory and then activated by atomically replacing CURRENT,
+which the model registry picks up as a hot reload.
+
+The pickles remain the legacy format. Convert an existing pickle set with:
+    python -m backend.model.artifacts
+
+The manifest records the SHA-256 of the RF and XGBoost pickles the bundle
+was built from. Native models (predict_proba for large batches, TreeSHAP)
+are only used when the pickle on disk still has that hash; otherwise the
+bundle's flat arrays are the only model, so a process never scores or
+explains a mix of two trainings. Bundles written before hashes were
+recorded never match; convert the pickles again to pair them.
+
+Compressed variants (see compression.py) use the same format under
+COMPRESSED_BUNDLE_PATH. A 'pruned' variant stores a smaller RF/XGBoost; a
+'distilled' variant stores a single student model in place of the stack.
+Neither has matching pickles, so they are always scored with the flat
+evaluator (native_fallback is false).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+import numpy as np
+from backend.utils.helpers import setup_logger, log_step
+from backend.model.tree_arrays import FlatTreeEnsemble, flatten_random_forest, flatten_xgboost
+
+logger = setup_logger(__name__)
+
+ENSEMBLE_MODELS_PATH = 'backend/model/saved/ensemble/'
+BUNDLE_PATH = f'{ENSEMBLE_MODELS_PATH}bundle/'
+COMPRESSED_BUNDLE_PATH = f'{ENSEMBLE_MODELS_PATH}compressed/'
+BUNDLE_FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+BUNDLE_KEEP_VERSIONS = 3
+
+TREE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+# Pickle of each native tree model that a bundle can be matched against
+NATIVE_MODEL_FILES = {'rf': 'rf_model.pkl', 'xgb': 'xgb_model.pkl'}
+
+_file_hashes = {}  # path -> ((mtime, size), sha256)
+_file_hashes_lock = threading.Lock()
+
+
+def payload_sha256(payload):
+    """SHA-256 hex digest of serialized bytes."""
+    return hashlib.sha256(payload).hexdigest()
+
+
+def file_sha256(path):
+    """SHA-256 of a file, cached until its mtime or size changes; None if missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_mtime, stat.st_size)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+    with _file_hashes_lock:
+        _file_hashes[path] = (signature, sha256)
+    return sha256
+
+
+class ArrayScaler:
+    """StandardScaler.transform from stored mean_/scale_ arrays."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+
+
+class LinearMetaLearner:
+    """Binary LogisticRegression.predict_proba from stored coef_/intercept_."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict_proba(self, X):
+        margin = np.asarray(X, dtype=float) @ self.coef_[0] + self.intercept_[0]
+        positive = 1.0 / (1.0 + np.exp(-margin))
+        return np.column_stack([1 - positive, positive])
+
+
+class ModelBundle:
+    """Inference components loaded from a bundle version."""
+
+    def __init__(self, path, manifest, rf_flat, xgb_flat, scaler, scaler_meta, meta_learner, student_flat=None):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.variant = manifest.get('variant', 'full')
+        self.native_fallback = manifest.get('native_fallback', True)
+        self.native_hashes = manifest.get('native_models', {})
+        self.rf_flat = rf_flat
+        self.xgb_flat = xgb_flat
+        self.student_flat = student_flat
+        self.scaler = scaler
+        self.scaler_meta = scaler_meta
+        self.meta_learner = meta_learner
+        self.feature_importance = manifest['metadata'].get('feature_importance')
+        self.test_metrics = manifest['metadata'].get('test_metrics')
+
+    def matches_native(self, name, models_path=ENSEMBLE_MODELS_PATH):
+        """
+        True if the pickle of native model `name` ('rf' or 'xgb') is the one
+        this bundle was built from. Bundles without recorded hashes (older
+        versions, compressed variants) never match.
+        """
+        expected = self.native_hashes.get(name)
+        if not self.native_fallback or expected is None:
+            return False
+        return file_sha256(os.path.join(models_path, NATIVE_MODEL_FILES[name])) == expected
+
+
+def _jsonable(value):
+    """Convert nested metadata (numpy scalars/arrays) into JSON types."""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def current_bundle_path(root=BUNDLE_PATH):
+    """Directory of the active bundle version, or None if there is none."""
+    try:
+        with open(os.path.join(root, 'CURRENT')) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(root, name)
+    return path if os.path.isfile(os.path.join(path, 'manifest.json')) else None
+
+
+def _next_version(root):
+    versions = [
+        int(name[1:]) for name in os.listdir(root)
+        if name.startswith('v') and name[1:].isdigit()
+    ] if os.path.isdir(root) else []
+    return max(versions, default=0) + 1
+
+
+def _as_flat(model, flatten):
+    if model is None or isinstance(model, FlatTreeEnsemble):
+        return model
+    return flatten(model)
+
+
+def save_bundle(rf_model, xgb_model, meta_learner, scaler, scaler_meta,
+                feature_names, feature_importance=None, test_metrics=None,
+                source='training', root=BUNDLE_PATH, keep=BUNDLE_KEEP_VERSIONS,
+                student=None, variant='full', native_fallback=True, extra_metadata=None,
+                native_hashes=None):
+    """
+    Write a new bundle version from fitted models and make it current.
+
+    Tree models may be given fitted or already flattened; rf/xgb and the
+    meta-learner may be None when `student` (a flattened or fitted XGBoost
+    model) replaces the stack. `native_hashes` ({'rf': sha256, 'xgb': ...})
+    identifies the pickles of the same models; without it the bundle is
+    never paired with pickles.
+
+    Returns:
+        Path of the new version directory
+    """
+    log_step("Saving Artifact Bundle", "in_progress")
+    os.makedirs(root, exist_ok=True)
+
+    version = _next_version(root)
+    name = f'v{version:04d}'
+    staging = tempfile.mkdtemp(prefix=f'.{name}-', dir=root)
+
+    arrays = {}
+    params = {}
+
+    def add(key, array):
+        array = np.ascontiguousarray(array)
+        filename = f'{key}.npy'
+        np.save(os.path.join(staging, filename), array)
+        arrays[key] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    try:
+        flats = (
+            ('rf', _as_flat(rf_model, flatten_random_forest)),
+            ('xgb', _as_flat(xgb_model, flatten_xgboost)),
+            ('student', _as_flat(student, flatten_xgboost))
+        )
+        for prefix, flat in flats:
+            if flat is None:
+                continue
+            for array_name, array in flat.arrays().items():
+                add(f'{prefix}.{array_name}', array)
+            params[prefix] = {'kind': flat.kind, 'max_depth': flat.max_depth, 'base_margin': flat.base_margin}
+
+        add('scaler.mean', scaler.mean_)
+        add('scaler.scale', scaler.scale_)
+        if meta_learner is not None:
+            add('scaler_meta.mean', scaler_meta.mean_)
+            add('scaler_meta.scale', scaler_meta.scale_)
+            add('meta.coef', meta_learner.coef_)
+            params['meta'] = {'intercept': _jsonable(np.ravel(meta_learner.intercept_))}
+
+        manifest = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'variant': variant,
+            'native_fallback': native_fallback,
+            'native_models': dict(native_hashes or {}),
+            'feature_names': list(feature_names),
+            'arrays': arrays,
+            'params': params,
+            'metadata': {
+                'feature_importance': _jsonable(feature_importance),
+                'test_metrics': _jsonable(test_metrics),
+                **_jsonable(extra_metadata or {})
+            }
+        }
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        path = os.path.join(root, name)
+        os.rename(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Activate atomically; readers see either the old or the new version
+    pointer = os.path.join(root, 'CURRENT.tmp')
+    with open(pointer, 'w') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, 'CURRENT'))
+
+    _prune_versions(root, keep)
+    log_step("Saving Artifact Bundle", "success", f"({path})")
+    return path
+
+
+def _prune_versions(root, keep):
+    """Delete all but the newest `keep` versions (open memory maps stay valid)."""
+    versions = sorted(
+        name for name in os.listdir(root)
+        if name.startswith('v') and name[1:].isdigit()
+    )
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def load_bundle(path):
+    """Open a bundle version with every array memory-mapped read-only."""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported bundle format: {manifest.get('format_version')}")
+
+    def array(key):
+        entry = manifest['arrays'][key]
+        return np.load(os.path.join(path, entry['file']), mmap_mode='r')
+
+    def flat(prefix):
+        if prefix not in manifest['params']:
+            return None
+        params = manifest['params'][prefix]
+        return FlatTreeEnsemble(
+            kind=params['kind'],
+            max_depth=params['max_depth'],
+            base_margin=params['base_margin'],
+            **{name: array(f'{prefix}.{name}') for name in TREE_ARRAYS}
+        )
+
+    has_meta = 'meta' in manifest['params']
+    return ModelBundle(
+        path=path,
+        manifest=manifest,
+        rf_flat=flat('rf'),
+        xgb_flat=flat('xgb'),
+        student_flat=flat('student'),
+        scaler=ArrayScaler(array('scaler.mean'), array('scaler.scale')),
+        scaler_meta=ArrayScaler(array('scaler_meta.mean'), array('scaler_meta.scale')) if has_meta else None,
+        meta_learner=LinearMetaLearner(
+            array('meta.coef'), np.array(manifest['params']['meta']['intercept'])
+        ) if has_meta else None
+    )
+
+
+def load_current_bundle(pointer_path):
+    """Registry loader: open the version named by a CURRENT pointer file."""
+    path = current_bundle_path(os.path.dirname(pointer_path))
+    if path is None:
+        raise FileNotFoundError(f"No bundle version referenced by {pointer_path}")
+    return load_bundle(path)
+
+
+def convert_pickles(models_path=ENSEMBLE_MODELS_PATH, root=BUNDLE_PATH):
+    """Legacy import: build a bundle from the ensemble directory's pickles."""
+    from backend.model.registry import get_model_registry
+    from backend.preprocessing.feature_engineering import FEATURE_NAMES
+
+    registry = get_model_registry()
+    return save_bundle(
+        rf_model=registry.load(f'{models_path}rf_model.pkl'),
+        xgb_model=registry.load(f'{models_path}xgb_model.pkl'),
+        meta_learner=registry.load(f'{models_path}meta_learner.pkl'),
+        scaler=registry.load(f'{models_path}scaler.pkl'),
+        scaler_meta=registry.load(f'{models_path}scaler_meta.pkl'),
+        feature_names=FEATURE_NAMES,
+        feature_importance=registry.load_optional(f'{models_path}feature_importance.pkl'),
+        test_metrics=registry.load_optional(f'{models_path}test_metrics.pkl'),
+        source='pickle',
+        root=root,
+        native_hashes={
+            name: file_sha256(f'{models_path}{filename}')
+            for name, filename in NATIVE_MODEL_FILES.items()
+        }
+    )
+
+
+if __name__ == '__main__':
+    convert_pickles()
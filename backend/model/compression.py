@@ -0,0 +1,274 @@
+"""
+Model Compression - Tree pruning and distillation of the stacked ensemble
+
+The 300-tree, depth-20 Random Forest dominates inference time and memory.
+This stage searches for a cheaper model within COMPRESSION_MAX_AUC_DROP of
+the full ensemble's AUC on a held-out set:
+- Pruned stack: the first k RF trees (the trees are i.i.d., so any
+  subset is an unbiased smaller forest), RF depth capped at d (internal
+  nodes at depth d become leaves predicting their training class
+  fraction), and the first r XGBoost rounds. The meta-learner is kept.
+- Distilled student: one small XGBoost model fitted to the full
+  ensemble's probabilities on a synthetic transfer set.
+
+Pruning works on the flattened trees (tree_arrays), so every candidate is
+scored from one pass of per-tree leaf values. Latency is the single-row
+time of the flat evaluator, which is the path the API uses.
+
+The fastest accepted candidate is written as a bundle version under
+COMPRESSED_BUNDLE_PATH. EnsemblePredictor serves it when
+ENSEMBLE_VARIANT=compressed; the full bundle is left untouched.
+
+Usage:
+    python -m backend.model.compression          # search and write the bundle
+    python -m backend.model.compression report   # search only
+"""
+
+import sys
+import time
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from backend.utils.helpers import setup_logger, log_step
+from backend.utils.config import COMPRESSION_MAX_AUC_DROP
+from backend.model.registry import get_model_registry
+from backend.model.tree_arrays import (
+    flatten_random_forest, flatten_xgboost, subset_trees, truncate_depth
+)
+from backend.model.artifacts import (
+    ArrayScaler, LinearMetaLearner, COMPRESSED_BUNDLE_PATH, save_bundle
+)
+
+logger = setup_logger(__name__)
+
+ENSEMBLE_MODELS_PATH = 'backend/model/saved/ensemble/'
+
+PRUNE_RF_TREES = [25, 50, 100, 150, 200, 300]
+PRUNE_RF_DEPTHS = [6, 8, 10, 12, None]
+PRUNE_XGB_ROUNDS = [25, 50, 100, 200, 300]
+
+# (boosting rounds, max depth) of the distilled student
+STUDENT_CONFIGS = [(50, 3), (100, 4), (200, 4), (200, 6), (300, 6)]
+
+HOLDOUT_SAMPLES = 5000
+HOLDOUT_SEED = 2024
+TRANSFER_SAMPLES = 20000
+TRANSFER_SEED = 2025
+LATENCY_REPEATS = 100
+
+
+def _sigmoid(margin):
+    return 1.0 / (1.0 + np.exp(-margin))
+
+
+def _single_row_ms(score, row, repeats=LATENCY_REPEATS):
+    """Median milliseconds for one call of score(row)."""
+    score(row)  # Warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        score(row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+class EnsembleCompressor:
+    """Search pruned and distilled versions of the saved ensemble."""
+
+    def __init__(self, max_auc_drop=COMPRESSION_MAX_AUC_DROP,
+                 holdout_samples=HOLDOUT_SAMPLES, transfer_samples=TRANSFER_SAMPLES):
+        self.max_auc_drop = max_auc_drop
+        self.holdout_samples = holdout_samples
+        self.transfer_samples = transfer_samples
+
+        registry = get_model_registry()
+        self.rf_model = registry.load(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl')
+        self.xgb_model = registry.load(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl')
+        meta_learner = registry.load(f'{ENSEMBLE_MODELS_PATH}meta_learner.pkl')
+        scaler_meta = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler_meta.pkl')
+        self.scaler = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler.pkl')
+        self.feature_importance = registry.load_optional(f'{ENSEMBLE_MODELS_PATH}feature_importance.pkl')
+        self.test_metrics = registry.load_optional(f'{ENSEMBLE_MODELS_PATH}test_metrics.pkl')
+
+        # Array versions, as served from a bundle
+        self.scaler_meta = ArrayScaler(scaler_meta.mean_, scaler_meta.scale_)
+        self.meta_learner = LinearMetaLearner(meta_learner.coef_, np.ravel(meta_learner.intercept_))
+        self.rf_flat = flatten_random_forest(self.rf_model)
+        self.xgb_flat = flatten_xgboost(self.xgb_model)
+
+    def _stack(self, rf_prob, xgb_prob):
+        meta_features = self.scaler_meta.transform(np.column_stack([rf_prob, xgb_prob]))
+        return self.meta_learner.predict_proba(meta_features)[:, 1]
+
+    def _scaled_data(self, n_samples, seed):
+        from backend.preprocessing.synthetic_data import generate_training_data
+        X, y = generate_training_data(n_samples, profile='ensemble', seed=seed)
+        return self.scaler.transform(X), y
+
+    def _summary(self, y, probability, reference, latency_ms, baseline):
+        auc = roc_auc_score(y, probability)
+        tiers = np.digitize(probability, [0.33, 0.67])
+        return {
+            'auc': float(auc),
+            'auc_drop': float(baseline['auc'] - auc) if baseline else 0.0,
+            'mean_abs_diff': float(np.mean(np.abs(probability - reference))),
+            'tier_agreement': float(np.mean(tiers == np.digitize(reference, [0.33, 0.67]))),
+            'single_row_ms': latency_ms,
+            'speedup': baseline['single_row_ms'] / latency_ms if baseline else 1.0
+        }
+
+    def pruned_candidates(self, X, y, reference, baseline):
+        """Evaluate every (RF trees, RF depth, XGBoost rounds) combination."""
+        n_rf = self.rf_flat.n_trees
+        n_xgb = self.xgb_flat.n_trees
+        xgb_margins = self.xgb_flat.base_margin + np.cumsum(self.xgb_flat.leaf_values(X), axis=1)
+        row = X[:1]
+
+        candidates = []
+        for depth in PRUNE_RF_DEPTHS:
+            rf_depth = truncate_depth(self.rf_flat, depth) if depth else self.rf_flat
+            rf_leaves = rf_depth.leaf_values(X)
+            for n_trees in (t for t in PRUNE_RF_TREES if t <= n_rf):
+                rf = subset_trees(rf_depth, range(n_trees)) if n_trees < n_rf else rf_depth
+                rf_prob = rf_leaves[:, :n_trees].mean(axis=1)
+                for n_rounds in (r for r in PRUNE_XGB_ROUNDS if r <= n_xgb):
+                    xgb_flat = subset_trees(self.xgb_flat, range(n_rounds)) if n_rounds < n_xgb else self.xgb_flat
+                    probability = self._stack(rf_prob, _sigmoid(xgb_margins[:, n_rounds - 1]))
+                    latency = _single_row_ms(
+                        lambda x, rf=rf, xgb_flat=xgb_flat: self._stack(rf.predict_proba(x), xgb_flat.predict_proba(x)),
+                        row
+                    )
+                    candidates.append(dict(
+                        self._summary(y, probability, reference, latency, baseline),
+                        variant='pruned',
+                        config={'rf_trees': n_trees, 'rf_depth': depth, 'xgb_rounds': n_rounds},
+                        n_nodes=rf.n_nodes + xgb_flat.n_nodes,
+                        models={'rf': rf, 'xgb': xgb_flat}
+                    ))
+        return candidates
+
+    def distilled_candidates(self, X, y, reference, baseline):
+        """Fit small XGBoost students to the full ensemble's probabilities."""
+        X_transfer, _ = self._scaled_data(self.transfer_samples, TRANSFER_SEED)
+        teacher = self._stack(self.rf_flat.predict_proba(X_transfer), self.xgb_flat.predict_proba(X_transfer))
+        row = X[:1]
+
+        candidates = []
+        for n_rounds, depth in STUDENT_CONFIGS:
+            student = xgb.XGBRegressor(
+                objective='binary:logistic',
+                n_estimators=n_rounds,
+                max_depth=depth,
+                learning_rate=0.1,
+                subsample=0.8,
+                random_state=42,
+                n_jobs=-1,
+                verbosity=0
+            )
+            student.fit(X_transfer, teacher)
+            student_flat = flatten_xgboost(student)
+            probability = student_flat.predict_proba(X)
+            latency = _single_row_ms(student_flat.predict_proba, row)
+            candidates.append(dict(
+                self._summary(y, probability, reference, latency, baseline),
+                variant='distilled',
+                config={'student_rounds': n_rounds, 'student_depth': depth},
+                n_nodes=student_flat.n_nodes,
+                models={'student': student_flat}
+            ))
+        return candidates
+
+    def run(self, save=True):
+        """
+        Search all candidates, pick the fastest one within max_auc_drop and
+        (optionally) write it as the compressed bundle.
+
+        Returns:
+            {'baseline': {...}, 'selected': {...} or None, 'saved_path': str or None,
+             'candidates': [...sorted by latency...]}
+        """
+        log_step("Ensemble Compression", "in_progress", f"(max AUC drop {self.max_auc_drop})")
+        X, y = self._scaled_data(self.holdout_samples, HOLDOUT_SEED)
+
+        reference = self._stack(self.rf_flat.predict_proba(X), self.xgb_flat.predict_proba(X))
+        latency = _single_row_ms(
+            lambda x: self._stack(self.rf_flat.predict_proba(x), self.xgb_flat.predict_proba(x)), X[:1]
+        )
+        baseline = dict(
+            self._summary(y, reference, reference, latency, None),
+            variant='full',
+            config={'rf_trees': self.rf_flat.n_trees, 'rf_depth': self.rf_flat.max_depth,
+                    'xgb_rounds': self.xgb_flat.n_trees},
+            n_nodes=self.rf_flat.n_nodes + self.xgb_flat.n_nodes
+        )
+
+        candidates = self.pruned_candidates(X, y, reference, baseline)
+        candidates += self.distilled_candidates(X, y, reference, baseline)
+        candidates.sort(key=lambda c: c['single_row_ms'])
+
+        accepted = [c for c in candidates if c['auc_drop'] <= self.max_auc_drop]
+        selected = accepted[0] if accepted else None
+
+        saved_path = None
+        if selected is not None and save:
+            saved_path = self.save(selected, baseline)
+
+        log_step("Ensemble Compression", "success",
+                 f"(selected: {selected['variant'] if selected else None} "
+                 f"{selected['config'] if selected else ''})")
+        return {
+            'baseline': baseline,
+            'selected': _public(selected),
+            'saved_path': saved_path,
+            'candidates': [_public(c) for c in candidates]
+        }
+
+    def save(self, selected, baseline):
+        """Write the selected candidate as a new compressed bundle version."""
+        from backend.preprocessing.feature_engineering import FEATURE_NAMES
+
+        models = selected['models']
+        distilled = selected['variant'] == 'distilled'
+        return save_bundle(
+            rf_model=models.get('rf'),
+            xgb_model=models.get('xgb'),
+            student=models.get('student'),
+            meta_learner=None if distilled else self.meta_learner,
+            scaler=self.scaler,
+            scaler_meta=None if distilled else self.scaler_meta,
+            feature_names=FEATURE_NAMES,
+            feature_importance=self.feature_importance,
+            test_metrics=self.test_metrics,
+            source='compression',
+            root=COMPRESSED_BUNDLE_PATH,
+            variant=selected['variant'],
+            native_fallback=False,
+            extra_metadata={'compression': {
+                'selected': _public(selected),
+                'baseline': baseline,
+                'max_auc_drop': self.max_auc_drop
+            }}
+        )
+
+
+def _public(candidate):
+    """Candidate summary without the model objects."""
+    if candidate is None:
+        return None
+    return {key: value for key, value in candidate.items() if key != 'models'}
+
+
+def compress_ensemble(max_auc_drop=COMPRESSION_MAX_AUC_DROP, save=True):
+    """Main entry point: search and write the compressed ensemble bundle."""
+    return EnsembleCompressor(max_auc_drop=max_auc_drop).run(save=save)
+
+
+if __name__ == '__main__':
+    result = compress_ensemble(save=not (len(sys.argv) > 1 and sys.argv[1] == 'report'))
+    base = result['baseline']
+    logger.info(f"Full ensemble: AUC {base['auc']:.4f}, {base['single_row_ms']:.3f} ms/row, {base['n_nodes']} nodes")
+    for c in result['candidates'][:15]:
+        logger.info(f"{c['variant']:9} {str(c['config']):60} AUC {c['auc']:.4f} (drop {c['auc_drop']:+.4f}) "
+                    f"tiers {c['tier_agreement']:.3f} {c['single_row_ms']:.3f} ms ({c['speedup']:.1f}x) {c['n_nodes']} nodes")
+    logger.info(f"Selected: {result['selected']}")
+    logger.info(f"Saved: {result['saved_path']}")
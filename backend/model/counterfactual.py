@@ -5,13 +5,32 @@ Generates actionable "what-if" scenarios for farmers.
 Example: "If NDVI improves by 0.1, risk reduces to Medium"
 """
 
+import time
 import numpy as np
 from backend.model.ensemble import get_ensemble_predictor
-from backend.preprocessing.feature_engineering import prepare_feature_vector
+from backend.preprocessing.feature_engineering import FeatureContext
+from backend.utils.config import (
+    COUNTERFACTUAL_SEARCH_BUDGET, COUNTERFACTUAL_SEARCH_DEADLINE, COUNTERFACTUAL_SEARCH_BATCH
+)
 from backend.utils.helpers import setup_logger, log_step
 
 logger = setup_logger(__name__)
 
+RISK_TIERS = ['Low', 'Medium', 'High']
+
+# Actionable features explored by the minimal counterfactual search, with the
+# normalized value each one can realistically be moved toward
+SEARCH_TARGETS = {
+    'ndvi_mean': 0.85,
+    'soil_moisture_index': 0.95,
+    'pest_frequency': 0.0,
+    'rainfall_deviation': 0.5,  # Normal rainfall
+    'temperature_anomaly': 0.5  # No temperature anomaly
+}
+
+# Fractions of the way toward each target tried per feature
+SEARCH_STEPS = np.linspace(0, 1, 6)
+
 
 class CounterfactualGenerator:
     """Generate what-if scenarios for farmer recommendations."""
@@ -37,10 +56,13 @@ class CounterfactualGenerator:
             'pest_frequency': 'Pest Activity'
         }
     
-    def generate_counterfactuals(self, state, district, crop, season, original_prediction):
+    def generate_counterfactuals(self, state, district, crop, season, original_prediction, context=None):
         """
         Generate what-if scenarios by varying top features.
         
+        If a FeatureContext is given, scenarios are built from its features
+        instead of running ingestion again.
+        
         Returns:
             [
                 {
@@ -58,11 +80,14 @@ class CounterfactualGenerator:
             log_step("Counterfactual Generation", "in_progress")
             
             # Get original features
-            norm_features, raw_features = prepare_feature_vector(state, district, crop, season)
+            if context is None:
+                context = FeatureContext.build(state, district, crop, season)
+            norm_features = context.normalized_features
             
             original_prob = original_prediction['ensemble_probability']
             
-            counterfactuals = []
+            # Build every candidate scenario first, then score them in one batch
+            candidates = []  # (modified features, scenario fields, impact text when risk does not drop)
             
             # 1. Increase NDVI (best agricultural practice)
             if norm_features.get('ndvi_mean', 0.5) < 0.85:
@@ -71,46 +96,30 @@ class CounterfactualGenerator:
                     new_ndvi = min(0.85, norm_features['ndvi_mean'] + delta)
                     new_norm_features['ndvi_mean'] = new_ndvi
                     
-                    new_pred = self._predict_with_modified_features(new_norm_features)
-                    prob_change = new_pred['ensemble_probability'] - original_prob
-                    risk_reduction = abs(prob_change) * 100
-                    
-                    counterfactuals.append({
+                    candidates.append((new_norm_features, {
                         'scenario': f'Improve vegetation health by {delta:.1%}',
                         'feature': 'NDVI Mean',
                         'change_amount': f'+{delta:.1%}',
                         'current_value': f"{norm_features['ndvi_mean']:.3f}",
                         'new_value': f"{new_ndvi:.3f}",
-                        'new_probability': new_pred['ensemble_probability'],
-                        'new_risk_level': new_pred['risk_level'],
-                        'probability_change': prob_change,
-                        'impact': f"Risk reduces by {risk_reduction:.1f}%" if prob_change < 0 else f"Risk increases by {risk_reduction:.1f}%",
                         'actionable': 'Improve irrigation, soil health, and pest management to boost vegetation'
-                    })
+                    }, 'Risk increases by {change:.1f}%'))
             
             # 2. Reduce rainfall deviation (mitigate drought/excess)
             if abs(norm_features.get('rainfall_deviation', 0)) > 5:
                 for improvement in [0.2, 0.35, 0.50]:
                     new_norm_features = norm_features.copy()
-                    current_deficit = abs(norm_features['rainfall_deviation'])
                     new_rainfall_dev = norm_features['rainfall_deviation'] * (1 - improvement)
                     new_norm_features['rainfall_deviation'] = new_rainfall_dev
                     
-                    new_pred = self._predict_with_modified_features(new_norm_features)
-                    prob_change = new_pred['ensemble_probability'] - original_prob
-                    
-                    counterfactuals.append({
+                    candidates.append((new_norm_features, {
                         'scenario': f'Improve rainfall by {improvement:.0%}',
                         'feature': 'Rainfall Deviation',
                         'change_amount': f'{improvement:.0%} normalization',
                         'current_value': f"{norm_features['rainfall_deviation']:.1f}%",
                         'new_value': f"{new_rainfall_dev:.1f}%",
-                        'new_probability': new_pred['ensemble_probability'],
-                        'new_risk_level': new_pred['risk_level'],
-                        'probability_change': prob_change,
-                        'impact': f"Risk reduces by {abs(prob_change)*100:.1f}%" if prob_change < 0 else f"Risk increases",
                         'actionable': 'Use drip irrigation or increase water management during dry season'
-                    })
+                    }, 'Risk increases'))
             
             # 3. Increase soil moisture (directly actionable)
             if norm_features.get('soil_moisture_index', 0.5) < 0.85:
@@ -119,21 +128,14 @@ class CounterfactualGenerator:
                     new_moisture = min(0.95, norm_features['soil_moisture_index'] + delta)
                     new_norm_features['soil_moisture_index'] = new_moisture
                     
-                    new_pred = self._predict_with_modified_features(new_norm_features)
-                    prob_change = new_pred['ensemble_probability'] - original_prob
-                    
-                    counterfactuals.append({
+                    candidates.append((new_norm_features, {
                         'scenario': f'Increase soil moisture by {delta:.0%}',
                         'feature': 'Soil Moisture',
                         'change_amount': f'+{delta:.0%}',
                         'current_value': f"{norm_features['soil_moisture_index']:.1%}",
                         'new_value': f"{new_moisture:.1%}",
-                        'new_probability': new_pred['ensemble_probability'],
-                        'new_risk_level': new_pred['risk_level'],
-                        'probability_change': prob_change,
-                        'impact': f"Risk reduces by {abs(prob_change)*100:.1f}%" if prob_change < 0 else "Risk unchanged",
                         'actionable': 'Increase irrigation frequency or add mulch to retain moisture'
-                    })
+                    }, 'Risk unchanged'))
             
             # 4. Reduce pest frequency (integrated pest management)
             if norm_features.get('pest_frequency', 0) > 0.05:
@@ -142,21 +144,14 @@ class CounterfactualGenerator:
                     new_pest_freq = max(0, norm_features['pest_frequency'] * (1 - reduction))
                     new_norm_features['pest_frequency'] = new_pest_freq
                     
-                    new_pred = self._predict_with_modified_features(new_norm_features)
-                    prob_change = new_pred['ensemble_probability'] - original_prob
-                    
-                    counterfactuals.append({
+                    candidates.append((new_norm_features, {
                         'scenario': f'Reduce pest activity by {reduction:.0%}',
                         'feature': 'Pest Frequency',
                         'change_amount': f'-{reduction:.0%}',
                         'current_value': f"{norm_features['pest_frequency']:.1%}",
                         'new_value': f"{new_pest_freq:.1%}",
-                        'new_probability': new_pred['ensemble_probability'],
-                        'new_risk_level': new_pred['risk_level'],
-                        'probability_change': prob_change,
-                        'impact': f"Risk reduces by {abs(prob_change)*100:.1f}%" if prob_change < 0 else "Risk unchanged",
                         'actionable': 'Use integrated pest management (IPM): crop rotation, biocontrols, targeted spraying'
-                    })
+                    }, 'Risk unchanged'))
             
             # 5. Reduce temperature anomaly (seasonal adaptation)
             if abs(norm_features.get('temperature_anomaly', 0)) > 1:
@@ -164,20 +159,28 @@ class CounterfactualGenerator:
                 new_temp_anom = norm_features['temperature_anomaly'] * 0.5  # Reduce by 50%
                 new_norm_features['temperature_anomaly'] = new_temp_anom
                 
-                new_pred = self._predict_with_modified_features(new_norm_features)
-                prob_change = new_pred['ensemble_probability'] - original_prob
-                
-                counterfactuals.append({
+                candidates.append((new_norm_features, {
                     'scenario': 'Mitigate temperature stress',
                     'feature': 'Temperature Anomaly',
                     'change_amount': '-50%',
                     'current_value': f"{norm_features['temperature_anomaly']:.1f}°C",
                     'new_value': f"{new_temp_anom:.1f}°C",
+                    'actionable': 'Use shade netting, select heat-tolerant varieties, or adjust sowing dates'
+                }, 'Risk unchanged'))
+            
+            # Score all scenarios with one pass through the scaler, RF, XGBoost and meta-learner
+            predictions = self._predict_batch([features for features, _, _ in candidates])
+            
+            counterfactuals = []
+            for (_, scenario, otherwise), new_pred in zip(candidates, predictions):
+                prob_change = new_pred['ensemble_probability'] - original_prob
+                change = abs(prob_change) * 100
+                counterfactuals.append({
+                    **scenario,
                     'new_probability': new_pred['ensemble_probability'],
                     'new_risk_level': new_pred['risk_level'],
                     'probability_change': prob_change,
-                    'impact': f"Risk reduces by {abs(prob_change)*100:.1f}%" if prob_change < 0 else "Risk unchanged",
-                    'actionable': 'Use shade netting, select heat-tolerant varieties, or adjust sowing dates'
+                    'impact': f"Risk reduces by {change:.1f}%" if prob_change < 0 else otherwise.format(change=change)
                 })
             
             # Sort by impact magnitude (descending)
@@ -194,52 +197,163 @@ class CounterfactualGenerator:
             logger.error(f"Counterfactual generation failed: {e}")
             return []
     
-    def _predict_with_modified_features(self, modified_norm_features):
-        """Make prediction with modified features."""
-        try:
-            feature_vector = np.array([
-                modified_norm_features.get('ndvi_mean', 0.5),
-                modified_norm_features.get('ndvi_trend', 0),
-                modified_norm_features.get('ndvi_variance', 0.03),
-                modified_norm_features.get('rainfall_deviation', 0),
-                modified_norm_features.get('temperature_anomaly', 0),
-                modified_norm_features.get('soil_moisture_index', 0.5),
-                modified_norm_features.get('soil_type_encoded', 3),
-                modified_norm_features.get('pest_frequency', 0.1)
-            ]).reshape(1, -1)
+    def search_minimal_counterfactual(self, norm_features, original_prediction,
+                                      budget=COUNTERFACTUAL_SEARCH_BUDGET,
+                                      deadline=COUNTERFACTUAL_SEARCH_DEADLINE,
+                                      batch_size=COUNTERFACTUAL_SEARCH_BATCH):
+        """
+        Find the smallest combined change to the actionable features that
+        lowers the risk tier (e.g. High -> Medium/Low).
+        
+        Every combination of SEARCH_STEPS moves toward SEARCH_TARGETS is
+        ranked by its total change (L1 distance in normalized feature
+        space), then scored in cost order, batch_size rows per model call.
+        The first candidate that lowers the tier is therefore the minimal
+        one among those evaluated. The search stops after `budget`
+        candidates or `deadline` seconds.
+        
+        Returns:
+            {
+                'found': bool,
+                'original_risk_level': 'High',
+                'original_probability': 0.74,
+                'new_risk_level': 'Medium',          # if found
+                'new_probability': 0.61,             # if found
+                'probability_change': -0.13,         # if found
+                'changes': [{'feature', 'display_name', 'current_value', 'new_value', 'change'}],
+                'cost': 0.18,                        # if found
+                'evaluated': int,
+                'stopped': 'found' | 'already_low' | 'budget' | 'deadline' | 'exhausted',
+                'elapsed_ms': float
+            }
+        """
+        start = time.perf_counter()
+        original_level = original_prediction['risk_level']
+        original_prob = original_prediction['ensemble_probability']
+        result = {
+            'found': False,
+            'original_risk_level': original_level,
+            'original_probability': original_prob,
+            'changes': [],
+            'evaluated': 0
+        }
+        
+        def finish(stopped):
+            result['stopped'] = stopped
+            result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            return result
+        
+        original_rank = RISK_TIERS.index(original_level)
+        if original_rank == 0:
+            return finish('already_low')
+        
+        # Candidate values per feature, then the full grid ordered by total change
+        features = list(SEARCH_TARGETS)
+        base_vector = np.array(self._feature_vector(norm_features), dtype=float)
+        columns = [self.feature_names.index(name) for name in features]
+        current = base_vector[columns]
+        
+        levels = [
+            np.unique(value + SEARCH_STEPS * (SEARCH_TARGETS[name] - value))
+            for name, value in zip(features, current)
+        ]
+        grid = np.stack(np.meshgrid(*levels, indexing='ij'), axis=-1).reshape(-1, len(features))
+        costs = np.abs(grid - current).sum(axis=1)
+        order = np.argsort(costs, kind='stable')
+        order = order[costs[order] > 0]  # Drop the unchanged point
+        
+        stopped = 'exhausted'
+        if len(order) > budget:
+            order = order[:budget]
+            stopped = 'budget'
+        
+        for offset in range(0, len(order), batch_size):
+            if time.perf_counter() - start > deadline:
+                return finish('deadline')
             
-            if self.scaler is not None:
-                feature_vector_scaled = self.scaler.transform(feature_vector)
-            else:
-                feature_vector_scaled = feature_vector
+            batch = order[offset:offset + batch_size]
+            feature_matrix = np.tile(base_vector, (len(batch), 1))
+            feature_matrix[:, columns] = grid[batch]
             
-            # Get predictions from base models
-            rf_prob = self.predictor.rf_model.predict_proba(feature_vector_scaled)[0, 1]
-            xgb_prob = self.predictor.xgb_model.predict_proba(feature_vector_scaled)[0, 1]
+            scores = self.predictor.score_matrix(feature_matrix)
+            result['evaluated'] += len(batch)
             
-            # Meta-learner prediction
-            meta_features = np.array([[rf_prob, xgb_prob]])
-            meta_features_scaled = self.predictor.scaler_meta.transform(meta_features)
-            ensemble_prob = self.predictor.meta_learner.predict_proba(meta_features_scaled)[0, 1]
+            lowered = [
+                row for row, level in enumerate(scores['risk_level'])
+                if RISK_TIERS.index(level) < original_rank
+            ]
+            if not lowered:
+                continue
             
-            # Determine risk level
-            if ensemble_prob < 0.33:
-                risk_level = 'Low'
-            elif ensemble_prob < 0.67:
-                risk_level = 'Medium'
-            else:
-                risk_level = 'High'
+            # Batch is in cost order, so the first hit is the minimal change
+            row = lowered[0]
+            candidate = grid[batch[row]]
+            new_prob = float(scores['ensemble_probability'][row])
+            result.update({
+                'found': True,
+                'new_risk_level': scores['risk_level'][row],
+                'new_probability': new_prob,
+                'probability_change': new_prob - original_prob,
+                'changes': [
+                    {
+                        'feature': name,
+                        'display_name': self.display_names.get(name, name),
+                        'current_value': float(old),
+                        'new_value': float(new),
+                        'change': float(new - old)
+                    }
+                    for name, old, new in zip(features, current, candidate)
+                    if new != old
+                ],
+                'cost': float(costs[batch[row]])
+            })
+            return finish('found')
+        
+        return finish(stopped)
+    
+    def _feature_vector(self, modified_norm_features):
+        """Model input row for a (possibly partial) normalized feature dict."""
+        return [
+            modified_norm_features.get('ndvi_mean', 0.5),
+            modified_norm_features.get('ndvi_trend', 0),
+            modified_norm_features.get('ndvi_variance', 0.03),
+            modified_norm_features.get('rainfall_deviation', 0),
+            modified_norm_features.get('temperature_anomaly', 0),
+            modified_norm_features.get('soil_moisture_index', 0.5),
+            modified_norm_features.get('soil_type_encoded', 3),
+            modified_norm_features.get('pest_frequency', 0.1)
+        ]
+    
+    def _predict_batch(self, modified_norm_features_list):
+        """Score many modified feature dicts with one call per model."""
+        if not modified_norm_features_list:
+            return []
+        
+        try:
+            feature_matrix = np.array(
+                [self._feature_vector(features) for features in modified_norm_features_list], dtype=float
+            )
+            scores = self.predictor.score_matrix(feature_matrix)
+            rf_prob = scores['rf_probability']
+            xgb_prob = scores['xgb_probability']
             
-            return {
-                'ensemble_probability': float(ensemble_prob),
-                'rf_probability': float(rf_prob),
-                'xgb_probability': float(xgb_prob),
-                'risk_level': risk_level
-            }
+            return [
+                {
+                    'ensemble_probability': float(scores['ensemble_probability'][row]),
+                    'rf_probability': float(rf_prob[row]) if rf_prob is not None else None,
+                    'xgb_probability': float(xgb_prob[row]) if xgb_prob is not None else None,
+                    'risk_level': scores['risk_level'][row]
+                }
+                for row in range(len(feature_matrix))
+            ]
             
         except Exception as e:
             logger.warning(f"Modified prediction failed: {e}")
-            return {'ensemble_probability': 0.5, 'risk_level': 'Medium'}
+            return [{'ensemble_probability': 0.5, 'risk_level': 'Medium'} for _ in modified_norm_features_list]
+    
+    def _predict_with_modified_features(self, modified_norm_features):
+        """Make prediction with modified features."""
+        return self._predict_batch([modified_norm_features])[0]
 
 
 # Singleton instance
@@ -247,16 +361,34 @@ _counterfactual_generator = None
 
 
 def get_counterfactual_generator():
-    """Get or create singleton counterfactual generator."""
+    """Get or create singleton counterfactual generator bound to the current ensemble."""
     global _counterfactual_generator
-    if _counterfactual_generator is None:
+    if (_counterfactual_generator is None
+            or _counterfactual_generator.predictor is not get_ensemble_predictor()):
         _counterfactual_generator = CounterfactualGenerator()
     return _counterfactual_generator
 
 
-def generate_counterfactuals(state, district, crop, season, original_prediction):
+def generate_counterfactuals(state, district, crop, season, original_prediction, context=None):
     """
     Unified counterfactual generation API.
     """
     generator = get_counterfactual_generator()
-    return generator.generate_counterfactuals(state, district, crop, season, original_prediction)
+    return generator.generate_counterfactuals(
+        state, district, crop, season, original_prediction, context=context
+    )
+
+
+def search_counterfactual(state, district, crop, season, original_prediction, context=None):
+    """
+    Unified minimal counterfactual search API.
+    """
+    generator = get_counterfactual_generator()
+    if context is None:
+        context = FeatureContext.build(state, district, crop, season)
+    
+    log_step("Counterfactual Search", "in_progress")
+    result = generator.search_minimal_counterfactual(context.normalized_features, original_prediction)
+    log_step("Counterfactual Search", "success",
+             f"({result['stopped']}, {result['evaluated']} candidates, {result['elapsed_ms']:.0f}ms)")
+    return result
@@ -6,6 +6,7 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import pickle
 import os
+from backend.model.registry import load_artifact
 
 def train_crop_recommender():
     """Train a crop recommendation model"""
@@ -62,17 +63,14 @@ def train_crop_recommender():
     return model
 
 def load_crop_recommender():
-    """Load the trained crop recommender"""
+    """Load the trained crop recommender (cached in the model registry)"""
     model_path = 'backend/model/saved/crop_recommender.pkl'
     
     if not os.path.exists(model_path):
         print("Crop recommender not found. Training new model...")
         return train_crop_recommender()
     
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    
-    return model
+    return load_artifact(model_path)
 
 def recommend_crops(ndvi, soil_moisture, temperature, rainfall_deviation, season, soil_type):
     """Recommend top 3 crops for given conditions"""
@@ -5,17 +5,48 @@ This module provides the ensemble_predict() function that:
 1. Loads RF, XGBoost, and meta-learner from disk
 2. Handles missing model failures gracefully with fallbacks
 3. Returns ensemble score + base model scores + confidence
+
+Models are loaded from the memory-mapped artifact bundle (see
+artifacts.py) when one exists, otherwise from the legacy pickles. A bundle
+is never scored with pickles from a different training: they are checked
+against the hashes in its manifest first. With
+ENSEMBLE_VARIANT=compressed the bundle written by compression.py is used
+instead (a pruned stack, or one distilled student model).
 """
 
 import numpy as np
-import pickle
 import os
+import threading
+from backend.utils.config import (
+    USE_FLAT_TREES, FLAT_TREE_MAX_ROWS_RF, FLAT_TREE_MAX_ROWS_XGB, USE_ARTIFACT_BUNDLE,
+    ENSEMBLE_VARIANT
+)
 from backend.utils.helpers import setup_logger, log_step
-from backend.preprocessing.feature_engineering import prepare_feature_vector
+from backend.preprocessing.feature_engineering import (
+    FeatureContext, prepare_feature_batch, build_feature_matrix
+)
+from backend.model.registry import get_model_registry
+from backend.model.tree_arrays import flatten_random_forest, flatten_xgboost
+from backend.model.artifacts import (
+    BUNDLE_PATH, COMPRESSED_BUNDLE_PATH, current_bundle_path, load_current_bundle
+)
 
 logger = setup_logger(__name__)
 
 ENSEMBLE_MODELS_PATH = 'backend/model/saved/ensemble/'
+BUNDLE_ROOT = COMPRESSED_BUNDLE_PATH if ENSEMBLE_VARIANT == 'compressed' else BUNDLE_PATH
+BUNDLE_POINTER = f'{BUNDLE_ROOT}CURRENT'
+
+# Artifact file name for each EnsemblePredictor attribute
+ENSEMBLE_ARTIFACTS = {
+    'rf_model': 'rf_model.pkl',
+    'xgb_model': 'xgb_model.pkl',
+    'meta_learner': 'meta_learner.pkl',
+    'scaler': 'scaler.pkl',
+    'scaler_meta': 'scaler_meta.pkl',
+    'feature_importance': 'feature_importance.pkl',
+    'test_metrics': 'test_metrics.pkl'
+}
 
 
 class EnsemblePredictor:
@@ -30,6 +61,10 @@ class EnsemblePredictor:
         self.scaler_meta = None
         self.feature_importance = None
         self.test_metrics = None
+        self.rf_flat = None
+        self.xgb_flat = None
+        self.student_flat = None
+        self.bundle = None
         
         self.feature_names = [
             'ndvi_mean', 'ndvi_trend', 'ndvi_variance',
@@ -52,73 +87,18 @@ class EnsemblePredictor:
                 from backend.model.ensemble_train import train_ensemble_models
                 train_ensemble_models()
             
-            # Load RF model
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl', 'rb') as f:
-                    self.rf_model = pickle.load(f)
-                logger.info("✓ Loaded RF model")
-            except Exception as e:
-                logger.warning(f"Failed to load RF model: {e}")
-                self.rf_model = None
-            
-            # Load XGBoost model
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl', 'rb') as f:
-                    self.xgb_model = pickle.load(f)
-                logger.info("✓ Loaded XGBoost model")
-            except Exception as e:
-                logger.warning(f"Failed to load XGBoost model: {e}")
-                self.xgb_model = None
-            
-            # Load meta-learner
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}meta_learner.pkl', 'rb') as f:
-                    self.meta_learner = pickle.load(f)
-                logger.info("✓ Loaded meta-learner")
-            except Exception as e:
-                logger.warning(f"Failed to load meta-learner: {e}")
-                self.meta_learner = None
-            
-            # Load scalers
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}scaler.pkl', 'rb') as f:
-                    self.scaler = pickle.load(f)
-                logger.info("✓ Loaded feature scaler")
-            except Exception as e:
-                logger.warning(f"Failed to load feature scaler: {e}")
-                self.scaler = None
-            
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}scaler_meta.pkl', 'rb') as f:
-                    self.scaler_meta = pickle.load(f)
-                logger.info("✓ Loaded meta-feature scaler")
-            except Exception as e:
-                logger.warning(f"Failed to load meta-feature scaler: {e}")
-                self.scaler_meta = None
-            
-            # Load feature importance
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}feature_importance.pkl', 'rb') as f:
-                    self.feature_importance = pickle.load(f)
-                logger.info("✓ Loaded feature importance")
-            except Exception as e:
-                logger.warning(f"Failed to load feature importance: {e}")
-                self.feature_importance = None
+            registry = get_model_registry()
             
-            # Load test metrics
-            try:
-                with open(f'{ENSEMBLE_MODELS_PATH}test_metrics.pkl', 'rb') as f:
-                    self.test_metrics = pickle.load(f)
-                logger.info("✓ Loaded test metrics")
-            except Exception as e:
-                logger.warning(f"Failed to load test metrics: {e}")
-                self.test_metrics = None
+            # Prefer the memory-mapped bundle; pickles are the legacy format
+            if not (USE_ARTIFACT_BUNDLE and self.load_bundle(registry)):
+                self.load_pickles(registry)
+                self.flatten_trees()
             
             # Validation
             models_available = sum([
-                self.rf_model is not None,
-                self.xgb_model is not None,
-                self.meta_learner is not None
+                self.rf_model is not None or self.rf_flat is not None,
+                self.xgb_model is not None or self.xgb_flat is not None,
+                self.meta_learner is not None or self.student_flat is not None
             ])
             
             if models_available == 0:
@@ -132,10 +112,300 @@ class EnsemblePredictor:
             logger.error(f"Critical error loading ensemble: {e}")
             raise
     
-    def predict(self, state, district, crop, season):
+    def load_bundle(self, registry):
+        """
+        Load inference state from the current artifact bundle.
+        
+        Returns True on success, False if there is no bundle or it cannot
+        be read (the caller then falls back to the pickles).
+        """
+        if current_bundle_path(BUNDLE_ROOT) is None:
+            if ENSEMBLE_VARIANT == 'compressed':
+                logger.warning(f"No compressed bundle in {BUNDLE_ROOT}; using pickles")
+            return False
+        
+        try:
+            bundle = registry.load(BUNDLE_POINTER, loader=load_current_bundle)
+        except Exception as e:
+            logger.warning(f"Failed to load artifact bundle: {e}; using pickles")
+            return False
+        
+        self.bundle = bundle
+        self.rf_flat = bundle.rf_flat
+        self.xgb_flat = bundle.xgb_flat
+        self.student_flat = bundle.student_flat
+        self.scaler = bundle.scaler
+        self.scaler_meta = bundle.scaler_meta
+        self.meta_learner = bundle.meta_learner
+        self.feature_importance = bundle.feature_importance
+        self.test_metrics = bundle.test_metrics
+        logger.info(f"✓ Loaded artifact bundle v{bundle.version} ({bundle.variant}, memory-mapped)")
+        return True
+    
+    def load_pickles(self, registry):
+        """Load all ensemble components from the legacy pickles."""
+        # Load RF model
+        try:
+            self.rf_model = registry.load(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl')
+            logger.info("✓ Loaded RF model")
+        except Exception as e:
+            logger.warning(f"Failed to load RF model: {e}")
+            self.rf_model = None
+        
+        # Load XGBoost model
+        try:
+            self.xgb_model = registry.load(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl')
+            logger.info("✓ Loaded XGBoost model")
+        except Exception as e:
+            logger.warning(f"Failed to load XGBoost model: {e}")
+            self.xgb_model = None
+        
+        # Load meta-learner
+        try:
+            self.meta_learner = registry.load(f'{ENSEMBLE_MODELS_PATH}meta_learner.pkl')
+            logger.info("✓ Loaded meta-learner")
+        except Exception as e:
+            logger.warning(f"Failed to load meta-learner: {e}")
+            self.meta_learner = None
+        
+        # Load scalers
+        try:
+            self.scaler = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler.pkl')
+            logger.info("✓ Loaded feature scaler")
+        except Exception as e:
+            logger.warning(f"Failed to load feature scaler: {e}")
+            self.scaler = None
+        
+        try:
+            self.scaler_meta = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler_meta.pkl')
+            logger.info("✓ Loaded meta-feature scaler")
+        except Exception as e:
+            logger.warning(f"Failed to load meta-feature scaler: {e}")
+            self.scaler_meta = None
+        
+        # Load feature importance
+        try:
+            self.feature_importance = registry.load(f'{ENSEMBLE_MODELS_PATH}feature_importance.pkl')
+            logger.info("✓ Loaded feature importance")
+        except Exception as e:
+            logger.warning(f"Failed to load feature importance: {e}")
+            self.feature_importance = None
+        
+        # Load test metrics
+        try:
+            self.test_metrics = registry.load(f'{ENSEMBLE_MODELS_PATH}test_metrics.pkl')
+            logger.info("✓ Loaded test metrics")
+        except Exception as e:
+            logger.warning(f"Failed to load test metrics: {e}")
+            self.test_metrics = None
+    
+    def flatten_trees(self):
+        """Export base model trees to NumPy node arrays for small-batch scoring."""
+        if not USE_FLAT_TREES:
+            return
+        
+        try:
+            if self.rf_model is not None:
+                self.rf_flat = flatten_random_forest(self.rf_model)
+                logger.info(f"✓ Flattened RF ({self.rf_flat.n_nodes} nodes)")
+        except Exception as e:
+            logger.warning(f"Failed to flatten RF model: {e}; using predict_proba")
+            self.rf_flat = None
+        
+        try:
+            if self.xgb_model is not None:
+                self.xgb_flat = flatten_xgboost(self.xgb_model)
+                logger.info(f"✓ Flattened XGBoost ({self.xgb_flat.n_nodes} nodes)")
+        except Exception as e:
+            logger.warning(f"Failed to flatten XGBoost model: {e}; using predict_proba")
+            self.xgb_flat = None
+    
+    def _native_model(self, name):
+        """
+        Fitted sklearn/XGBoost model ('rf' or 'xgb'). In bundle mode the
+        pickle is only loaded on first use, for batches too large for the
+        flat evaluator, and only if it is the pickle the bundle was built
+        from; returns None otherwise (the flat arrays are then used).
+        """
+        model = getattr(self, f'{name}_model')
+        # Compressed bundles have no matching pickle; the flat model is the model
+        if model is None and self.bundle is not None and self.bundle.native_fallback:
+            try:
+                if self.bundle.matches_native(name, ENSEMBLE_MODELS_PATH):
+                    model = get_model_registry().load_optional(f'{ENSEMBLE_MODELS_PATH}{name}_model.pkl')
+                    setattr(self, f'{name}_model', model)
+            except Exception as e:
+                logger.warning(f"Failed to load {name} pickle: {e}")
+        return model
+    
+    def _base_probability(self, name, flat, max_flat_rows, feature_matrix_scaled):
+        """Class-1 probability from the flat evaluator for small batches, else predict_proba."""
+        use_flat = USE_FLAT_TREES and feature_matrix_scaled.shape[0] <= max_flat_rows
+        if flat is not None and use_flat:
+            try:
+                return flat.predict_proba(feature_matrix_scaled)
+            except Exception as e:
+                logger.warning(f"Flat tree evaluation failed: {e}; using predict_proba")
+        
+        model = self._native_model(name)
+        if model is None:
+            return flat.predict_proba(feature_matrix_scaled)
+        return model.predict_proba(feature_matrix_scaled)[:, 1]
+    
+    def is_stale(self):
+        """
+        True if load_ensemble() would now load something else: the bundle
+        pointer changed, a bundle appeared while serving pickles, or any
+        loaded pickle changed on disk. Native models paired with a bundle
+        are verified by hash when loaded, so only the pointer matters then.
+        """
+        registry = get_model_registry()
+        if self.bundle is not None:
+            return not registry.is_current(BUNDLE_POINTER)
+        if (USE_ARTIFACT_BUNDLE and current_bundle_path(BUNDLE_ROOT) is not None
+                and not registry.is_current(BUNDLE_POINTER)):
+            return True
+        return any(
+            os.path.exists(f'{ENSEMBLE_MODELS_PATH}{filename}')
+            and not registry.is_current(f'{ENSEMBLE_MODELS_PATH}{filename}')
+            for filename in ENSEMBLE_ARTIFACTS.values()
+        )
+    
+    def score_matrix(self, feature_matrix):
+        """
+        Score an (N, 8) matrix of normalized features with a single
+        vectorised call per model (flattened trees for small batches).
+        
+        Returns:
+            {
+                'ensemble_probability': array (N,),
+                'rf_probability': array (N,) or None,
+                'xgb_probability': array (N,) or None,
+                'confidence': array (N,),
+                'risk_level': list of N 'Low'/'Medium'/'High',
+                'models_used': int
+            }
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=float).reshape(-1, len(self.feature_names))
+        n_rows = feature_matrix.shape[0]
+        
+        # Apply feature scaling
+        if self.scaler is not None:
+            feature_matrix_scaled = self.scaler.transform(feature_matrix)
+        else:
+            feature_matrix_scaled = feature_matrix
+            logger.warning("Feature scaler not available; using raw features")
+        
+        # Distilled bundle: one student model stands in for the whole stack
+        if self.student_flat is not None:
+            ensemble_prob = self.student_flat.predict_proba(feature_matrix_scaled)
+            return {
+                'ensemble_probability': ensemble_prob,
+                'rf_probability': None,
+                'xgb_probability': None,
+                'confidence': np.full(n_rows, 0.75),
+                'risk_level': [self._risk_level(p) for p in ensemble_prob],
+                'models_used': 1
+            }
+        
+        # Get base model predictions
+        rf_prob = None
+        xgb_prob = None
+        models_used = 0
+        
+        try:
+            if self.rf_model is not None or self.rf_flat is not None:
+                rf_prob = self._base_probability(
+                    'rf', self.rf_flat, FLAT_TREE_MAX_ROWS_RF, feature_matrix_scaled
+                )
+                models_used += 1
+        except Exception as e:
+            logger.warning(f"RF prediction failed: {e}")
+        
+        try:
+            if self.xgb_model is not None or self.xgb_flat is not None:
+                xgb_prob = self._base_probability(
+                    'xgb', self.xgb_flat, FLAT_TREE_MAX_ROWS_XGB, feature_matrix_scaled
+                )
+                models_used += 1
+        except Exception as e:
+            logger.warning(f"XGBoost prediction failed: {e}")
+        
+        # Fallback logic: if base models fail, use simple average
+        if rf_prob is not None and xgb_prob is not None:
+            # Both models available: use meta-learner
+            try:
+                if self.meta_learner is not None and self.scaler_meta is not None:
+                    meta_features = np.column_stack([rf_prob, xgb_prob])
+                    meta_features_scaled = self.scaler_meta.transform(meta_features)
+                    ensemble_prob = self.meta_learner.predict_proba(meta_features_scaled)[:, 1]
+                else:
+                    # Meta-learner not available, average base models
+                    ensemble_prob = (rf_prob + xgb_prob) / 2
+                    logger.warning("Meta-learner not available; using average of base models")
+            except Exception as e:
+                logger.warning(f"Meta-learner prediction failed: {e}, using average")
+                ensemble_prob = (rf_prob + xgb_prob) / 2
+        else:
+            # One or both models unavailable: use simple average
+            available_probs = [p for p in [rf_prob, xgb_prob] if p is not None]
+            if available_probs:
+                ensemble_prob = np.mean(available_probs, axis=0)
+                logger.warning(f"Using {len(available_probs)} available model(s) for prediction")
+            else:
+                logger.error("No models available for prediction!")
+                ensemble_prob = np.full(n_rows, 0.5)  # Last resort fallback
+        
+        # Calculate confidence (agreement between base models)
+        if rf_prob is not None and xgb_prob is not None:
+            agreement = 1 - np.abs(rf_prob - xgb_prob)
+            confidence = np.minimum(0.95, 0.5 + 0.45 * agreement)
+        elif rf_prob is not None or xgb_prob is not None:
+            # Only one model: lower confidence
+            confidence = np.full(n_rows, 0.75)
+        else:
+            confidence = np.full(n_rows, 0.5)
+        
+        return {
+            'ensemble_probability': ensemble_prob,
+            'rf_probability': rf_prob,
+            'xgb_probability': xgb_prob,
+            'confidence': confidence,
+            'risk_level': [self._risk_level(p) for p in ensemble_prob],
+            'models_used': models_used
+        }
+    
+    @staticmethod
+    def _risk_level(probability):
+        """Map an ensemble probability to a risk tier."""
+        if probability < 0.33:
+            return 'Low'
+        elif probability < 0.67:
+            return 'Medium'
+        return 'High'
+    
+    def _result_for_row(self, scores, row, norm_features, raw_features):
+        """Build the API result dict for one row of score_matrix() output."""
+        rf_prob = scores['rf_probability']
+        xgb_prob = scores['xgb_probability']
+        return {
+            'risk_level': scores['risk_level'][row],
+            'ensemble_probability': float(scores['ensemble_probability'][row]),
+            'rf_probability': float(rf_prob[row]) if rf_prob is not None else None,
+            'xgb_probability': float(xgb_prob[row]) if xgb_prob is not None else None,
+            'confidence': float(scores['confidence'][row]),
+            'models_used': scores['models_used'],
+            'raw_features': raw_features,
+            'normalized_features': norm_features
+        }
+    
+    def predict(self, state, district, crop, season, context=None):
         """
         Make ensemble prediction with fallback logic.
         
+        If a FeatureContext is given, its features are used instead of
+        running ingestion again.
+        
         Returns:
             {
                 'risk_level': 'Low'/'Medium'/'High',
@@ -151,103 +421,14 @@ class EnsemblePredictor:
             log_step("Ensemble Prediction", "in_progress")
             
             # Prepare features
-            norm_features, raw_features = prepare_feature_vector(state, district, crop, season)
+            if context is None:
+                context = FeatureContext.build(state, district, crop, season)
+            norm_features = context.normalized_features
+            raw_features = context.raw_features
             
-            # Create feature vector
-            feature_vector = np.array([
-                norm_features['ndvi_mean'],
-                norm_features['ndvi_trend'],
-                norm_features['ndvi_variance'],
-                norm_features['rainfall_deviation'],
-                norm_features['temperature_anomaly'],
-                norm_features['soil_moisture_index'],
-                norm_features['soil_type_encoded'],
-                norm_features['pest_frequency']
-            ]).reshape(1, -1)
-            
-            # Apply feature scaling
-            if self.scaler is not None:
-                feature_vector_scaled = self.scaler.transform(feature_vector)
-            else:
-                feature_vector_scaled = feature_vector
-                logger.warning("Feature scaler not available; using raw features")
-            
-            # Get base model predictions
-            rf_prob = None
-            xgb_prob = None
-            models_used = 0
-            
-            try:
-                if self.rf_model is not None:
-                    rf_prob = self.rf_model.predict_proba(feature_vector_scaled)[0, 1]
-                    models_used += 1
-                    logger.debug(f"RF probability: {rf_prob:.4f}")
-            except Exception as e:
-                logger.warning(f"RF prediction failed: {e}")
-            
-            try:
-                if self.xgb_model is not None:
-                    xgb_prob = self.xgb_model.predict_proba(feature_vector_scaled)[0, 1]
-                    models_used += 1
-                    logger.debug(f"XGBoost probability: {xgb_prob:.4f}")
-            except Exception as e:
-                logger.warning(f"XGBoost prediction failed: {e}")
-            
-            # Fallback logic: if base models fail, use simple average
-            ensemble_prob = None
-            if rf_prob is not None and xgb_prob is not None:
-                # Both models available: use meta-learner
-                try:
-                    if self.meta_learner is not None and self.scaler_meta is not None:
-                        meta_features = np.array([[rf_prob, xgb_prob]])
-                        meta_features_scaled = self.scaler_meta.transform(meta_features)
-                        ensemble_prob = self.meta_learner.predict_proba(meta_features_scaled)[0, 1]
-                        logger.debug(f"Ensemble (meta-learner) probability: {ensemble_prob:.4f}")
-                    else:
-                        # Meta-learner not available, average base models
-                        ensemble_prob = (rf_prob + xgb_prob) / 2
-                        logger.warning("Meta-learner not available; using average of base models")
-                except Exception as e:
-                    logger.warning(f"Meta-learner prediction failed: {e}, using average")
-                    ensemble_prob = (rf_prob + xgb_prob) / 2
-            else:
-                # One or both models unavailable: use simple average
-                available_probs = [p for p in [rf_prob, xgb_prob] if p is not None]
-                if available_probs:
-                    ensemble_prob = np.mean(available_probs)
-                    logger.warning(f"Using {len(available_probs)} available model(s) for prediction")
-                else:
-                    logger.error("No models available for prediction!")
-                    ensemble_prob = 0.5  # Last resort fallback
-            
-            # Calculate confidence (agreement between base models)
-            confidence = 0.5
-            if rf_prob is not None and xgb_prob is not None:
-                # Confidence based on model agreement
-                agreement = 1 - abs(rf_prob - xgb_prob)
-                confidence = min(0.95, 0.5 + 0.45 * agreement)
-            elif rf_prob is not None or xgb_prob is not None:
-                # Only one model: lower confidence
-                confidence = 0.75
-            
-            # Determine risk level
-            if ensemble_prob < 0.33:
-                risk_level = 'Low'
-            elif ensemble_prob < 0.67:
-                risk_level = 'Medium'
-            else:
-                risk_level = 'High'
-            
-            result = {
-                'risk_level': risk_level,
-                'ensemble_probability': float(ensemble_prob),
-                'rf_probability': float(rf_prob) if rf_prob is not None else None,
-                'xgb_probability': float(xgb_prob) if xgb_prob is not None else None,
-                'confidence': float(confidence),
-                'models_used': models_used,
-                'raw_features': raw_features,
-                'normalized_features': norm_features
-            }
+            scores = self.score_matrix(context.feature_matrix)
+            result = self._result_for_row(scores, 0, norm_features, raw_features)
+            logger.debug(f"Ensemble probability: {result['ensemble_probability']:.4f}")
             
             log_step("Ensemble Prediction", "success")
             
@@ -256,21 +437,56 @@ class EnsemblePredictor:
         except Exception as e:
             logger.error(f"Ensemble prediction failed: {e}")
             raise
+    
+    def predict_batch(self, items):
+        """
+        Vectorised ensemble prediction for many requests.
+        
+        Features are gathered per item, stacked into one (N, 8) matrix and
+        scored with a single predict_proba call per model.
+        
+        Args:
+            items: list of dicts with 'state', 'district', 'crop', 'season'
+        
+        Returns:
+            list aligned with items of {'status': 'success', 'data': result}
+            or {'status': 'error', 'error': message}
+        """
+        log_step("Ensemble Batch Prediction", "in_progress", f"({len(items)} items)")
+        
+        prepared = prepare_feature_batch(items)
+        ok_rows = [i for i, p in enumerate(prepared) if not isinstance(p, Exception)]
+        
+        results = [{'status': 'error', 'error': str(p)} for p in prepared]
+        if ok_rows:
+            scores = self.score_matrix(build_feature_matrix([prepared[i][0] for i in ok_rows]))
+            for row, i in enumerate(ok_rows):
+                norm_features, raw_features = prepared[i]
+                results[i] = {
+                    'status': 'success',
+                    'data': self._result_for_row(scores, row, norm_features, raw_features)
+                }
+        
+        log_step("Ensemble Batch Prediction", "success", f"({len(ok_rows)}/{len(items)} scored)")
+        return results
 
 
 # Singleton instance for API use
 _ensemble_predictor = None
+_ensemble_predictor_lock = threading.Lock()
 
 
 def get_ensemble_predictor():
-    """Get or create singleton ensemble predictor."""
+    """Get or create singleton ensemble predictor, rebuilding it if its artifacts changed on disk."""
     global _ensemble_predictor
-    if _ensemble_predictor is None:
-        _ensemble_predictor = EnsemblePredictor()
+    if _ensemble_predictor is None or _ensemble_predictor.is_stale():
+        with _ensemble_predictor_lock:
+            if _ensemble_predictor is None or _ensemble_predictor.is_stale():
+                _ensemble_predictor = EnsemblePredictor()
     return _ensemble_predictor
 
 
-def ensemble_predict(state, district, crop, season):
+def ensemble_predict(state, district, crop, season, context=None):
     """
     Unified ensemble prediction API.
     
@@ -279,9 +495,24 @@ def ensemble_predict(state, district, crop, season):
         district: District name
         crop: Crop name
         season: Season (Kharif/Rabi/Summer)
+        context: Optional FeatureContext to reuse already-computed features
     
     Returns:
         Ensemble prediction result dict
     """
     predictor = get_ensemble_predictor()
-    return predictor.predict(state, district, crop, season)
+    return predictor.predict(state, district, crop, season, context=context)
+
+
+def ensemble_predict_batch(items):
+    """
+    Vectorised ensemble prediction API for many requests.
+    
+    Args:
+        items: list of dicts with 'state', 'district', 'crop', 'season'
+    
+    Returns:
+        list of per-item {'status', 'data'/'error'} dicts, in input order
+    """
+    predictor = get_ensemble_predictor()
+    return predictor.predict_batch(items)
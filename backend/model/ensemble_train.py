@@ -15,14 +15,17 @@ import pickle
 import os
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split, cross_val_predict, StratifiedKFold
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, roc_auc_score, f1_score
 from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
 
 from backend.utils.helpers import setup_logger, log_step, ensure_dir_exists
 from backend.preprocessing.labeling import LabelGenerator, create_training_dataset
-from backend.utils.config import MODEL_PATH, FEATURE_IMPORTANCE_PATH
+from backend.preprocessing.synthetic_data import DEFAULT_SEED, generate_training_data as generate_synthetic_data
+from backend.utils.config import MODEL_PATH, FEATURE_IMPORTANCE_PATH, TRAINING_WORKERS, XGB_EARLY_STOPPING_ROUNDS
+from backend.model.artifacts import save_bundle, payload_sha256, NATIVE_MODEL_FILES
+from backend.model.stacking import fit_out_of_fold
 
 logger = setup_logger(__name__)
 
@@ -40,8 +43,9 @@ class EnsembleTrainer:
     - Meta-Learner: LogisticRegression (combines base model outputs)
     
     Training approach:
-    - Train RF and XGBoost independently on full training set
-    - Generate predictions from RF and XGBoost on training set (cross-validation)
+    - One parallel K-fold pass fits RF and XGBoost per fold (backend/model/stacking.py)
+    - Out-of-fold predictions become the meta-features; the RF fold forests
+      are merged into the final RF, XGBoost is refit once on the training set
     - Train meta-learner on these meta-features
     - Final prediction: meta-learner(rf_pred, xgb_pred)
     """
@@ -98,102 +102,31 @@ class EnsembleTrainer:
         self.cv_scores = {}
         self.test_metrics = {}
         self.base_model_importances = {}
+        self.stacking_info = {}
     
-    def generate_training_data(self, n_samples=2000):
-        """Generate realistic training data with correlated features."""
+    def generate_training_data(self, n_samples=2000, seed=DEFAULT_SEED):
+        """Generate realistic training data with correlated features (vectorised, seeded)."""
         log_step("Ensemble Training Data Generation", "in_progress")
         
-        X = []
-        y = []
-        
-        for _ in range(n_samples):
-            # Generate base NDVI with realistic distribution
-            ndvi_category = np.random.choice(['healthy', 'stressed', 'critical'], p=[0.65, 0.25, 0.10])
-            
-            if ndvi_category == 'healthy':
-                ndvi_mean = np.random.uniform(0.55, 0.85)
-                soil_moisture_base = np.random.uniform(0.5, 0.9)
-                pest_freq_base = np.random.uniform(0.0, 0.4)
-                risk_prob = 0.05  # 5% failure rate when healthy
-            elif ndvi_category == 'stressed':
-                ndvi_mean = np.random.uniform(0.3, 0.55)
-                soil_moisture_base = np.random.uniform(0.3, 0.6)
-                pest_freq_base = np.random.uniform(0.3, 0.7)
-                risk_prob = 0.35  # 35% failure rate when stressed
-            else:  # critical
-                ndvi_mean = np.random.uniform(0.15, 0.35)
-                soil_moisture_base = np.random.uniform(0.1, 0.4)
-                pest_freq_base = np.random.uniform(0.5, 0.95)
-                risk_prob = 0.75  # 75% failure rate when critical
-            
-            # NDVI trend
-            if ndvi_mean > 0.6:
-                ndvi_trend = np.random.uniform(-0.02, 0.05)
-            elif ndvi_mean > 0.4:
-                ndvi_trend = np.random.uniform(-0.05, 0.02)
-            else:
-                ndvi_trend = np.random.uniform(-0.08, -0.01)
-            
-            # NDVI variance
-            if ndvi_mean > 0.6:
-                ndvi_variance = np.random.uniform(0.01, 0.04)
-            else:
-                ndvi_variance = np.random.uniform(0.04, 0.1)
-            
-            # Rainfall deviation
-            if soil_moisture_base > 0.6:
-                rainfall_dev = np.random.uniform(-15, 20)
-            elif soil_moisture_base > 0.3:
-                rainfall_dev = np.random.uniform(-30, 10)
-            else:
-                rainfall_dev = np.random.uniform(-50, -15)
-            
-            # Temperature anomaly
-            if ndvi_category == 'healthy':
-                temp_anom = np.random.uniform(-2, 2)
-            elif ndvi_category == 'stressed':
-                temp_anom = np.random.uniform(-4, 5)
-            else:
-                temp_anom = np.random.uniform(-8, 8)
-            
-            # Soil moisture
-            soil_moisture = soil_moisture_base + np.random.uniform(-0.05, 0.05)
-            soil_moisture = np.clip(soil_moisture, 0.1, 0.95)
-            
-            # Soil type (1-5)
-            soil_type = np.random.choice([1, 2, 3, 4, 5])
-            
-            # Pest frequency
-            pest_freq = pest_freq_base + np.random.uniform(-0.05, 0.05)
-            pest_freq = np.clip(pest_freq, 0.0, 1.0)
-            
-            # Label: crop failure (1) or success (0)
-            failure = np.random.rand() < risk_prob
-            
-            X.append([
-                ndvi_mean, ndvi_trend, ndvi_variance,
-                rainfall_dev, temp_anom,
-                soil_moisture, soil_type, pest_freq
-            ])
-            y.append(1 if failure else 0)
-        
-        X = np.array(X)
-        y = np.array(y)
+        X, y = generate_synthetic_data(n_samples, profile='ensemble', seed=seed)
         
         log_step("Ensemble Training Data Generation", "success")
         logger.info(f"Generated {n_samples} samples: {np.sum(y)} failures ({100*np.sum(y)/n_samples:.1f}%)")
         
         return X, y
     
-    def train_ensemble(self, X, y, test_size=0.2, cv_folds=5):
+    def train_ensemble(self, X, y, test_size=0.2, cv_folds=5,
+                       early_stopping_rounds=XGB_EARLY_STOPPING_ROUNDS, max_workers=TRAINING_WORKERS):
         """
-        Train ensemble: RF + XGBoost independently, then meta-learner via stacking.
+        Train ensemble: RF + XGBoost in one out-of-fold pass, then meta-learner via stacking.
         
         Args:
             X: Training features
             y: Training labels
             test_size: Fraction for test set
             cv_folds: Number of cross-validation folds
+            early_stopping_rounds: XGBoost early stopping per fold (0 = disabled)
+            max_workers: Process pool size for the fold fits (0 = one per CPU)
         """
         log_step("Ensemble Training", "in_progress")
         
@@ -206,10 +139,23 @@ class EnsembleTrainer:
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
-        # ===== TRAIN BASE MODEL 1: Random Forest =====
-        log_step("Training Random Forest", "in_progress")
-        self.rf_model.fit(X_train_scaled, y_train)
-        rf_pred_train = self.rf_model.predict_proba(X_train_scaled)[:, 1]
+        # ===== BASE MODELS + META-FEATURES: one parallel K-fold pass =====
+        log_step("Training Base Models (out-of-fold)", "in_progress")
+        stack = fit_out_of_fold(
+            self.rf_model, self.xgb_model, X_train_scaled, y_train,
+            cv_folds=cv_folds,
+            early_stopping_rounds=early_stopping_rounds,
+            max_workers=max_workers
+        )
+        self.rf_model = stack['rf']
+        self.xgb_model = stack['xgb']
+        self.stacking_info = {
+            'best_iterations': stack['best_iterations'],
+            'timings': stack['timings']
+        }
+        rf_meta_train, xgb_meta_train = stack['oof'][:, 0], stack['oof'][:, 1]
+        
+        # ===== BASE MODEL 1: Random Forest =====
         rf_pred_test = self.rf_model.predict_proba(X_test_scaled)[:, 1]
         
         rf_acc = accuracy_score(y_test, self.rf_model.predict(X_test_scaled))
@@ -220,14 +166,7 @@ class EnsembleTrainer:
         # Store feature importance
         self.base_model_importances['rf'] = dict(zip(self.feature_names, self.rf_model.feature_importances_))
         
-        # ===== TRAIN BASE MODEL 2: XGBoost =====
-        log_step("Training XGBoost", "in_progress")
-        self.xgb_model.fit(
-            X_train_scaled, y_train,
-            eval_set=[(X_test_scaled, y_test)],
-            verbose=False
-        )
-        xgb_pred_train = self.xgb_model.predict_proba(X_train_scaled)[:, 1]
+        # ===== BASE MODEL 2: XGBoost =====
         xgb_pred_test = self.xgb_model.predict_proba(X_test_scaled)[:, 1]
         
         xgb_acc = accuracy_score(y_test, self.xgb_model.predict(X_test_scaled))
@@ -241,18 +180,9 @@ class EnsembleTrainer:
         # ===== CREATE META-FEATURES (Stacking) =====
         log_step("Creating Meta-Features for Stacking", "in_progress")
         
-        # Generate meta-features for training set using cross-validation
-        skf = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
-        rf_meta_train = cross_val_predict(
-            self.rf_model, X_train_scaled, y_train, cv=skf, method='predict_proba'
-        )[:, 1]
-        xgb_meta_train = cross_val_predict(
-            self.xgb_model, X_train_scaled, y_train, cv=skf, method='predict_proba'
-        )[:, 1]
-        
-        # Meta-features for test set (from full training)
-        rf_meta_test = self.rf_model.predict_proba(X_test_scaled)[:, 1]
-        xgb_meta_test = self.xgb_model.predict_proba(X_test_scaled)[:, 1]
+        # Meta-features for test set (from the final base models)
+        rf_meta_test = rf_pred_test
+        xgb_meta_test = xgb_pred_test
         
         # Stack meta-features
         X_meta_train = np.column_stack([rf_meta_train, xgb_meta_train])
@@ -297,45 +227,54 @@ class EnsembleTrainer:
         
         return X_test, y_test, rf_pred_test, xgb_pred_test, ensemble_pred_test
     
-    def save_ensemble(self):
-        """Save all ensemble components to disk."""
+    def save_ensemble(self, source='training'):
+        """
+        Save all ensemble components to disk (`source` is recorded in the bundle manifest).
+        
+        The memory-mapped bundle is written first, recording the hashes of
+        the pickles that follow, so a predictor that reloads in between
+        never pairs it with the previous training's pickles. If the bundle
+        cannot be written the error propagates and the pickles are left
+        untouched.
+        """
         log_step("Saving Ensemble Models", "in_progress")
         
         # Ensure directory exists
         os.makedirs(ENSEMBLE_MODELS_PATH, exist_ok=True)
         
-        # Save base models
-        with open(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl', 'wb') as f:
-            pickle.dump(self.rf_model, f)
-        logger.info(f"✓ Saved RF model to {ENSEMBLE_MODELS_PATH}rf_model.pkl")
-        
-        with open(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl', 'wb') as f:
-            pickle.dump(self.xgb_model, f)
-        logger.info(f"✓ Saved XGBoost model to {ENSEMBLE_MODELS_PATH}xgb_model.pkl")
-        
-        # Save meta-learner
-        with open(f'{ENSEMBLE_MODELS_PATH}meta_learner.pkl', 'wb') as f:
-            pickle.dump(self.meta_learner, f)
-        logger.info(f"✓ Saved meta-learner to {ENSEMBLE_MODELS_PATH}meta_learner.pkl")
-        
-        # Save scalers
-        with open(f'{ENSEMBLE_MODELS_PATH}scaler.pkl', 'wb') as f:
-            pickle.dump(self.scaler, f)
-        logger.info(f"✓ Saved feature scaler to {ENSEMBLE_MODELS_PATH}scaler.pkl")
-        
-        with open(f'{ENSEMBLE_MODELS_PATH}scaler_meta.pkl', 'wb') as f:
-            pickle.dump(self.scaler_meta, f)
-        logger.info(f"✓ Saved meta-feature scaler to {ENSEMBLE_MODELS_PATH}scaler_meta.pkl")
-        
-        # Save feature importance
-        with open(f'{ENSEMBLE_MODELS_PATH}feature_importance.pkl', 'wb') as f:
-            pickle.dump(self.base_model_importances, f)
-        logger.info(f"✓ Saved feature importance to {ENSEMBLE_MODELS_PATH}feature_importance.pkl")
-        
-        # Save metrics
-        with open(f'{ENSEMBLE_MODELS_PATH}test_metrics.pkl', 'wb') as f:
-            pickle.dump(self.test_metrics, f)
-        logger.info(f"✓ Saved test metrics to {ENSEMBLE_MODELS_PATH}test_metrics.pkl")
+        components = [
+            ('rf_model.pkl', self.rf_model, 'RF model'),
+            ('xgb_model.pkl', self.xgb_model, 'XGBoost model'),
+            ('meta_learner.pkl', self.meta_learner, 'meta-learner'),
+            ('scaler.pkl', self.scaler, 'feature scaler'),
+            ('scaler_meta.pkl', self.scaler_meta, 'meta-feature scaler'),
+            ('feature_importance.pkl', self.base_model_importances, 'feature importance'),
+            ('test_metrics.pkl', self.test_metrics, 'test metrics')
+        ]
+        payloads = {filename: pickle.dumps(obj) for filename, obj, _ in components}
+        
+        # Save memory-mapped bundle (preferred by the predictor over the pickles)
+        save_bundle(
+            rf_model=self.rf_model,
+            xgb_model=self.xgb_model,
+            meta_learner=self.meta_learner,
+            scaler=self.scaler,
+            scaler_meta=self.scaler_meta,
+            feature_names=self.feature_names,
+            feature_importance=self.base_model_importances,
+            test_metrics=self.test_metrics,
+            source=source,
+            native_hashes={
+                name: payload_sha256(payloads[filename])
+                for name, filename in NATIVE_MODEL_FILES.items()
+            }
+        )
+        
+        # Save the pickles (legacy format, and native models for SHAP / large batches)
+        for filename, _, label in components:
+            with open(f'{ENSEMBLE_MODELS_PATH}{filename}', 'wb') as f:
+                f.write(payloads[filename])
+            logger.info(f"✓ Saved {label} to {ENSEMBLE_MODELS_PATH}{filename}")
         
         log_step("Saving Ensemble Models", "success")
 
@@ -0,0 +1,319 @@
+"""
+Incremental Retraining - Warm-start refreshes from the previous models
+
+A full retrain rebuilds every model from scratch. For weekly refreshes
+with new seasonal data, an incremental update extends the deployed models
+instead:
+- Random Forest: warm_start grows INCREMENTAL_RF_TREES new trees on the new
+  data next to the existing ones. Beyond INCREMENTAL_MAX_RF_TREES the
+  oldest trees are dropped, so old seasons age out.
+- XGBoost: boosting continues from the saved booster for
+  INCREMENTAL_XGB_ROUNDS more rounds.
+- Meta-learner: refit on out-of-fold scores of the new data. The fold
+  models are the previous models extended on the other folds, and they
+  run in the stacking process pool.
+The feature scaler is kept as it is, because the existing trees split on
+its scaled values.
+
+A stratified holdout of the new batch scores the previous and the updated
+models. An update is only written when its holdout AUC is no worse than
+the previous one minus INCREMENTAL_MAX_AUC_DROP. The ensemble is written
+as its pickles plus a new artifact bundle version (source 'incremental').
+Both are picked up by the model registry's hot reload.
+
+Usage:
+    python -m backend.model.incremental data/kharif_week3   # data/kharif_week3_X.npy, _y.npy
+    python -m backend.model.incremental                     # fresh synthetic batch
+"""
+
+import copy
+import sys
+import numpy as np
+from sklearn.base import clone
+from sklearn.utils.class_weight import compute_class_weight
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.metrics import accuracy_score, roc_auc_score, f1_score
+from backend.utils.helpers import setup_logger, log_step
+from backend.utils.config import (
+    MODEL_PATH, TRAINING_WORKERS, INCREMENTAL_RF_TREES, INCREMENTAL_XGB_ROUNDS,
+    INCREMENTAL_MAX_RF_TREES, INCREMENTAL_MAX_AUC_DROP
+)
+from backend.model.registry import get_model_registry
+from backend.model.stacking import resolve_workers, fit_task, run_fit_tasks
+
+logger = setup_logger(__name__)
+
+ENSEMBLE_MODELS_PATH = 'backend/model/saved/ensemble/'
+
+
+def load_batch(path_prefix):
+    """Load a labelled batch written as `{prefix}_X.npy` and `{prefix}_y.npy`."""
+    return np.load(f'{path_prefix}_X.npy'), np.load(f'{path_prefix}_y.npy')
+
+
+def grow_forest(forest, n_new_trees, y=None, n_jobs=None):
+    """
+    Copy of a fitted forest set up to grow `n_new_trees` more trees on its
+    next fit() (warm_start); the original is not modified. With `y`, a
+    class_weight='balanced' preset is fixed to the weights of the whole new
+    batch, so every fold's new trees use the same weights.
+    """
+    grown = copy.deepcopy(forest)
+    if y is not None and forest.class_weight == 'balanced':
+        weights = compute_class_weight('balanced', classes=forest.classes_, y=y)
+        grown.set_params(class_weight=dict(zip(forest.classes_, weights)))
+    grown.set_params(
+        warm_start=True,
+        n_estimators=len(forest.estimators_) + n_new_trees,
+        oob_score=False,  # Bootstrap indices of the old trees refer to the old data
+        n_jobs=n_jobs if n_jobs is not None else forest.n_jobs
+    )
+    return grown
+
+
+def trim_forest(forest, max_trees):
+    """Keep only the newest `max_trees` trees of a fitted forest."""
+    if max_trees and len(forest.estimators_) > max_trees:
+        forest.estimators_ = forest.estimators_[-max_trees:]
+        forest.n_estimators = max_trees
+    forest.set_params(warm_start=False)
+    return forest
+
+
+def continue_booster(xgb_model, n_new_rounds, n_jobs=None):
+    """
+    Unfitted XGBClassifier and fit params that continue boosting from a
+    fitted model for `n_new_rounds` rounds.
+    """
+    booster = xgb_model.get_booster()
+    best_iteration = getattr(xgb_model, 'best_iteration', None)
+    if best_iteration is not None:
+        # Continue from the trees predict_proba actually used
+        booster = booster[:best_iteration + 1]
+
+    estimator = clone(xgb_model).set_params(
+        n_estimators=n_new_rounds,
+        early_stopping_rounds=None,
+        n_jobs=n_jobs if n_jobs is not None else xgb_model.get_params()['n_jobs']
+    )
+    return estimator, {'xgb_model': booster}
+
+
+def _holdout_split(X, y, test_size):
+    return train_test_split(X, y, test_size=test_size, random_state=42, stratify=y)
+
+
+def _scores(y_true, probability):
+    return {
+        'accuracy': accuracy_score(y_true, (probability >= 0.5).astype(int)),
+        'auc': roc_auc_score(y_true, probability)
+    }
+
+
+def _accept(previous_auc, updated_auc, max_auc_drop):
+    if updated_auc >= previous_auc - max_auc_drop:
+        return True
+    logger.warning(
+        f"Incremental update rejected: holdout AUC {updated_auc:.4f} vs previous "
+        f"{previous_auc:.4f} (max drop {max_auc_drop})"
+    )
+    return False
+
+
+def update_ensemble(X_new, y_new, n_new_trees=INCREMENTAL_RF_TREES, n_new_rounds=INCREMENTAL_XGB_ROUNDS,
+                    max_rf_trees=INCREMENTAL_MAX_RF_TREES, cv_folds=5, test_size=0.2,
+                    max_auc_drop=INCREMENTAL_MAX_AUC_DROP, max_workers=TRAINING_WORKERS, save=True):
+    """
+    Warm-start the saved ensemble on a new labelled batch.
+
+    Args:
+        X_new, y_new: raw (unscaled) features and labels of the new data
+        n_new_trees: trees added to the RF
+        n_new_rounds: boosting rounds added to XGBoost
+        max_rf_trees: RF size cap (oldest trees dropped beyond it)
+        cv_folds: folds for the meta-learner's out-of-fold scores
+        test_size: fraction of the batch held out to compare old vs new
+        max_auc_drop: largest holdout AUC drop that is still promoted
+        max_workers: process pool size (0 = one per CPU)
+        save: write pickles and a new bundle version if accepted
+
+    Returns:
+        {'accepted': bool, 'saved': bool, 'previous': {...}, 'updated': {...},
+         'rf_trees': int, 'xgb_rounds': int}
+    """
+    from backend.model.ensemble_train import EnsembleTrainer
+
+    log_step("Incremental Ensemble Update", "in_progress", f"({len(X_new)} new samples)")
+    registry = get_model_registry()
+    rf_model = registry.load(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl')
+    xgb_model = registry.load(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl')
+    meta_learner = registry.load(f'{ENSEMBLE_MODELS_PATH}meta_learner.pkl')
+    scaler = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler.pkl')
+    scaler_meta = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler_meta.pkl')
+    test_metrics = registry.load_optional(f'{ENSEMBLE_MODELS_PATH}test_metrics.pkl') or {}
+
+    X_train, X_test, y_train, y_test = _holdout_split(np.asarray(X_new), np.asarray(y_new), test_size)
+    X_train = scaler.transform(X_train)
+    X_test = scaler.transform(X_test)
+
+    def ensemble_probability(rf, xgb_clf, meta, meta_scaler, X):
+        meta_features = np.column_stack([rf.predict_proba(X)[:, 1], xgb_clf.predict_proba(X)[:, 1]])
+        return meta.predict_proba(meta_scaler.transform(meta_features))[:, 1]
+
+    previous = _scores(y_test, ensemble_probability(rf_model, xgb_model, meta_learner, scaler_meta, X_test))
+
+    # Fold fits (for out-of-fold meta-features) and the final fits in one pass
+    workers, threads = resolve_workers(max_workers)
+    folds = list(StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42).split(X_train, y_train))
+    tasks = []
+    for fold, (train_idx, val_idx) in list(enumerate(folds)) + [(None, (np.arange(len(X_train)), None))]:
+        X_val = X_train[val_idx] if val_idx is not None else None
+        y_val = y_train[val_idx] if val_idx is not None else None
+        booster, fit_params = continue_booster(xgb_model, n_new_rounds, threads)
+        tasks.append(('rf', fold, grow_forest(rf_model, n_new_trees, y_train, threads),
+                      X_train[train_idx], y_train[train_idx], X_val, y_val, None))
+        tasks.append(('xgb', fold, booster,
+                      X_train[train_idx], y_train[train_idx], X_val, y_val, None, fit_params))
+
+    oof = np.zeros((len(X_train), 2))
+    final = {}
+    for name, fold, model, val_pred, _, _ in run_fit_tasks(tasks, workers):
+        if fold is None:
+            final[name] = model
+        else:
+            oof[folds[fold][1], 0 if name == 'rf' else 1] = val_pred
+
+    rf_updated = trim_forest(final['rf'], max_rf_trees).set_params(n_jobs=rf_model.n_jobs)
+    xgb_updated = final['xgb']
+    xgb_updated.set_params(
+        n_estimators=xgb_updated.get_booster().num_boosted_rounds(),
+        n_jobs=xgb_model.get_params()['n_jobs']
+    )
+
+    # Meta-learner refit on fresh out-of-fold scores
+    scaler_meta_updated = clone(scaler_meta)
+    meta_updated = clone(meta_learner).fit(scaler_meta_updated.fit_transform(oof), y_train)
+
+    updated = _scores(y_test, ensemble_probability(rf_updated, xgb_updated, meta_updated, scaler_meta_updated, X_test))
+    logger.info(f"Holdout - previous ensemble: {previous}, updated ensemble: {updated}")
+    accepted = _accept(previous['auc'], updated['auc'], max_auc_drop)
+
+    saved = False
+    if accepted and save:
+        trainer = EnsembleTrainer()
+        feature_names = trainer.feature_names
+        trainer.rf_model = rf_updated
+        trainer.xgb_model = xgb_updated
+        trainer.meta_learner = meta_updated
+        trainer.scaler = scaler
+        trainer.scaler_meta = scaler_meta_updated
+        trainer.base_model_importances = {
+            'rf': dict(zip(feature_names, rf_updated.feature_importances_)),
+            'xgb': dict(zip(feature_names, xgb_updated.feature_importances_))
+        }
+        trainer.test_metrics = dict(test_metrics)
+        trainer.test_metrics.update({
+            'rf': _scores(y_test, rf_updated.predict_proba(X_test)[:, 1]),
+            'xgb': _scores(y_test, xgb_updated.predict_proba(X_test)[:, 1]),
+            'ensemble': updated,
+            'incremental': {
+                'samples': int(len(X_new)),
+                'previous_auc': previous['auc'],
+                'updates': test_metrics.get('incremental', {}).get('updates', 0) + 1
+            }
+        })
+        trainer.save_ensemble(source='incremental')
+        saved = True
+
+    log_step("Incremental Ensemble Update", "success" if accepted else "failed",
+             f"(AUC {previous['auc']:.4f} -> {updated['auc']:.4f})")
+    return {
+        'accepted': accepted,
+        'saved': saved,
+        'previous': previous,
+        'updated': updated,
+        'rf_trees': len(rf_updated.estimators_),
+        'xgb_rounds': xgb_updated.get_booster().num_boosted_rounds()
+    }
+
+
+def update_single_model(X_new, y_new, n_new_trees=INCREMENTAL_RF_TREES, max_trees=INCREMENTAL_MAX_RF_TREES,
+                        test_size=0.15, max_auc_drop=INCREMENTAL_MAX_AUC_DROP, save=True):
+    """
+    Warm-start the single Random Forest (crop_failure_model.pkl) on a new
+    labelled batch. Same holdout check as update_ensemble().
+
+    Returns:
+        {'accepted': bool, 'saved': bool, 'previous': {...}, 'updated': {...}, 'rf_trees': int}
+    """
+    from backend.model.train import ModelTrainer
+
+    log_step("Incremental Model Update", "in_progress", f"({len(X_new)} new samples)")
+    registry = get_model_registry()
+    model = registry.load(MODEL_PATH)
+    scaler = registry.load(MODEL_PATH.replace('.pkl', '_scaler.pkl'))
+    metrics = registry.load_optional(MODEL_PATH.replace('.pkl', '_metrics.pkl')) or {}
+
+    X_train, X_test, y_train, y_test = _holdout_split(np.asarray(X_new), np.asarray(y_new), test_size)
+    X_train = scaler.transform(X_train)
+    X_test = scaler.transform(X_test)
+
+    previous = _scores(y_test, model.predict_proba(X_test)[:, 1])
+    _, _, updated_model, _, _, _ = fit_task('rf', None, grow_forest(model, n_new_trees, y_train), X_train, y_train, None, None, None)
+    updated_model = trim_forest(updated_model, max_trees)
+
+    y_pred = updated_model.predict(X_test)
+    updated = _scores(y_test, updated_model.predict_proba(X_test)[:, 1])
+    logger.info(f"Holdout - previous model: {previous}, updated model: {updated}")
+    accepted = _accept(previous['auc'], updated['auc'], max_auc_drop)
+
+    saved = False
+    if accepted and save:
+        trainer = ModelTrainer()
+        trainer.model = updated_model
+        trainer.scaler = scaler
+        trainer.test_metrics = dict(metrics)
+        trainer.test_metrics.update({
+            'accuracy': updated['accuracy'],
+            'f1_score': f1_score(y_test, y_pred, average='weighted'),
+            'roc_auc': updated['auc'],
+            'incremental_updates': metrics.get('incremental_updates', 0) + 1
+        })
+        trainer.save_model()
+        saved = True
+
+    log_step("Incremental Model Update", "success" if accepted else "failed",
+             f"(AUC {previous['auc']:.4f} -> {updated['auc']:.4f})")
+    return {
+        'accepted': accepted,
+        'saved': saved,
+        'previous': previous,
+        'updated': updated,
+        'rf_trees': len(updated_model.estimators_)
+    }
+
+
+def incremental_refresh(path_prefix=None, seed=None, n_samples=2000):
+    """
+    Main entry point: update both the ensemble and the single model with a
+    labelled batch from disk, or with a fresh synthetic batch (new seed).
+    """
+    if path_prefix:
+        X_ens, y_ens = load_batch(path_prefix)
+        X_single, y_single = X_ens, y_ens
+    else:
+        from backend.preprocessing.synthetic_data import generate_training_data
+        seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2**31)
+        X_ens, y_ens = generate_training_data(n_samples, profile='ensemble', seed=seed)
+        X_single, y_single = generate_training_data(n_samples, profile='single', seed=seed)
+
+    return {
+        'ensemble': update_ensemble(X_ens, y_ens),
+        'single_model': update_single_model(X_single, y_single)
+    }
+
+
+if __name__ == '__main__':
+    result = incremental_refresh(sys.argv[1] if len(sys.argv) > 1 else None)
+    for name, summary in result.items():
+        logger.info(f"{name}: {summary}")
@@ -1,9 +1,12 @@
 import numpy as np
-import pickle
 import os
+import threading
 from backend.utils.helpers import setup_logger, log_step
 from backend.utils.config import MODEL_PATH, FEATURE_IMPORTANCE_PATH
-from backend.preprocessing.feature_engineering import prepare_feature_vector
+from backend.preprocessing.feature_engineering import (
+    prepare_feature_vector, prepare_feature_batch, build_feature_matrix
+)
+from backend.model.registry import get_model_registry
 
 logger = setup_logger(__name__)
 
@@ -24,68 +27,62 @@ class ModelPredictor:
         self.load_model()
     
     def load_model(self):
-        """Load trained model, scaler, and metadata from disk."""
+        """Load trained model, scaler, and metadata through the shared model registry."""
         if not os.path.exists(MODEL_PATH):
             logger.error(f"Model not found at {MODEL_PATH}")
             logger.info("Training model now...")
             from backend.model.train import train_crop_failure_model
             train_crop_failure_model()
         
+        registry = get_model_registry()
+        
         # Load model
-        with open(MODEL_PATH, 'rb') as f:
-            self.model = pickle.load(f)
+        self.model = registry.load(MODEL_PATH)
         
         # Load scaler
-        scaler_path = MODEL_PATH.replace('.pkl', '_scaler.pkl')
-        if os.path.exists(scaler_path):
-            with open(scaler_path, 'rb') as f:
-                self.scaler = pickle.load(f)
+        self.scaler = registry.load_optional(MODEL_PATH.replace('.pkl', '_scaler.pkl'))
         
         # Load feature importance
-        if os.path.exists(FEATURE_IMPORTANCE_PATH):
-            with open(FEATURE_IMPORTANCE_PATH, 'rb') as f:
-                self.feature_importance = pickle.load(f)
+        self.feature_importance = registry.load_optional(FEATURE_IMPORTANCE_PATH)
         
         # Load training metrics
-        metrics_path = MODEL_PATH.replace('.pkl', '_metrics.pkl')
-        if os.path.exists(metrics_path):
-            with open(metrics_path, 'rb') as f:
-                self.model_metrics = pickle.load(f)
+        self.model_metrics = registry.load_optional(MODEL_PATH.replace('.pkl', '_metrics.pkl'))
         
         log_step("Model Loading", "success")
     
-    def predict(self, state, district, crop, season):
+    def artifact_paths(self):
+        """Paths of the artifacts this predictor was built from."""
+        return [
+            MODEL_PATH,
+            MODEL_PATH.replace('.pkl', '_scaler.pkl'),
+            FEATURE_IMPORTANCE_PATH,
+            MODEL_PATH.replace('.pkl', '_metrics.pkl')
+        ]
+    
+    def is_stale(self):
+        """True if any loaded artifact has changed on disk since it was loaded."""
+        registry = get_model_registry()
+        return any(
+            os.path.exists(path) and not registry.is_current(path)
+            for path in self.artifact_paths()
+        )
+    
+    def score_matrix(self, feature_matrix):
         """
-        Predict crop failure risk with confidence scores and detailed explanation.
-        Returns: risk_level, probability, confidence, explanation, raw_features
+        Score an (N, 8) matrix of normalized features with one predict_proba call.
+        Returns: array of failure probabilities, shape (N,)
         """
-        log_step("Prediction Pipeline", "in_progress")
-        
-        # Prepare features
-        norm_features, raw_features = prepare_feature_vector(state, district, crop, season)
-        
-        # Create feature vector
-        feature_vector = np.array([
-            norm_features['ndvi_mean'],
-            norm_features['ndvi_trend'],
-            norm_features['ndvi_variance'],
-            norm_features['rainfall_deviation'],
-            norm_features['temperature_anomaly'],
-            norm_features['soil_moisture_index'],
-            norm_features['soil_type_encoded'],
-            norm_features['pest_frequency']
-        ]).reshape(1, -1)
+        feature_matrix = np.asarray(feature_matrix, dtype=float).reshape(-1, len(self.feature_names))
         
         # Apply scaling if scaler is available
         if self.scaler is not None:
-            feature_vector = self.scaler.transform(feature_vector)
-        
-        # Get prediction
-        prediction = self.model.predict(feature_vector)[0]
-        probability = self.model.predict_proba(feature_vector)[0]
+            feature_matrix = self.scaler.transform(feature_matrix)
         
+        return self.model.predict_proba(feature_matrix)[:, 1]
+    
+    def _result_from_probability(self, risk_probability, norm_features, raw_features):
+        """Build the prediction result dict for one scored feature vector."""
         # Calculate confidence score (distance from decision boundary)
-        risk_probability = probability[1]  # Probability of failure
         confidence = abs(risk_probability - 0.5) * 2  # Scale 0-1
         
         # Determine risk level with refined thresholds
@@ -99,8 +96,6 @@ class ModelPredictor:
         # Get detailed explanation
         explanation = self._get_explanation(norm_features, raw_features, risk_probability, confidence)
         
-        log_step("Prediction Pipeline", "success")
-        
         return {
             'risk_level': risk_level,
             'probability': float(risk_probability),
@@ -110,6 +105,52 @@ class ModelPredictor:
             'model_accuracy': self.model_metrics.get('accuracy', 0.9) if self.model_metrics else 0.9
         }
     
+    def predict(self, state, district, crop, season):
+        """
+        Predict crop failure risk with confidence scores and detailed explanation.
+        Returns: risk_level, probability, confidence, explanation, raw_features
+        """
+        log_step("Prediction Pipeline", "in_progress")
+        
+        # Prepare features
+        norm_features, raw_features = prepare_feature_vector(state, district, crop, season)
+        
+        # Probability of failure
+        risk_probability = self.score_matrix(build_feature_matrix([norm_features]))[0]
+        
+        result = self._result_from_probability(risk_probability, norm_features, raw_features)
+        
+        log_step("Prediction Pipeline", "success")
+        
+        return result
+    
+    def predict_batch(self, items):
+        """
+        Vectorised prediction for many requests.
+        
+        Features are gathered per item, stacked into one (N, 8) matrix and
+        scored with a single predict_proba call.
+        Returns: list aligned with items of {'status': 'success', 'data': result}
+        or {'status': 'error', 'error': message}
+        """
+        log_step("Batch Prediction Pipeline", "in_progress", f"({len(items)} items)")
+        
+        prepared = prepare_feature_batch(items)
+        ok_rows = [i for i, p in enumerate(prepared) if not isinstance(p, Exception)]
+        
+        results = [{'status': 'error', 'error': str(p)} for p in prepared]
+        if ok_rows:
+            probabilities = self.score_matrix(build_feature_matrix([prepared[i][0] for i in ok_rows]))
+            for risk_probability, i in zip(probabilities, ok_rows):
+                norm_features, raw_features = prepared[i]
+                results[i] = {
+                    'status': 'success',
+                    'data': self._result_from_probability(risk_probability, norm_features, raw_features)
+                }
+        
+        log_step("Batch Prediction Pipeline", "success", f"({len(ok_rows)}/{len(items)} scored)")
+        return results
+    
     def _get_explanation(self, norm_features, raw_features, risk_probability, confidence):
         """Generate detailed explanation with top contributing factors."""
         if self.feature_importance is None:
@@ -197,7 +238,27 @@ class ModelPredictor:
         else:
             return "High pest infestation risk"
 
+# Singleton instance for API use
+_model_predictor = None
+_model_predictor_lock = threading.Lock()
+
+
+def get_model_predictor():
+    """Get or create singleton predictor, rebuilding it if its artifacts changed on disk."""
+    global _model_predictor
+    if _model_predictor is None or _model_predictor.is_stale():
+        with _model_predictor_lock:
+            if _model_predictor is None or _model_predictor.is_stale():
+                _model_predictor = ModelPredictor()
+    return _model_predictor
+
+
 def get_prediction(state, district, crop, season):
     """Public interface for predictions."""
-    predictor = ModelPredictor()
+    predictor = get_model_predictor()
     return predictor.predict(state, district, crop, season)
+
+def get_batch_predictions(items):
+    """Public interface for vectorised batch predictions."""
+    predictor = get_model_predictor()
+    return predictor.predict_batch(items)
@@ -0,0 +1,130 @@
+"""
+Model Registry - Process-wide cache for trained model artifacts
+
+Loads each pickled artifact (single RF, ensemble RF/XGBoost/meta-learner,
+yield model, crop recommender) once per process and hands out shared
+references. An artifact is reloaded transparently when its file's
+modification time changes on disk, so retraining takes effect without a
+restart. A load that fails is remembered with the file's mtime as well,
+so a broken artifact raises the same error until the file changes rather
+than being re-read on every request.
+"""
+
+import os
+import pickle
+import threading
+from backend.utils.helpers import setup_logger, log_step
+
+logger = setup_logger(__name__)
+
+
+def _load_pickle(path):
+    """Default loader: unpickle an artifact from disk."""
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class _FailedLoad:
+    """Negative registry entry: the error raised by the last load of a file."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class ModelRegistry:
+    """Thread-safe, mtime-aware cache of loaded model artifacts."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.RLock()
+        self._entries = {}  # path -> (mtime, artifact or _FailedLoad)
+        self.version = 0  # Incremented whenever any artifact is (re)loaded
+
+    def load(self, path, loader=_load_pickle):
+        """
+        Return the artifact stored at `path`, loading it on first use or
+        when the file on disk has changed since it was cached.
+
+        Raises FileNotFoundError if the artifact does not exist, and the
+        loader's error if it cannot be read (cached until the file changes).
+        """
+        path = os.path.normpath(path)
+        mtime = os.path.getmtime(path)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == mtime:
+            return self._unwrap(entry[1])
+
+        with self._lock:
+            # Another thread may have loaded it while we waited for the lock
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                return self._unwrap(entry[1])
+
+            action = "Reloading" if entry is not None else "Loading"
+            log_step(f"Model Registry - {action}", "in_progress", f"({path})")
+            try:
+                artifact = loader(path)
+            except Exception as e:
+                self._entries[path] = (mtime, _FailedLoad(e))
+                self.version += 1
+                log_step(f"Model Registry - {action}", "error", f"({path}: {e})")
+                raise
+            self._entries[path] = (mtime, artifact)
+            self.version += 1
+            log_step(f"Model Registry - {action}", "success", f"({path})")
+            return artifact
+
+    @staticmethod
+    def _unwrap(artifact):
+        """Return a cached artifact, re-raising the error of a cached failed load."""
+        if isinstance(artifact, _FailedLoad):
+            raise artifact.error.with_traceback(None)
+        return artifact
+
+    def load_optional(self, path, loader=_load_pickle):
+        """Like load(), but return None if the artifact does not exist."""
+        try:
+            return self.load(path, loader)
+        except FileNotFoundError:
+            return None
+
+    def is_current(self, path):
+        """True if `path` is cached (loaded or failed) and unchanged on disk."""
+        path = os.path.normpath(path)
+        entry = self._entries.get(path)
+        if entry is None:
+            return False
+        try:
+            return entry[0] == os.path.getmtime(path)
+        except OSError:
+            return False
+
+    def invalidate(self, path=None):
+        """Drop one cached artifact, or all of them if `path` is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.normpath(path), None)
+            self.version += 1
+
+
+# Singleton instance
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """Get or create singleton model registry."""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
+
+
+def load_artifact(path):
+    """Load a pickled artifact through the shared registry."""
+    return get_model_registry().load(path)
@@ -0,0 +1,223 @@
+"""
+Explanation Response Cache - Reuse explanation bundles for identical conditions
+
+/api/explain and /api/advisory run ensemble prediction, SHAP explanation
+and counterfactuals after ingestion, which is the most expensive path in
+the service. All of this depends only on the normalized feature vector
+and the loaded models, and neighbouring districts often share the same
+conditions. Results are therefore cached under:
+- a fingerprint of the normalized features, rounded to
+  RESPONSE_CACHE_DECIMALS;
+- the identity of the models on disk (the served ensemble, as in the risk
+  table, plus the bundle and pickles SHAP explains), so writing a new
+  model empties the cache and loading an explainer does not;
+- for a rendered advisory, the language as well.
+
+The advisory plan (see AdvisoryEngine.compute_advisory) is cached with
+the bundle, so an advisory in a new language only renders the templates.
+The cache is an in-process LRU bounded at RESPONSE_CACHE_SIZE entries.
+On a hit, the request's own raw and normalized features replace the cached
+ones in the prediction and explanation. The model identity is read from
+disk once per request and shared by every lookup that request makes.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from backend.utils.config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_DECIMALS, USE_RESPONSE_CACHE
+from backend.utils.helpers import setup_logger
+from backend.preprocessing.feature_engineering import FEATURE_NAMES
+from backend.model.artifacts import BUNDLE_PATH, current_bundle_path
+from backend.model.ensemble import ENSEMBLE_MODELS_PATH, ensemble_predict
+from backend.model.risk_table import model_identity
+
+logger = setup_logger(__name__)
+
+# Pickles behind SHAP explanations (matched to the bundle, or used directly)
+EXPLAINED_ARTIFACTS = ('rf_model.pkl', 'xgb_model.pkl', 'scaler.pkl', 'meta_learner.pkl', 'scaler_meta.pkl')
+
+
+def feature_fingerprint(normalized_features, decimals=RESPONSE_CACHE_DECIMALS):
+    """Hash of the normalized feature vector rounded to `decimals` places."""
+    vector = np.round([normalized_features[name] for name in FEATURE_NAMES], decimals) + 0.0  # No -0.0
+    return hashlib.sha1(vector.astype(np.float64).tobytes()).hexdigest()[:20]
+
+
+def model_version():
+    """
+    Identity of the models behind a cached response: the served ensemble
+    (risk_table.model_identity()), the full bundle and the pickles that
+    SHAP explains.
+    """
+    mtimes = [
+        os.path.getmtime(f'{ENSEMBLE_MODELS_PATH}{filename}')
+        for filename in EXPLAINED_ARTIFACTS
+        if os.path.exists(f'{ENSEMBLE_MODELS_PATH}{filename}')
+    ]
+    return f'{model_identity()}|{current_bundle_path(BUNDLE_PATH)}|pickles@{max(mtimes, default=0):.3f}'
+
+
+class ResponseCache:
+    """Thread-safe LRU of computed responses, emptied when the model version changes."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> value
+        self._version = None
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Cached value for `key` under model `version`, or None."""
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key, value, version):
+        """Store `value` computed with model `version`; dropped if the cache has moved on."""
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, version=None):
+        """
+        Return the cached value for `key`, calling `compute()` on a miss.
+        
+        `version` is the model_version() read at the start of the request;
+        it is read here if not given. A value computed while a model was
+        being replaced is stored under the old version, which the next
+        request reading the new version empties.
+        """
+        if not USE_RESPONSE_CACHE:
+            return compute()
+        if version is None:
+            version = model_version()
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.put(key, value, version)
+        return value
+
+    def invalidate(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        """Entry count, bound, current model version and hit/miss counters."""
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'model_version': self._version, **self.stats}
+
+
+# Singleton instance
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Get or create singleton response cache."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
+
+
+def request_model_version():
+    """model_version() for one request, or None when the cache is disabled."""
+    return model_version() if USE_RESPONSE_CACHE else None
+
+
+def explanation_bundle(context, counterfactual_mode='scenarios', version=None):
+    """
+    Prediction, SHAP explanation and counterfactuals for a feature context,
+    served from the cache when the same conditions were explained before.
+    `version` is the request's model version (see request_model_version()).
+
+    Returns:
+        {'prediction': ..., 'explanation': ..., and 'counterfactuals' or
+        'minimal_counterfactual' depending on counterfactual_mode}
+    """
+    def compute():
+        from backend.model.shap_explainer import explain_ensemble_prediction
+        from backend.model.counterfactual import generate_counterfactuals, search_counterfactual
+
+        state, district, crop, season = context.state, context.district, context.crop, context.season
+        prediction = ensemble_predict(state, district, crop, season, context=context)
+        bundle = {
+            'prediction': prediction,
+            'explanation': explain_ensemble_prediction(state, district, crop, season, context=context)
+        }
+        if counterfactual_mode == 'search':
+            bundle['minimal_counterfactual'] = search_counterfactual(
+                state, district, crop, season, prediction, context=context
+            )
+        else:
+            bundle['counterfactuals'] = generate_counterfactuals(
+                state, district, crop, season, prediction, context=context
+            )
+        return bundle
+
+    key = ('bundle', feature_fingerprint(context.normalized_features), counterfactual_mode)
+    bundle = get_response_cache().get_or_compute(key, compute, version)
+    # The request's own features (crop, season, ingestion status, unrounded
+    # values) replace those of whichever request filled the cache
+    return {
+        **bundle,
+        'prediction': {
+            **bundle['prediction'],
+            'raw_features': context.raw_features,
+            'normalized_features': context.normalized_features
+        },
+        'explanation': {**bundle['explanation'], 'raw_features': context.raw_features}
+    }
+
+
+def cached_advisory(context, languages=('en',)):
+    """
+    Explanation bundle, language-independent advisory plan, and the plan
+    rendered in each of `languages`. New languages for known conditions
+    are only rendered.
+
+    Returns:
+        (bundle, plan, {language: advisory})
+    """
+    from backend.model.advisor import compute_advisory, render_advisory
+
+    version = request_model_version()
+    bundle = explanation_bundle(context, version=version)
+    fingerprint = feature_fingerprint(context.normalized_features)
+    cache = get_response_cache()
+    plan = cache.get_or_compute(
+        ('advisory_plan', fingerprint),
+        lambda: compute_advisory(bundle['prediction'], bundle['explanation'], bundle['counterfactuals']),
+        version
+    )
+    advisories = {
+        language: cache.get_or_compute(
+            ('advisory', fingerprint, language), lambda: render_advisory(plan, [language])[language], version
+        )
+        for language in languages
+    }
+    return bundle, plan, advisories
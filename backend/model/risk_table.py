@@ -0,0 +1,379 @@
+"""
+Precomputed Risk Table - Nightly ensemble scores with O(1) lookup
+
+Most /api/predict-ensemble traffic asks for the same (state, district,
+crop, season) combinations, and their inputs barely change within a day.
+A nightly build scores every combination in STATES x CROPS x SEASONS with
+a full-India sweep job (see backend/jobs.py), which uses vectorised
+batches. The results are written as a columnar table:
+
+    data/risk_table/
+        CURRENT                  # Name of the active version, e.g. "v0003"
+        v0003/
+            manifest.json        # Vocabularies, model identity, build time
+            state.npy, district.npy, crop.npy, season.npy   (int16 codes)
+            ensemble_probability.npy, rf_probability.npy, xgb_probability.npy,
+            confidence.npy, risk_level.npy (uint8 code), models_used.npy,
+            scored_at.npy (0 = failed), degraded.npy (uint8),
+            normalized.npy / raw.npy (N x 8)
+            ingestion.jsonl      # Per-row ingestion report, one JSON line per row
+
+Columns are memory-mapped at load time. The index is rebuilt from the
+dictionary-encoded key columns as a dict {(state, district, crop,
+season): row}, and the value columns are copied into two small row-major
+arrays, so a hot read is one dict lookup plus two row slices
+(microseconds).
+
+A row is served only while it is fresh: it scored successfully from live
+inputs (no ingestion source fell back to mock data), it is younger than
+RISK_TABLE_TTL, and it was scored by the ensemble that is currently
+deployed. Anything else falls back to live scoring. Served rows carry the
+ingestion report they were scored with, like a live result.
+
+Nightly build (e.g. from cron):
+    python -m backend.model.risk_table
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from backend.utils.config import (
+    USE_ARTIFACT_BUNDLE, RISK_TABLE_PATH, RISK_TABLE_TTL, RISK_TABLE_KEEP_VERSIONS,
+    RISK_TABLE_IDENTITY_RECHECK
+)
+from backend.utils.helpers import setup_logger, log_step
+from backend.preprocessing.feature_engineering import FEATURE_NAMES
+from backend.model.registry import get_model_registry
+from backend.model.artifacts import current_bundle_path
+from backend.model.ensemble import ENSEMBLE_MODELS_PATH, BUNDLE_ROOT, ensemble_predict
+
+logger = setup_logger(__name__)
+
+RISK_TABLE_POINTER = f'{RISK_TABLE_PATH}CURRENT'
+RISK_TABLE_FORMAT_VERSION = 2
+KEY_COLUMNS = ('state', 'district', 'crop', 'season')
+RISK_LEVELS = ('Low', 'Medium', 'High')
+SCORE_COLUMNS = (
+    'ensemble_probability', 'rf_probability', 'xgb_probability', 'confidence',
+    'risk_level', 'models_used', 'scored_at', 'degraded', 'crop', 'season'
+)
+SCORED_AT = SCORE_COLUMNS.index('scored_at')
+DEGRADED = SCORE_COLUMNS.index('degraded')
+INGESTION_FILE = 'ingestion.jsonl'
+
+
+def model_identity():
+    """
+    Identifies the ensemble that serves live predictions: the active
+    bundle version directory, or the newest ensemble pickle's mtime.
+    """
+    if USE_ARTIFACT_BUNDLE:
+        path = current_bundle_path(BUNDLE_ROOT)
+        if path is not None:
+            return os.path.normpath(path)
+    mtimes = [
+        os.path.getmtime(f'{ENSEMBLE_MODELS_PATH}{filename}')
+        for filename in ('rf_model.pkl', 'xgb_model.pkl', 'meta_learner.pkl')
+        if os.path.exists(f'{ENSEMBLE_MODELS_PATH}{filename}')
+    ]
+    return f'pickles@{max(mtimes, default=0):.0f}'
+
+
+_identity = {'value': None, 'checked_at': 0.0}
+
+
+def current_model_identity():
+    """model_identity(), re-read from disk at most every RISK_TABLE_IDENTITY_RECHECK seconds."""
+    now = time.monotonic()
+    if _identity['value'] is None or now - _identity['checked_at'] > RISK_TABLE_IDENTITY_RECHECK:
+        _identity['value'] = model_identity()
+        _identity['checked_at'] = now
+    return _identity['value']
+
+
+class RiskTable:
+    """A loaded risk table version: memory-mapped columns plus the key index."""
+
+    def __init__(self, path, manifest, columns, ingestion):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.model_identity = manifest['model_identity']
+        self.columns = columns
+        self._ingestion = ingestion  # One JSON string (or 'null') per row
+
+        vocabularies = manifest['vocabularies']
+        keys = zip(*(
+            np.array(vocabularies[name], dtype=object)[columns[name]]
+            for name in KEY_COLUMNS
+        ))
+        self._index = {key: row for row, key in enumerate(keys)}
+        self._crops = vocabularies['crop']
+        self._seasons = vocabularies['season']
+
+        # Row-major copies of the per-row result values (~2.5 MB), so a read
+        # is two row slices instead of one mmap access per column
+        self._scores = np.column_stack([columns[name].astype(np.float64) for name in SCORE_COLUMNS])
+        self._features = np.hstack([columns['normalized'], columns['raw']])
+        self._scores.setflags(write=False)
+        self._features.setflags(write=False)
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        """All (state, district, crop, season) combinations in the table."""
+        return list(self._index)
+
+    def row(self, state, district, crop, season):
+        """Row number of a combination, or None if the table does not have it."""
+        return self._index.get((state, district, crop, season))
+
+    def is_fresh(self, row, now=None):
+        """True if the row scored successfully from live inputs, within the TTL, with the deployed model."""
+        scored_at = self._scores[row, SCORED_AT]
+        if scored_at <= 0 or self._scores[row, DEGRADED]:
+            return False
+        if (now or time.time()) - scored_at > RISK_TABLE_TTL:
+            return False
+        return self.model_identity == current_model_identity()
+
+    def result(self, row):
+        """The row as an ensemble_predict() result dict."""
+        ensemble_prob, rf_prob, xgb_prob, confidence, risk_level, models_used, scored_at, _, crop, season = (
+            self._scores[row].tolist()
+        )
+        n_features = len(FEATURE_NAMES)
+        values = self._features[row].tolist()
+        raw = dict(zip(FEATURE_NAMES, values[n_features:]))
+        raw['soil_type_encoded'] = int(raw['soil_type_encoded'])
+        raw['crop'] = self._crops[int(crop)]
+        raw['season'] = self._seasons[int(season)]
+        ingestion = json.loads(self._ingestion[row])
+        if ingestion is not None:
+            raw['ingestion'] = ingestion
+        return {
+            'risk_level': RISK_LEVELS[int(risk_level)],
+            'ensemble_probability': ensemble_prob,
+            'rf_probability': None if rf_prob != rf_prob else rf_prob,  # NaN: model unavailable
+            'xgb_probability': None if xgb_prob != xgb_prob else xgb_prob,
+            'confidence': confidence,
+            'models_used': int(models_used),
+            'raw_features': raw,
+            'normalized_features': dict(zip(FEATURE_NAMES, values[:n_features])),
+            'scored_at': datetime.fromtimestamp(scored_at).isoformat(timespec='seconds')
+        }
+
+    def lookup(self, state, district, crop, season):
+        """Fresh precomputed result for a combination, or None (missing or stale)."""
+        row = self.row(state, district, crop, season)
+        if row is None or not self.is_fresh(row):
+            return None
+        return self.result(row)
+
+
+def _encode(values):
+    """Dictionary-encode a list of strings: (vocabulary, int16 codes)."""
+    vocabulary = sorted(set(values))
+    lookup = {value: code for code, value in enumerate(vocabulary)}
+    return vocabulary, np.array([lookup[value] for value in values], dtype=np.int16)
+
+
+def save_risk_table(results, identity, scored_at, root=RISK_TABLE_PATH, keep=RISK_TABLE_KEEP_VERSIONS):
+    """
+    Write a new risk table version from sweep results and make it current.
+
+    Args:
+        results: sweep job results, one dict per combination with the
+            key columns, 'status' and (on success) 'data'
+        identity: model_identity() of the ensemble that scored them
+        scored_at: Unix time the scores were computed
+
+    Returns:
+        Path of the new version directory
+    """
+    log_step("Saving Risk Table", "in_progress", f"({len(results)} rows)")
+    os.makedirs(root, exist_ok=True)
+
+    n = len(results)
+    ok = np.array([result['status'] == 'success' for result in results])
+    data = [result.get('data') or {} for result in results]
+    ingestion = [(d.get('raw_features') or {}).get('ingestion') for d in data]
+    degraded = np.array([bool(report and report.get('degraded')) for report in ingestion], dtype=np.uint8)
+
+    def number(key):
+        return np.array([
+            d[key] if d.get(key) is not None else np.nan for d in data
+        ], dtype=np.float64)
+
+    def features(key):
+        matrix = np.full((n, len(FEATURE_NAMES)), np.nan)
+        for row, d in enumerate(data):
+            if key in d:
+                matrix[row] = [d[key][name] for name in FEATURE_NAMES]
+        return matrix
+
+    vocabularies = {}
+    columns = {}
+    for name in KEY_COLUMNS:
+        vocabularies[name], columns[name] = _encode([result[name] for result in results])
+    columns.update({
+        'ensemble_probability': number('ensemble_probability'),
+        'rf_probability': number('rf_probability'),
+        'xgb_probability': number('xgb_probability'),
+        'confidence': number('confidence'),
+        'risk_level': np.array([RISK_LEVELS.index(d.get('risk_level', 'Low')) for d in data], dtype=np.uint8),
+        'models_used': np.array([d.get('models_used', 0) for d in data], dtype=np.int8),
+        'scored_at': np.where(ok, float(scored_at), 0.0),
+        'degraded': degraded,
+        'normalized': features('normalized_features'),
+        'raw': features('raw_features')
+    })
+
+    versions = [int(name[1:]) for name in os.listdir(root) if name.startswith('v') and name[1:].isdigit()]
+    name = f'v{max(versions, default=0) + 1:04d}'
+    staging = tempfile.mkdtemp(prefix=f'.{name}-', dir=root)
+    try:
+        for column, array in columns.items():
+            np.save(os.path.join(staging, f'{column}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(staging, INGESTION_FILE), 'w') as f:
+            f.writelines(json.dumps(report) + '\n' for report in ingestion)
+        manifest = {
+            'format_version': RISK_TABLE_FORMAT_VERSION,
+            'version': name,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'scored_at': float(scored_at),
+            'model_identity': identity,
+            'rows': n,
+            'failed_rows': int(n - ok.sum()),
+            'degraded_rows': int(degraded[ok].sum()),
+            'feature_names': list(FEATURE_NAMES),
+            'vocabularies': vocabularies,
+            'columns': sorted(columns)
+        }
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        path = os.path.join(root, name)
+        os.rename(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Activate atomically; readers see either the old or the new table
+    pointer = os.path.join(root, 'CURRENT.tmp')
+    with open(pointer, 'w') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, 'CURRENT'))
+
+    old = sorted(v for v in os.listdir(root) if v.startswith('v') and v[1:].isdigit())[:-keep]
+    for version in old:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+    log_step("Saving Risk Table", "success",
+             f"({path}, {manifest['failed_rows']} failed, {manifest['degraded_rows']} degraded rows)")
+    return path
+
+
+def load_risk_table(pointer_path):
+    """Registry loader: open the table version named by a CURRENT pointer file."""
+    root = os.path.dirname(pointer_path)
+    with open(pointer_path) as f:
+        path = os.path.join(root, f.read().strip())
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != RISK_TABLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported risk table format: {manifest.get('format_version')}")
+    columns = {
+        name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        for name in manifest['columns']
+    }
+    with open(os.path.join(path, INGESTION_FILE)) as f:
+        ingestion = f.read().splitlines()
+    return RiskTable(path, manifest, columns, ingestion)
+
+
+def build_risk_table(job_id=None, poll_interval=2.0, root=RISK_TABLE_PATH):
+    """
+    Score every combination and write a new risk table version.
+
+    Runs a full-India ensemble sweep job and waits for it, or builds from
+    an already completed sweep job when `job_id` is given.
+
+    Returns:
+        Path of the new version directory
+    """
+    from backend.jobs import get_sweep_job_manager, FINISHED_STATES
+
+    log_step("Building Risk Table", "in_progress")
+    manager = get_sweep_job_manager()
+    identity = model_identity()
+    if job_id is None:
+        job_id = manager.submit({'model': 'ensemble'})['id']
+
+    job = manager.store.get(job_id)
+    while job['status'] not in FINISHED_STATES:
+        time.sleep(poll_interval)
+        job = manager.store.get(job_id)
+        logger.info(f"Risk table sweep {job_id}: {job['done']}/{job['total']}")
+
+    if job['status'] == 'cancelled' or job['spec']['model'] != 'ensemble':
+        raise RuntimeError(f"Sweep job {job_id} cannot build a risk table ({job['status']}, {job['spec']['model']})")
+
+    results = manager.store.results(job_id, 0, job['total'])
+    path = save_risk_table(results, identity, job['started_at'], root=root)
+    log_step("Building Risk Table", "success", f"({job['done'] - job['failed']}/{job['total']} rows scored)")
+    return path
+
+
+def get_risk_table():
+    """The current risk table (reloaded when a new version is activated), or None."""
+    try:
+        return get_model_registry().load_optional(RISK_TABLE_POINTER, loader=load_risk_table)
+    except Exception as e:
+        logger.warning(f"Risk table unavailable: {e}")
+        return None
+
+
+def lookup_risk(state, district, crop, season):
+    """Fresh precomputed ensemble result for a combination, or None."""
+    table = get_risk_table()
+    if table is None:
+        return None
+    return table.lookup(state, district, crop, season)
+
+
+def predict_risk(state, district, crop, season):
+    """
+    Ensemble prediction served from the risk table when its row is fresh,
+    otherwise scored live.
+
+    Returns:
+        (result dict, 'risk_table' or 'live')
+    """
+    result = lookup_risk(state, district, crop, season)
+    if result is not None:
+        return result, 'risk_table'
+    return ensemble_predict(state, district, crop, season), 'live'
+
+
+def benchmark_lookup(repeats=10000):
+    """Mean microseconds per fresh table read, over random table rows."""
+    table = get_risk_table()
+    if table is None:
+        raise RuntimeError("No risk table; build one first")
+    keys = table.keys()
+    rng = np.random.default_rng(0)
+    picks = [keys[i] for i in rng.integers(0, len(keys), size=repeats)]
+    start = time.perf_counter()
+    for key in picks:
+        lookup_risk(*key)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+if __name__ == '__main__':
+    build_risk_table()
+    logger.info(f"Risk table lookup: {benchmark_lookup():.1f} us per read")
@@ -3,22 +3,64 @@ SHAP Explainability Module - Feature Importance Analysis
 
 Provides SHAP-based explanations for ensemble predictions.
 Shows which features most influenced each prediction.
+
+TreeSHAP values are computed per prediction with the cached explainers,
+for any number of rows in one pass:
+- RF values explain the class-1 probability directly
+- XGBoost values explain the log-odds margin and are rescaled so they sum
+  to the probability change from the expected value
+- Ensemble values weight both by the meta-learner's coefficients (divided
+  by the meta-feature scaler's scale), then are rescaled the same way
+
+shap is imported on first use (it takes seconds to import), so importing
+this module is cheap.
+
+When the ensemble is served from an artifact bundle, the explainers are
+built from the pickles that bundle was built from (checked by hash), with
+the bundle's own scalers and meta-learner; if the pickles on disk belong
+to another training, explanation fails instead of describing other models.
+
+TreeSHAP needs the native models, which compressed bundles (pruned or
+distilled, see compression.py) do not have. With ENSEMBLE_VARIANT=compressed
+the full ensemble is explained instead, and every explanation says so in
+its 'explained_model' field.
 """
 
 import numpy as np
-import pickle
 import os
-from shap import TreeExplainer, force_plot, summary_plot
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
+import threading
 
 from backend.utils.helpers import setup_logger, log_step
-from backend.preprocessing.feature_engineering import prepare_feature_vector
+from backend.preprocessing.feature_engineering import (
+    FeatureContext, prepare_feature_batch, build_feature_matrix
+)
+from backend.model.registry import get_model_registry
+from backend.model.ensemble import get_ensemble_predictor
+from backend.model.artifacts import BUNDLE_PATH, current_bundle_path, load_current_bundle
 
 logger = setup_logger(__name__)
 
 ENSEMBLE_MODELS_PATH = 'backend/model/saved/ensemble/'
+FULL_BUNDLE_POINTER = f'{BUNDLE_PATH}CURRENT'
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _to_probability_space(margin_shap, probability, expected_probability):
+    """
+    Rescale log-odds SHAP values (N, F) so each row sums to
+    probability - expected_probability, keeping their relative sizes.
+    Rows whose margin contributions cancel out use the local slope p(1-p).
+    """
+    margin_total = margin_shap.sum(axis=1)
+    target_total = probability - expected_probability
+    safe_total = np.where(np.abs(margin_total) > 1e-9, margin_total, 1.0)
+    scale = np.where(np.abs(margin_total) > 1e-9,
+                     target_total / safe_total,
+                     probability * (1 - probability))
+    return margin_shap * scale[:, None]
 
 
 class SHAPExplainer:
@@ -31,6 +73,12 @@ class SHAPExplainer:
         self.rf_explainer = None
         self.xgb_explainer = None
         self.scaler = None
+        self.meta_learner = None
+        self.scaler_meta = None
+        self.bundle = None
+        self.served_bundle = None
+        self.explained_model = None
+        self.expected_values = {}
         
         self.feature_names = [
             'NDVI Mean', 'NDVI Trend', 'NDVI Variance',
@@ -45,18 +93,36 @@ class SHAPExplainer:
         try:
             log_step("Loading SHAP Explainers", "in_progress")
             
-            # Load models
-            with open(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl', 'rb') as f:
-                self.rf_model = pickle.load(f)
+            from shap import TreeExplainer
+            
+            registry = get_model_registry()
+            
+            # Explain the bundle being served, never pickles from another training
+            self.served_bundle = get_ensemble_predictor().bundle
+            self.bundle = self._explained_bundle(registry)
+            if self.bundle is not None:
+                unmatched = [
+                    name for name in ('rf', 'xgb')
+                    if not self.bundle.matches_native(name, ENSEMBLE_MODELS_PATH)
+                ]
+                if unmatched:
+                    raise RuntimeError(
+                        f"Pickles for {', '.join(unmatched)} do not match the served bundle "
+                        f"v{self.bundle.version}; SHAP explanations are unavailable"
+                    )
+            
+            # Load models (shared with the ensemble predictor)
+            self.rf_model = registry.load(f'{ENSEMBLE_MODELS_PATH}rf_model.pkl')
             logger.info("✓ Loaded RF model for SHAP")
             
-            with open(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl', 'rb') as f:
-                self.xgb_model = pickle.load(f)
+            self.xgb_model = registry.load(f'{ENSEMBLE_MODELS_PATH}xgb_model.pkl')
             logger.info("✓ Loaded XGBoost model for SHAP")
             
             # Load scaler
-            with open(f'{ENSEMBLE_MODELS_PATH}scaler.pkl', 'rb') as f:
-                self.scaler = pickle.load(f)
+            if self.bundle is not None:
+                self.scaler = self.bundle.scaler
+            else:
+                self.scaler = registry.load(f'{ENSEMBLE_MODELS_PATH}scaler.pkl')
             logger.info("✓ Loaded feature scaler")
             
             # Create SHAP explainers
@@ -66,24 +132,186 @@ class SHAPExplainer:
             self.xgb_explainer = TreeExplainer(self.xgb_model)
             logger.info("✓ Created XGBoost SHAP explainer")
             
+            # Meta-learner weights for ensemble-level attributions
+            if self.bundle is not None:
+                self.meta_learner = self.bundle.meta_learner
+                self.scaler_meta = self.bundle.scaler_meta
+            else:
+                self.meta_learner = registry.load_optional(f'{ENSEMBLE_MODELS_PATH}meta_learner.pkl')
+                self.scaler_meta = registry.load_optional(f'{ENSEMBLE_MODELS_PATH}scaler_meta.pkl')
+            
+            self._cache_expected_values()
+            self.explained_model = self._describe_explained_model()
+            
             log_step("Loading SHAP Explainers", "success")
             
         except Exception as e:
             logger.error(f"Failed to load SHAP explainers: {e}")
             raise
     
-    def explain_prediction(self, state, district, crop, season):
+    def _explained_bundle(self, registry):
+        """
+        Bundle whose models are explained: the served one, or the current
+        full bundle when a compressed variant is served (None means the
+        pickles are explained as they are).
+        """
+        if self.served_bundle is None or self.served_bundle.variant == 'full':
+            return self.served_bundle
+        logger.warning(
+            f"Serving the compressed '{self.served_bundle.variant}' ensemble; "
+            f"SHAP explains the full ensemble"
+        )
+        return registry.load_optional(FULL_BUNDLE_POINTER, loader=load_current_bundle)
+    
+    def _describe_explained_model(self):
+        """'explained_model' field: which model the attributions describe."""
+        served_variant = self.served_bundle.variant if self.served_bundle is not None else 'full'
+        described = {
+            'variant': 'full',
+            'bundle_version': self.bundle.version if self.bundle is not None else None,
+            'served_variant': served_variant,
+            'matches_served_model': served_variant == 'full'
+        }
+        if served_variant != 'full':
+            described['note'] = (
+                f"Predictions are served by the compressed '{served_variant}' ensemble; "
+                f"these attributions describe the full ensemble it was compressed from"
+            )
+        return described
+    
+    def is_stale(self):
+        """
+        True if the ensemble now serves another bundle, the full bundle
+        explained for a compressed variant changed, or (in pickle mode) the
+        models behind the explainers have changed on disk.
+        """
+        registry = get_model_registry()
+        if get_ensemble_predictor().bundle is not self.served_bundle:
+            return True
+        if self.bundle is not None and self.bundle is not self.served_bundle:
+            return not registry.is_current(FULL_BUNDLE_POINTER)
+        if self.bundle is not None:
+            return False  # Pickles were matched to the bundle by hash when loaded
+        if self.served_bundle is not None and current_bundle_path(BUNDLE_PATH) is not None:
+            return True  # A full bundle to pair the pickles with has appeared
+        return not all(
+            registry.is_current(f'{ENSEMBLE_MODELS_PATH}{filename}')
+            for filename in ('rf_model.pkl', 'xgb_model.pkl', 'scaler.pkl')
+        )
+    
+    def _meta_weights(self):
+        """
+        Log-odds weight of the RF and XGBoost probabilities in the ensemble,
+        or None if the meta-learner is unavailable (plain average is used).
+        """
+        if self.meta_learner is None or self.scaler_meta is None:
+            return None
+        return self.meta_learner.coef_[0] / self.scaler_meta.scale_
+    
+    def _ensemble_probability(self, rf_prob, xgb_prob):
+        """Meta-learner output for base model probabilities (mirrors EnsemblePredictor)."""
+        if self._meta_weights() is None:
+            return (rf_prob + xgb_prob) / 2
+        meta_features = self.scaler_meta.transform(np.column_stack([rf_prob, xgb_prob]))
+        return self.meta_learner.predict_proba(meta_features)[:, 1]
+    
+    def _cache_expected_values(self):
+        """Expected (baseline) probability of each model, computed once per load."""
+        # The XGBoost explainer only settles its expected value after a first call
+        warmup_row = np.zeros((1, len(self.feature_names)))
+        self.rf_explainer.shap_values(warmup_row, check_additivity=False)
+        self.xgb_explainer.shap_values(warmup_row)
+        
+        rf_expected = float(np.ravel(self.rf_explainer.expected_value)[-1])
+        xgb_expected_margin = float(np.ravel(self.xgb_explainer.expected_value)[0])
+        xgb_expected = float(_sigmoid(xgb_expected_margin))
+        ensemble_expected = float(self._ensemble_probability(
+            np.array([rf_expected]), np.array([xgb_expected])
+        )[0])
+        self.expected_values = {
+            'rf': rf_expected,
+            'xgb': xgb_expected,
+            'xgb_margin': xgb_expected_margin,
+            'ensemble': ensemble_expected
+        }
+    
+    def explain_matrix(self, feature_matrix):
         """
-        Generate explanation for prediction using feature importance.
+        TreeSHAP attributions for an (N, 8) matrix of normalized features,
+        with one shap_values call per model.
+        
+        Returns:
+            {
+                'rf': array (N, 8),        # RF class-1 probability space
+                'xgb': array (N, 8),       # XGBoost probability space
+                'ensemble': array (N, 8),  # Meta-weighted, ensemble probability space
+                'rf_probability': array (N,),
+                'xgb_probability': array (N,),
+                'ensemble_probability': array (N,),
+                'expected_value': {'rf': float, 'xgb': float, 'ensemble': float},
+                'scaled_features': array (N, 8)   # Model inputs after scaling
+            }
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=float).reshape(-1, len(self.feature_names))
+        if self.scaler is not None:
+            feature_matrix_scaled = self.scaler.transform(feature_matrix)
+        else:
+            feature_matrix_scaled = feature_matrix
+        
+        # RF: values for both classes, (N, F, 2) or a per-class list on older shap
+        rf_values = self.rf_explainer.shap_values(feature_matrix_scaled, check_additivity=False)
+        if isinstance(rf_values, list):
+            rf_shap = np.asarray(rf_values[-1])
+        else:
+            rf_shap = np.asarray(rf_values)[..., -1]
+        rf_prob = self.expected_values['rf'] + rf_shap.sum(axis=1)
+        
+        # XGBoost: log-odds values
+        xgb_margin_shap = np.asarray(self.xgb_explainer.shap_values(feature_matrix_scaled))
+        xgb_prob = _sigmoid(self.expected_values['xgb_margin'] + xgb_margin_shap.sum(axis=1))
+        xgb_shap = _to_probability_space(xgb_margin_shap, xgb_prob, self.expected_values['xgb'])
+        
+        # Ensemble: the meta-learner is linear in the base probabilities (in log-odds)
+        ensemble_prob = self._ensemble_probability(rf_prob, xgb_prob)
+        weights = self._meta_weights()
+        if weights is None:
+            ensemble_shap = (rf_shap + xgb_shap) / 2
+        else:
+            ensemble_margin_shap = weights[0] * rf_shap + weights[1] * xgb_shap
+            ensemble_shap = _to_probability_space(
+                ensemble_margin_shap, ensemble_prob, self.expected_values['ensemble']
+            )
+        
+        return {
+            'rf': rf_shap,
+            'xgb': xgb_shap,
+            'ensemble': ensemble_shap,
+            'rf_probability': rf_prob,
+            'xgb_probability': xgb_prob,
+            'ensemble_probability': ensemble_prob,
+            'expected_value': {
+                name: self.expected_values[name] for name in ('rf', 'xgb', 'ensemble')
+            },
+            'scaled_features': feature_matrix_scaled
+        }
+    
+    def explain_prediction(self, state, district, crop, season, context=None):
+        """
+        Generate a per-prediction SHAP explanation.
+        
+        If a FeatureContext is given, the explanation is computed for its
+        features instead of running ingestion again.
         
         Returns:
             {
                 'feature_importance': [
-                    {'feature': 'NDVI Mean', 'value': 0.687, 'contribution': 0.12, 'direction': 'increases_risk'},
+                    {'feature': 'NDVI Mean', 'raw_value': 0.687, 'shap_value': -0.12,
+                     'contribution': 0.12, 'direction': 'decreases_risk', 'impact': 'High'},
                     ...
                 ],
                 'rf_top_features': [...],
                 'xgb_top_features': [...],
+                'expected_value': 0.21,
                 'prediction_logic': 'Natural language explanation'
             }
         """
@@ -91,98 +319,11 @@ class SHAPExplainer:
             log_step("SHAP Explanation Generation", "in_progress")
             
             # Prepare features
-            norm_features, raw_features = prepare_feature_vector(state, district, crop, season)
-            
-            # Create feature vector
-            feature_vector = np.array([
-                norm_features['ndvi_mean'],
-                norm_features['ndvi_trend'],
-                norm_features['ndvi_variance'],
-                norm_features['rainfall_deviation'],
-                norm_features['temperature_anomaly'],
-                norm_features['soil_moisture_index'],
-                norm_features['soil_type_encoded'],
-                norm_features['pest_frequency']
-            ]).reshape(1, -1)
-            
-            # Scale features
-            if self.scaler is not None:
-                feature_vector_scaled = self.scaler.transform(feature_vector)
-            else:
-                feature_vector_scaled = feature_vector
-            
-            # Get model feature importances (deterministic, no SHAP complexity)
-            rf_importance_dict = dict(zip(self.feature_names, self.rf_model.feature_importances_))
-            xgb_importance_dict = dict(zip(self.feature_names, self.xgb_model.feature_importances_))
-            
-            # Average importances
-            avg_importance = {}
-            for fname in self.feature_names:
-                avg_importance[fname] = (rf_importance_dict[fname] + xgb_importance_dict[fname]) / 2
-            
-            # Create feature importance list with directional analysis
-            feature_importance = []
-            for fname, raw_val in zip(self.feature_names, feature_vector_scaled[0]):
-                importance = avg_importance[fname]
-                
-                # Determine direction based on feature value vs risk relationship
-                if 'ndvi' in fname.lower() or 'moisture' in fname.lower():
-                    # These decrease risk when high
-                    direction = "decreases_risk" if raw_val > 0 else "increases_risk"
-                elif 'rainfall' in fname.lower() or 'temperature' in fname.lower() or 'pest' in fname.lower():
-                    # These increase risk when anomalous
-                    direction = "increases_risk" if abs(raw_val) > 0 else "decreases_risk"
-                else:
-                    direction = "increases_risk" if raw_val > 0.5 else "decreases_risk"
-                
-                feature_importance.append({
-                    'feature': fname,
-                    'raw_value': float(raw_val),
-                    'contribution': importance,
-                    'direction': direction,
-                    'impact': 'High' if importance > np.mean(list(avg_importance.values())) else 'Low'
-                })
-            
-            # Sort by contribution
-            feature_importance.sort(key=lambda x: x['contribution'], reverse=True)
-            
-            # Get top features for each model
-            rf_top = sorted(rf_importance_dict.items(), key=lambda x: x[1], reverse=True)[:3]
-            xgb_top = sorted(xgb_importance_dict.items(), key=lambda x: x[1], reverse=True)[:3]
-            
-            # Generate natural language explanation
-            top_positive = [f for f in feature_importance if f['direction'] == 'increases_risk'][:2]
-            top_negative = [f for f in feature_importance if f['direction'] == 'decreases_risk'][:2]
-            
-            explanation_parts = []
-            for f in top_positive[:1]:
-                if 'NDVI' in f['feature']:
-                    explanation_parts.append(f"Low vegetation health is the primary risk driver")
-                elif 'Rainfall' in f['feature']:
-                    explanation_parts.append(f"Rainfall variability increases failure risk")
-                elif 'Soil' in f['feature'] and 'Index' in f['feature']:
-                    explanation_parts.append(f"Poor soil conditions elevate risk")
-                elif 'Pest' in f['feature']:
-                    explanation_parts.append(f"High pest activity threatens the crop")
-                elif 'Temperature' in f['feature']:
-                    explanation_parts.append(f"Temperature stress stresses the crop")
-            
-            for f in top_negative[:1]:
-                if 'NDVI' in f['feature']:
-                    explanation_parts.append(f"Good vegetation health mitigates risk")
-                elif 'Moisture' in f['feature']:
-                    explanation_parts.append(f"Adequate soil moisture provides resilience")
-            
-            prediction_logic = "; ".join(explanation_parts) if explanation_parts else \
-                "Prediction based on balanced feature interactions"
-            
-            result = {
-                'feature_importance': feature_importance,
-                'rf_top_features': [{'feature': name, 'importance': float(val)} for name, val in rf_top],
-                'xgb_top_features': [{'feature': name, 'importance': float(val)} for name, val in xgb_top],
-                'prediction_logic': prediction_logic,
-                'raw_features': raw_features
-            }
+            if context is None:
+                context = FeatureContext.build(state, district, crop, season)
+            
+            shap_result = self.explain_matrix(context.feature_matrix)
+            result = self._explanation_for_row(shap_result, 0, context.raw_features)
             
             log_step("SHAP Explanation Generation", "success")
             
@@ -191,23 +332,133 @@ class SHAPExplainer:
         except Exception as e:
             logger.error(f"SHAP explanation failed: {e}")
             raise
-
+    
+    def explain_batch(self, items):
+        """
+        Per-prediction SHAP explanations for many requests in one TreeSHAP pass.
+        
+        Args:
+            items: list of dicts with 'state', 'district', 'crop', 'season'
+        
+        Returns:
+            list aligned with items of {'status': 'success', 'data': explanation}
+            or {'status': 'error', 'error': message}
+        """
+        log_step("SHAP Batch Explanation", "in_progress", f"({len(items)} items)")
+        
+        prepared = prepare_feature_batch(items)
+        ok_rows = [i for i, p in enumerate(prepared) if not isinstance(p, Exception)]
+        
+        results = [{'status': 'error', 'error': str(p)} for p in prepared]
+        if ok_rows:
+            feature_matrix = build_feature_matrix([prepared[i][0] for i in ok_rows])
+            shap_result = self.explain_matrix(feature_matrix)
+            for row, i in enumerate(ok_rows):
+                results[i] = {
+                    'status': 'success',
+                    'data': self._explanation_for_row(shap_result, row, prepared[i][1])
+                }
+        
+        log_step("SHAP Batch Explanation", "success", f"({len(ok_rows)}/{len(items)} explained)")
+        return results
+    
+    def _explanation_for_row(self, shap_result, row, raw_features):
+        """Build the API explanation dict for one row of explain_matrix() output."""
+        ensemble_shap = shap_result['ensemble'][row]
+        contributions = np.abs(ensemble_shap)
+        mean_contribution = contributions.mean()
+        
+        feature_importance = []
+        for fname, value, shap_value, contribution in zip(
+                self.feature_names, shap_result['scaled_features'][row], ensemble_shap, contributions):
+            feature_importance.append({
+                'feature': fname,
+                'raw_value': float(value),
+                'shap_value': float(shap_value),
+                'contribution': float(contribution),
+                'direction': 'increases_risk' if shap_value > 0 else 'decreases_risk',
+                'impact': 'High' if contribution > mean_contribution else 'Low'
+            })
+        
+        # Sort by contribution
+        feature_importance.sort(key=lambda x: x['contribution'], reverse=True)
+        
+        # Get top features for each model
+        def top_features(model_shap):
+            ranked = sorted(zip(self.feature_names, model_shap[row]), key=lambda x: abs(x[1]), reverse=True)
+            return [{'feature': name, 'importance': float(abs(val)), 'shap_value': float(val)}
+                    for name, val in ranked[:3]]
+        
+        return {
+            'feature_importance': feature_importance,
+            'rf_top_features': top_features(shap_result['rf']),
+            'xgb_top_features': top_features(shap_result['xgb']),
+            'expected_value': shap_result['expected_value']['ensemble'],
+            'prediction_logic': self._prediction_logic(feature_importance),
+            'explained_model': self.explained_model,
+            'raw_features': raw_features
+        }
+    
+    @staticmethod
+    def _prediction_logic(feature_importance):
+        """Natural language summary of the strongest risk driver and mitigator."""
+        top_positive = [f for f in feature_importance if f['direction'] == 'increases_risk'][:2]
+        top_negative = [f for f in feature_importance if f['direction'] == 'decreases_risk'][:2]
+        
+        explanation_parts = []
+        for f in top_positive[:1]:
+            if 'NDVI' in f['feature']:
+                explanation_parts.append(f"Low vegetation health is the primary risk driver")
+            elif 'Rainfall' in f['feature']:
+                explanation_parts.append(f"Rainfall variability increases failure risk")
+            elif 'Soil' in f['feature'] and 'Index' in f['feature']:
+                explanation_parts.append(f"Poor soil conditions elevate risk")
+            elif 'Pest' in f['feature']:
+                explanation_parts.append(f"High pest activity threatens the crop")
+            elif 'Temperature' in f['feature']:
+                explanation_parts.append(f"Temperature stress stresses the crop")
+        
+        for f in top_negative[:1]:
+            if 'NDVI' in f['feature']:
+                explanation_parts.append(f"Good vegetation health mitigates risk")
+            elif 'Moisture' in f['feature']:
+                explanation_parts.append(f"Adequate soil moisture provides resilience")
+        
+        return "; ".join(explanation_parts) if explanation_parts else \
+            "Prediction based on balanced feature interactions"
 
 # Singleton instance
 _shap_explainer = None
+_shap_explainer_lock = threading.Lock()
 
 
 def get_shap_explainer():
-    """Get or create singleton SHAP explainer."""
+    """Get or create singleton SHAP explainer, rebuilding it if its models changed on disk."""
     global _shap_explainer
-    if _shap_explainer is None:
-        _shap_explainer = SHAPExplainer()
+    if _shap_explainer is None or _shap_explainer.is_stale():
+        with _shap_explainer_lock:
+            if _shap_explainer is None or _shap_explainer.is_stale():
+                _shap_explainer = SHAPExplainer()
     return _shap_explainer
 
 
-def explain_ensemble_prediction(state, district, crop, season):
+def explain_ensemble_prediction(state, district, crop, season, context=None):
     """
     Unified SHAP explanation API.
     """
     explainer = get_shap_explainer()
-    return explainer.explain_prediction(state, district, crop, season)
+    return explainer.explain_prediction(state, district, crop, season, context=context)
+
+
+def explain_ensemble_batch(items):
+    """
+    Batched SHAP explanation API for many requests.
+    
+    Args:
+        items: list of dicts with 'state', 'district', 'crop', 'season'
+    
+    Returns:
+        list of per-item {'status', 'data'/'error'} dicts, in input order
+    """
+    explainer = get_shap_explainer()
+    return explainer.explain_batch(items)
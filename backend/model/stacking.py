@@ -0,0 +1,182 @@
+"""
+Out-of-Fold Stacking - One parallel K-fold pass for the ensemble trainer
+
+Stacking needs out-of-fold (OOF) base-model predictions to train the
+meta-learner. Fitting the base models on the full training set and then
+running cross_val_predict for each of them refits every 300-tree model
+K more times, serially. Here every (model, fold) fit is an independent
+task in one process pool, and the fold models are reused:
+
+- Random Forest: each fold grows n_estimators / K trees on its training
+  split. The fold forests give the OOF predictions, and their trees are
+  merged into the final forest. The merged forest has n_estimators trees
+  in total, and every training row was seen by the trees of K - 1 folds.
+  So RF needs one forest's worth of trees instead of K + 1 forests.
+- XGBoost: each fold can stop early on its validation split. The final
+  booster is refit once on the full training set, using the median fold
+  best iteration as n_estimators.
+
+Fold assignment, seeds and the merge order are fixed, so the result does
+not depend on the number of workers.
+"""
+
+import copy
+import math
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from backend.utils.helpers import setup_logger, log_step
+
+logger = setup_logger(__name__)
+
+
+def resolve_workers(max_workers):
+    """Pool size (0/None = one per CPU) and threads each task may use."""
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(max_workers or cpus, cpus))
+    return workers, max(1, cpus // workers)
+
+
+def fit_task(name, fold, estimator, X_train, y_train, X_val, y_val, early_stopping_rounds, fit_params=None):
+    """
+    Fit one base model on one split (runs in a pool worker). `fit_params`
+    are passed to estimator.fit (e.g. xgb_model= to continue a booster).
+
+    Returns:
+        (name, fold, fitted model, validation probabilities or None,
+         best iteration or None, seconds)
+    """
+    start = time.perf_counter()
+    best_iteration = None
+    fit_params = fit_params or {}
+
+    if name == 'xgb' and early_stopping_rounds and X_val is not None:
+        estimator.set_params(early_stopping_rounds=early_stopping_rounds)
+        estimator.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False, **fit_params)
+        best_iteration = int(estimator.best_iteration)
+    else:
+        estimator.fit(X_train, y_train, **fit_params)
+
+    val_pred = estimator.predict_proba(X_val)[:, 1] if X_val is not None else None
+    return name, fold, estimator, val_pred, best_iteration, time.perf_counter() - start
+
+
+def merge_forests(forests):
+    """Combine fitted RandomForestClassifiers into one forest holding all their trees."""
+    merged = copy.deepcopy(forests[0])
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def fit_out_of_fold(rf_model, xgb_model, X, y, cv_folds=5, early_stopping_rounds=None,
+                    max_workers=None, random_state=42):
+    """
+    Fit RF and XGBoost with one parallel K-fold pass.
+
+    Args:
+        rf_model, xgb_model: unfitted template estimators (cloned, not modified)
+        X, y: scaled training features and labels
+        cv_folds: number of stratified folds
+        early_stopping_rounds: XGBoost early stopping on each fold's
+            validation split (None/0 disables it)
+        max_workers: process pool size (None/0 = one per CPU; 1 runs inline)
+
+    Returns:
+        {
+            'rf': merged RandomForestClassifier,
+            'xgb': XGBClassifier refit on all of X,
+            'oof': (n_samples, 2) OOF probabilities [rf, xgb],
+            'fold_models': {'rf': [...], 'xgb': [...]},
+            'best_iterations': [...] or None,
+            'timings': {'wall_s': float, 'task_s': float}
+        }
+    """
+    log_step("Out-of-Fold Stacking", "in_progress", f"({cv_folds} folds)")
+    start = time.perf_counter()
+
+    X = np.asarray(X)
+    y = np.asarray(y)
+    workers, threads = resolve_workers(max_workers)
+    folds = list(StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state).split(X, y))
+
+    rf_params = rf_model.get_params()
+    trees_per_fold = math.ceil(rf_params['n_estimators'] / cv_folds)
+
+    tasks = []
+    for fold, (train_idx, val_idx) in enumerate(folds):
+        rf = clone(rf_model).set_params(
+            n_estimators=trees_per_fold,
+            random_state=(rf_params['random_state'] or 0) + fold,
+            oob_score=False,  # The fold's validation split replaces OOB estimates
+            n_jobs=threads
+        )
+        xgb_fold = clone(xgb_model).set_params(n_jobs=threads)
+        for name, estimator in (('rf', rf), ('xgb', xgb_fold)):
+            tasks.append((name, fold, estimator, X[train_idx], y[train_idx],
+                          X[val_idx], y[val_idx], early_stopping_rounds))
+
+    # Without early stopping the final XGBoost fit does not depend on the
+    # folds, so it runs in the same pass
+    final_xgb = clone(xgb_model).set_params(n_jobs=threads)
+    if not early_stopping_rounds:
+        tasks.append(('xgb', None, final_xgb, X, y, None, None, None))
+
+    results = run_fit_tasks(tasks, workers)
+
+    oof = np.zeros((len(X), 2))
+    fold_models = {'rf': [None] * cv_folds, 'xgb': [None] * cv_folds}
+    best_iterations = [None] * cv_folds
+    task_seconds = 0.0
+
+    for name, fold, model, val_pred, best_iteration, seconds in results:
+        task_seconds += seconds
+        if fold is None:
+            final_xgb = model
+            continue
+        fold_models[name][fold] = model
+        oof[folds[fold][1], 0 if name == 'rf' else 1] = val_pred
+        if name == 'xgb':
+            best_iterations[fold] = best_iteration
+
+    if early_stopping_rounds:
+        n_rounds = int(np.median(best_iterations)) + 1
+        logger.info(f"XGBoost fold best iterations: {best_iterations} -> refitting with {n_rounds} rounds")
+        final_xgb.set_params(n_estimators=n_rounds)
+        _, _, final_xgb, _, _, seconds = fit_task('xgb', None, final_xgb, X, y, None, None, None)
+        task_seconds += seconds
+    else:
+        best_iterations = None
+
+    # Serving uses all cores; fold tasks were limited to their share
+    rf_final = merge_forests(fold_models['rf']).set_params(n_jobs=rf_params['n_jobs'])
+    final_xgb.set_params(n_jobs=xgb_model.get_params()['n_jobs'])
+
+    wall = time.perf_counter() - start
+    log_step("Out-of-Fold Stacking", "success",
+             f"({len(tasks)} fits on {workers} workers: {wall:.1f}s wall, {task_seconds:.1f}s in tasks)")
+
+    return {
+        'rf': rf_final,
+        'xgb': final_xgb,
+        'oof': oof,
+        'fold_models': fold_models,
+        'best_iterations': best_iterations,
+        'timings': {'wall_s': wall, 'task_s': task_seconds}
+    }
+
+
+def run_fit_tasks(tasks, workers):
+    """Run fit tasks inline (one worker) or in a spawn-based process pool."""
+    if workers == 1:
+        return [fit_task(*task) for task in tasks]
+
+    # spawn: forking a process that has already used OpenMP (XGBoost) can hang
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(fit_task, *task) for task in tasks]
+        return [future.result() for future in futures]
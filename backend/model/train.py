@@ -6,7 +6,8 @@ from sklearn.model_selection import train_test_split, cross_val_score, Stratifie
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, roc_auc_score, f1_score
 from sklearn.preprocessing import StandardScaler
 from backend.utils.helpers import setup_logger, log_step, ensure_dir_exists
-from backend.preprocessing.labeling import LabelGenerator, create_training_dataset
+from backend.preprocessing.labeling import create_training_dataset
+from backend.preprocessing.synthetic_data import DEFAULT_SEED, generate_training_data as generate_synthetic_data
 from backend.utils.config import MODEL_PATH, FEATURE_IMPORTANCE_PATH
 
 logger = setup_logger(__name__)
@@ -39,97 +40,17 @@ class ModelTrainer:
         self.cv_scores = None
         self.test_metrics = {}
     
-    def generate_training_data(self, n_samples=2000):
+    def generate_training_data(self, n_samples=2000, seed=DEFAULT_SEED):
         """Generate realistic training data with correlated features.
         
         Increased samples from 500 to 2000 for better model learning.
-        Features are correlated realistically based on agricultural science.
+        Features are correlated realistically based on agricultural science;
+        see backend/preprocessing/synthetic_data.py for the distributions.
         """
         log_step("Training Data Generation", "in_progress")
         
-        X = []
-        
-        for _ in range(n_samples):
-            # Generate base NDVI with realistic distribution
-            # Most crops have NDVI 0.4-0.8 (healthy), some stressed (0.2-0.4), few critical (<0.2)
-            ndvi_category = np.random.choice(['healthy', 'stressed', 'critical'], p=[0.65, 0.25, 0.10])
-            
-            if ndvi_category == 'healthy':
-                ndvi_mean = np.random.uniform(0.55, 0.85)
-                soil_moisture_base = np.random.uniform(0.5, 0.9)
-                pest_freq_base = np.random.uniform(0.0, 0.4)
-            elif ndvi_category == 'stressed':
-                ndvi_mean = np.random.uniform(0.3, 0.55)
-                soil_moisture_base = np.random.uniform(0.3, 0.6)
-                pest_freq_base = np.random.uniform(0.3, 0.7)
-            else:  # critical
-                ndvi_mean = np.random.uniform(0.15, 0.35)
-                soil_moisture_base = np.random.uniform(0.1, 0.4)
-                pest_freq_base = np.random.uniform(0.5, 0.95)
-            
-            # NDVI trend correlated with current health
-            if ndvi_mean > 0.6:
-                ndvi_trend = np.random.uniform(-0.02, 0.05)  # Healthy crops stable/improving
-            elif ndvi_mean > 0.4:
-                ndvi_trend = np.random.uniform(-0.05, 0.02)  # Stressed crops declining
-            else:
-                ndvi_trend = np.random.uniform(-0.08, -0.01)  # Critical crops declining
-            
-            # NDVI variance (consistency) - stressed crops more variable
-            if ndvi_mean > 0.6:
-                ndvi_variance = np.random.uniform(0.01, 0.04)
-            else:
-                ndvi_variance = np.random.uniform(0.04, 0.1)
-            
-            # Rainfall deviation - correlated with soil moisture
-            if soil_moisture_base > 0.6:
-                rainfall_dev = np.random.uniform(-15, 20)  # Good moisture = normal rainfall
-            elif soil_moisture_base > 0.3:
-                rainfall_dev = np.random.uniform(-30, 10)  # Low moisture = deficit likely
-            else:
-                rainfall_dev = np.random.uniform(-50, -15)  # Very low = severe deficit
-            
-            # Temperature anomaly - correlated with stress
-            if ndvi_category == 'healthy':
-                temp_anom = np.random.uniform(-2, 2)
-            elif ndvi_category == 'stressed':
-                temp_anom = np.random.uniform(-4, 5)
-            else:
-                temp_anom = np.random.uniform(-8, 8)
-            
-            # Soil moisture with some noise
-            soil_moisture = np.clip(soil_moisture_base + np.random.uniform(-0.1, 0.1), 0.1, 1.0)
-            
-            # Soil type encoded (1=sandy, 2=loamy, 3=clay) - affects moisture retention
-            soil_type = np.random.choice([1, 2, 3], p=[0.25, 0.50, 0.25])
-            if soil_type == 1:  # Sandy soil - lower moisture
-                soil_moisture *= np.random.uniform(0.7, 0.9)
-            elif soil_type == 3:  # Clay soil - higher moisture
-                soil_moisture *= np.random.uniform(1.0, 1.15)
-            soil_moisture = np.clip(soil_moisture, 0.1, 1.0)
-            
-            # Pest frequency with noise
-            pest_freq = np.clip(pest_freq_base + np.random.uniform(-0.15, 0.15), 0.0, 1.0)
-            
-            # Add feature interactions for realism
-            # High temperature increases pest activity
-            if temp_anom > 3:
-                pest_freq = np.clip(pest_freq * 1.3, 0, 1)
-            
-            # Low moisture worsens NDVI
-            if soil_moisture < 0.3 and ndvi_mean > 0.4:
-                ndvi_mean *= np.random.uniform(0.7, 0.9)
-            
-            X.append([
-                ndvi_mean, ndvi_trend, ndvi_variance,
-                rainfall_dev, temp_anom,
-                soil_moisture, soil_type, pest_freq
-            ])
-        
-        X = np.array(X)
-        
-        # Generate realistic labels based on features
-        y = LabelGenerator.generate_labels(X)
+        # Realistic labels from LabelGenerator, with noise seeded like the features
+        X, y = generate_synthetic_data(n_samples, profile='single', seed=seed)
         
         logger.info(f"Generated {n_samples} training samples with realistic correlations")
         log_step("Training Data Generation", "success")
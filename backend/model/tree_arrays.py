@@ -0,0 +1,311 @@
+"""
+Flattened Tree Evaluator - NumPy inference for RF and XGBoost
+
+sklearn/XGBoost predict_proba on a 1x8 input is dominated by per-call
+Python, validation and joblib overhead across 300 trees. This module
+exports every tree of a fitted model into contiguous NumPy node arrays
+(feature, threshold, left/right child, leaf value) and evaluates all
+trees for a batch of rows at once, one vectorised step per tree level.
+
+Leaves are stored as self-loops, so walking max_depth steps from the
+roots always lands every (row, tree) pair on its leaf without masking.
+The node arrays are read-only so pre-forked workers share their pages.
+
+Results match the original models to float tolerance:
+- sklearn compares float32(x) <= threshold (float64)
+- XGBoost compares float32(x) < split_condition (float32)
+Missing values (NaN) are not supported; model inputs are always finite.
+
+Run `python -m backend.model.tree_arrays` to check equivalence against the
+saved ensemble and benchmark both paths.
+"""
+
+import json
+import time
+import numpy as np
+from backend.utils.helpers import setup_logger, log_step
+
+logger = setup_logger(__name__)
+
+
+class FlatTreeEnsemble:
+    """All trees of one model concatenated into flat node arrays."""
+
+    RF_PROBA = 'rf_proba'      # Average of per-tree class-1 probabilities
+    XGB_LOGIT = 'xgb_logit'    # Sigmoid of base margin + sum of leaf weights
+
+    def __init__(self, kind, feature, threshold, left, right, value, roots, max_depth, base_margin=0.0):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self._go_left = np.less if kind == self.XGB_LOGIT else np.less_equal
+        
+        for array in self.arrays().values():
+            array.setflags(write=False)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def arrays(self):
+        """Node arrays by name (used for persistence)."""
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'roots': self.roots
+        }
+
+    def leaf_values(self, X):
+        """Leaf value reached by every row in every tree, shape (N, n_trees)."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+
+        for _ in range(self.max_depth):
+            go_left = self._go_left(X[rows, self.feature[node]], self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return self.value[node]
+
+    def predict_proba(self, X):
+        """Class-1 probability for each row, shape (N,)."""
+        leaves = self.leaf_values(X)
+        if self.kind == self.RF_PROBA:
+            return leaves.sum(axis=1) / self.n_trees
+        margin = self.base_margin + leaves.sum(axis=1)
+        return 1.0 / (1.0 + np.exp(-margin))
+
+
+def _pack(kind, trees, base_margin=0.0):
+    """
+    Concatenate per-tree (feature, threshold, left, right, value) arrays,
+    turning leaves (left == -1) into self-loops and offsetting child ids.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for feature, threshold, left, right, value, depth in trees:
+        n = len(feature)
+        ids = np.arange(n)
+        is_leaf = left < 0
+
+        features.append(np.where(is_leaf, 0, feature))
+        thresholds.append(np.where(is_leaf, 0.0, threshold))
+        lefts.append(np.where(is_leaf, ids, left) + offset)
+        rights.append(np.where(is_leaf, ids, right) + offset)
+        values.append(value)
+        roots.append(offset)
+
+        offset += n
+        max_depth = max(max_depth, depth)
+
+    return FlatTreeEnsemble(
+        kind=kind,
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+        base_margin=base_margin
+    )
+
+
+def _tree_depth(left, right):
+    """Depth of a tree given child arrays (root at depth 0)."""
+    depth = np.zeros(len(left), dtype=int)
+    for node in range(len(left)):  # Parents always precede children
+        if left[node] >= 0:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def flatten_random_forest(rf_model):
+    """Export a fitted sklearn RandomForestClassifier (binary) to a FlatTreeEnsemble."""
+    positive = int(np.flatnonzero(rf_model.classes_ == 1)[0])
+    trees = []
+    for estimator in rf_model.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        proba = counts[:, positive] / counts.sum(axis=1)
+        trees.append((
+            tree.feature, tree.threshold,
+            tree.children_left, tree.children_right,
+            proba, tree.max_depth
+        ))
+    return _pack(FlatTreeEnsemble.RF_PROBA, trees)
+
+
+def _xgb_tree_limit(xgb_model):
+    """Number of boosted trees predict_proba uses (honours early stopping)."""
+    booster = xgb_model.get_booster()
+    n_trees = booster.num_boosted_rounds()
+    try:
+        n_trees = min(n_trees, xgb_model.best_iteration + 1)
+    except AttributeError:
+        pass
+    return n_trees
+
+
+def flatten_xgboost(xgb_model):
+    """Export a fitted binary:logistic XGBClassifier to a FlatTreeEnsemble."""
+    model = json.loads(xgb_model.get_booster().save_raw('json'))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    base_margin = np.log(base_score / (1.0 - base_score))
+
+    trees = []
+    for tree in model['learner']['gradient_booster']['model']['trees'][:_xgb_tree_limit(xgb_model)]:
+        left = np.array(tree['left_children'], dtype=np.int64)
+        right = np.array(tree['right_children'], dtype=np.int64)
+        # For leaves, split_conditions holds the leaf weight
+        split = np.array(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        is_leaf = left < 0
+        trees.append((
+            np.array(tree['split_indices'], dtype=np.int64),
+            np.where(is_leaf, 0.0, split),
+            left, right,
+            np.where(is_leaf, split, 0.0),
+            _tree_depth(left, right)
+        ))
+    return _pack(FlatTreeEnsemble.XGB_LOGIT, trees, base_margin=base_margin)
+
+
+def _levels_needed(left, right, roots):
+    """Steps from the roots until every path has reached a leaf (self-loop)."""
+    level = np.asarray(roots)
+    levels = 0
+    while True:
+        internal = level[left[level] != level]
+        if len(internal) == 0:
+            return levels
+        level = np.concatenate([left[internal], right[internal]])
+        levels += 1
+
+
+def _compact(flat, keep, left, right, roots):
+    """New FlatTreeEnsemble holding only the `keep` nodes, with child ids remapped."""
+    new_id = np.cumsum(keep) - 1
+    return FlatTreeEnsemble(
+        kind=flat.kind,
+        feature=flat.feature[keep],
+        threshold=flat.threshold[keep],
+        left=new_id[left[keep]].astype(np.int32),
+        right=new_id[right[keep]].astype(np.int32),
+        value=flat.value[keep],
+        roots=new_id[roots].astype(np.int32),
+        max_depth=0,
+        base_margin=flat.base_margin
+    )
+
+
+def subset_trees(flat, trees):
+    """
+    FlatTreeEnsemble with only the given trees (indices, in order). For RF
+    this is a smaller forest; for XGBoost, trees 0..k-1 are the first k
+    boosting rounds.
+    """
+    trees = np.asarray(trees, dtype=np.int64)
+    tree_of_node = np.searchsorted(flat.roots, np.arange(flat.n_nodes), side='right') - 1
+    keep = np.isin(tree_of_node, trees)
+    subset = _compact(flat, keep, flat.left, flat.right, flat.roots[trees])
+    subset.max_depth = _levels_needed(subset.left, subset.right, subset.roots)
+    return subset
+
+
+def truncate_depth(flat, max_depth):
+    """
+    Random Forest only: internal nodes at `max_depth` become leaves that
+    predict their node's class-1 training fraction, and nodes below them
+    are dropped.
+    """
+    if flat.kind != FlatTreeEnsemble.RF_PROBA:
+        raise ValueError("Depth truncation needs internal node values (Random Forest only)")
+    if max_depth >= flat.max_depth:
+        return flat
+
+    left = flat.left.copy()
+    right = flat.right.copy()
+    keep = np.zeros(flat.n_nodes, dtype=bool)
+    level = flat.roots
+    for _ in range(max_depth):
+        keep[level] = True
+        level = np.unique(np.concatenate([left[level], right[level]]))
+    keep[level] = True
+    left[level] = level
+    right[level] = level
+
+    truncated = _compact(flat, keep, left, right, flat.roots)
+    truncated.max_depth = _levels_needed(truncated.left, truncated.right, truncated.roots)
+    return truncated
+
+
+def verify_equivalence(model, flat, X, atol=1e-6):
+    """Max absolute difference between model.predict_proba and the flat evaluator."""
+    expected = model.predict_proba(X)[:, 1]
+    actual = flat.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if max_diff > atol:
+        logger.warning(f"Flat evaluator differs from original by {max_diff:.2e} (atol={atol:.0e})")
+    return max_diff
+
+
+def benchmark(model, flat, X, repeats=20):
+    """Mean seconds per predict_proba call for the original model vs the flat evaluator."""
+    def timed(fn):
+        fn(X)  # Warm-up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn(X)
+        return (time.perf_counter() - start) / repeats
+
+    return {
+        'rows': len(X),
+        'original_s': timed(model.predict_proba),
+        'flat_s': timed(flat.predict_proba)
+    }
+
+
+if __name__ == '__main__':
+    from backend.model.registry import load_artifact
+
+    models_path = 'backend/model/saved/ensemble/'
+    rf_model = load_artifact(f'{models_path}rf_model.pkl')
+    xgb_model = load_artifact(f'{models_path}xgb_model.pkl')
+    scaler = load_artifact(f'{models_path}scaler.pkl')
+    rng = np.random.default_rng(0)
+
+    log_step("Flat Tree Benchmark", "in_progress")
+    for name, model, flat in [
+        ('RF', rf_model, flatten_random_forest(rf_model)),
+        ('XGBoost', xgb_model, flatten_xgboost(xgb_model))
+    ]:
+        X = scaler.transform(rng.uniform(0, 1, size=(10000, 8)))
+        logger.info(f"{name}: {flat.n_trees} trees, {flat.n_nodes} nodes, "
+                    f"max |diff| = {verify_equivalence(model, flat, X):.2e}")
+        for n_rows in (1, 13, 1000):
+            result = benchmark(model, flat, X[:n_rows])
+            logger.info(f"{name} {n_rows:>5} rows: original {result['original_s'] * 1000:8.2f} ms, "
+                        f"flat {result['flat_s'] * 1000:8.2f} ms "
+                        f"({result['original_s'] / result['flat_s']:.1f}x)")
+    log_step("Flat Tree Benchmark", "success")
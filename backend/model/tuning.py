@@ -0,0 +1,333 @@
+"""
+Hyperparameter Search - Successive halving for the RF/XGBoost base models
+
+Searches the spaces around the hand-tuned constants in ModelTrainer and
+EnsembleTrainer:
+- Candidates are sampled from SEARCH_SPACES (seeded). The current trainer
+  configuration is always included as the baseline.
+- Successive halving on sample count: every candidate is fitted on the
+  smallest rung. Each following rung uses `eta` times more samples and
+  keeps the best 1/eta by validation AUC. Candidates on that rung's
+  AUC/latency Pareto front are kept as well, because a fast model that
+  loses a little AUC can be the better choice for serving. The baseline
+  is always kept.
+- The (candidate, rung) evaluations of a rung run in a spawn-based
+  process pool. Each task is limited to one thread, so latency
+  measurements are comparable.
+- Every evaluation is appended to a JSONL file as soon as it finishes.
+  Re-running the same search skips everything already recorded, so an
+  interrupted search resumes.
+
+Latency is measured the way the API serves:
+- single-row scoring with the flattened tree evaluator (tree_arrays)
+- a 1000-row batch with the native predict_proba
+
+The report lists the final-rung candidates with their AUC change and
+speed-up against the baseline, marks the Pareto front, and recommends
+the fastest candidate within TUNING_MAX_AUC_DROP of the baseline AUC.
+
+Usage:
+    python -m backend.model.tuning rf            # EnsembleTrainer Random Forest
+    python -m backend.model.tuning xgb 27        # EnsembleTrainer XGBoost, 27 candidates
+    python -m backend.model.tuning single_rf     # ModelTrainer Random Forest
+"""
+
+import json
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from backend.utils.helpers import setup_logger, log_step, ensure_dir_exists
+from backend.utils.config import TRAINING_WORKERS, TUNING_PATH, TUNING_MAX_AUC_DROP
+from backend.model.stacking import resolve_workers
+from backend.model.tree_arrays import flatten_random_forest, flatten_xgboost
+
+logger = setup_logger(__name__)
+
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [50, 100, 200, 300],
+        'max_depth': [8, 10, 15, 20, None],
+        'min_samples_split': [2, 4, 8],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 0.5, None]
+    },
+    'xgb': {
+        'n_estimators': [50, 100, 200, 300],
+        'max_depth': [3, 4, 6, 8],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'subsample': [0.7, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 3, 5],
+        'gamma': [0, 1, 2]
+    }
+}
+
+# Search target -> (space, data profile); the baseline estimator comes from the trainer
+TARGETS = {
+    'rf': ('rf', 'ensemble'),
+    'xgb': ('xgb', 'ensemble'),
+    'single_rf': ('rf', 'single')
+}
+
+VALIDATION_SAMPLES = 4000
+LATENCY_REPEATS = 50
+BATCH_LATENCY_ROWS = 1000
+
+
+def baseline_estimator(target):
+    """The trainer's current (hand-tuned) estimator for a search target."""
+    if target == 'single_rf':
+        from backend.model.train import ModelTrainer
+        return ModelTrainer().model
+    from backend.model.ensemble_train import EnsembleTrainer
+    trainer = EnsembleTrainer()
+    return trainer.rf_model if target == 'rf' else trainer.xgb_model
+
+
+def sample_candidates(space, baseline_params, n_candidates, seed):
+    """Baseline first, then distinct random configurations from the space."""
+    rng = np.random.default_rng(seed)
+    baseline = {name: baseline_params[name] for name in space}
+    candidates = [baseline]
+    seen = {json.dumps(baseline, sort_keys=True)}
+
+    for _ in range(n_candidates * 20):
+        if len(candidates) >= n_candidates:
+            break
+        params = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        params = {name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def rung_sizes(min_samples, max_samples, eta):
+    """Sample counts per rung: min_samples * eta^k, capped at max_samples."""
+    sizes = []
+    size = min_samples
+    while size < max_samples:
+        sizes.append(size)
+        size *= eta
+    sizes.append(max_samples)
+    return sizes
+
+
+def _median_seconds(fn, repeats):
+    fn()  # Warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def evaluate_candidate(space, estimator, params, X_train, y_train, X_val, y_val):
+    """
+    Fit one configuration and measure validation AUC and inference latency
+    (runs in a pool worker).
+    """
+    estimator = clone(estimator).set_params(**params, n_jobs=1)
+    if space == 'rf':
+        estimator.set_params(oob_score=False)
+
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    auc = roc_auc_score(y_val, estimator.predict_proba(X_val)[:, 1])
+    flat = flatten_random_forest(estimator) if space == 'rf' else flatten_xgboost(estimator)
+    row = X_val[:1]
+    batch = X_val[:BATCH_LATENCY_ROWS]
+
+    return {
+        'auc': float(auc),
+        'fit_s': fit_seconds,
+        'single_row_ms': _median_seconds(lambda: flat.predict_proba(row), LATENCY_REPEATS) * 1000,
+        'batch_ms': _median_seconds(lambda: estimator.predict_proba(batch), 5) * 1000,
+        'n_trees': flat.n_trees,
+        'n_nodes': flat.n_nodes
+    }
+
+
+def pareto_front(results):
+    """Keys of results not dominated in (higher AUC, lower single-row latency)."""
+    front = set()
+    for key, result in results.items():
+        dominated = any(
+            other['auc'] >= result['auc'] and other['single_row_ms'] <= result['single_row_ms']
+            and (other['auc'] > result['auc'] or other['single_row_ms'] < result['single_row_ms'])
+            for other_key, other in results.items() if other_key != key
+        )
+        if not dominated:
+            front.add(key)
+    return front
+
+
+class HyperparameterSearch:
+    """Resumable successive-halving search for one base model."""
+
+    def __init__(self, target='rf', n_candidates=27, min_samples=500, max_samples=13500, eta=3,
+                 seed=42, max_workers=TRAINING_WORKERS, results_path=None):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown search target: {target} (choose from {', '.join(TARGETS)})")
+        self.target = target
+        self.space_name, self.profile = TARGETS[target]
+        self.n_candidates = n_candidates
+        self.rungs = rung_sizes(min_samples, max_samples, eta)
+        self.eta = eta
+        self.seed = seed
+        self.max_workers = max_workers
+        self.results_path = results_path or f'{TUNING_PATH}{target}.jsonl'
+
+        self.estimator = baseline_estimator(target)
+        self.candidates = sample_candidates(
+            SEARCH_SPACES[self.space_name], self.estimator.get_params(), n_candidates, seed
+        )
+        self.baseline_key = json.dumps(self.candidates[0], sort_keys=True)
+        # Results from another seed/rung layout or labelling scheme are not comparable
+        self.signature = f'{target}|seed={seed}|rungs={",".join(map(str, self.rungs))}|labels=rng'
+
+    def _data(self):
+        """Scaled training pool (largest rung) and a fixed validation set."""
+        from backend.preprocessing.synthetic_data import generate_training_data
+
+        X, y = generate_training_data(self.rungs[-1] + VALIDATION_SAMPLES, profile=self.profile, seed=self.seed)
+
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=VALIDATION_SAMPLES, random_state=self.seed, stratify=y
+        )
+        scaler = StandardScaler().fit(X_train)
+        return scaler.transform(X_train), y_train, scaler.transform(X_val), y_val
+
+    def load_results(self):
+        """{(candidate key, rung samples): result} recorded by earlier runs of this search."""
+        results = {}
+        if not os.path.exists(self.results_path):
+            return results
+        with open(self.results_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from an interrupted run
+                if record.get('signature') == self.signature:
+                    results[(record['key'], record['samples'])] = record
+        return results
+
+    def _append(self, record):
+        with open(self.results_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def _promote(self, keys, rung_results):
+        """Top 1/eta by AUC, plus the rung's Pareto front and the baseline."""
+        n_keep = max(1, len(keys) // self.eta)
+        by_auc = sorted(keys, key=lambda key: rung_results[key]['auc'], reverse=True)
+        keep = set(by_auc[:n_keep]) | pareto_front({key: rung_results[key] for key in keys})
+        keep.add(self.baseline_key)
+        return [key for key in by_auc if key in keep]
+
+    def run(self):
+        """Run (or resume) the search and return the report."""
+        log_step("Hyperparameter Search", "in_progress",
+                 f"({self.target}: {len(self.candidates)} candidates, rungs {self.rungs})")
+        ensure_dir_exists(os.path.dirname(self.results_path))
+        start = time.perf_counter()
+
+        X_train, y_train, X_val, y_val = self._data()
+        params_by_key = {json.dumps(params, sort_keys=True): params for params in self.candidates}
+        results = self.load_results()
+        resumed = len(results)
+
+        workers, _ = resolve_workers(self.max_workers)
+        context = multiprocessing.get_context('spawn')
+        keys = list(params_by_key)
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for rung, samples in enumerate(self.rungs):
+                pending = {
+                    pool.submit(
+                        evaluate_candidate, self.space_name, self.estimator, params_by_key[key],
+                        X_train[:samples], y_train[:samples], X_val, y_val
+                    ): key
+                    for key in keys if (key, samples) not in results
+                }
+                for future in as_completed(pending):
+                    key = pending[future]
+                    record = dict(future.result(), signature=self.signature, key=key,
+                                  params=params_by_key[key], rung=rung, samples=samples)
+                    results[(key, samples)] = record
+                    self._append(record)
+
+                rung_results = {key: results[(key, samples)] for key in keys}
+                logger.info(f"Rung {rung} ({samples} samples): {len(keys)} candidates, "
+                            f"best AUC {max(r['auc'] for r in rung_results.values()):.4f}")
+                if rung < len(self.rungs) - 1:
+                    keys = self._promote(keys, rung_results)
+
+        report = self.report({key: results[(key, self.rungs[-1])] for key in keys})
+        report['resumed_evaluations'] = resumed
+        report['wall_s'] = time.perf_counter() - start
+        log_step("Hyperparameter Search", "success",
+                 f"(recommended: {report['recommended']['params'] if report['recommended'] else None})")
+        return report
+
+    def report(self, final_results, max_auc_drop=TUNING_MAX_AUC_DROP):
+        """Latency/AUC trade-off of the final-rung candidates against the baseline."""
+        baseline = final_results[self.baseline_key]
+        front = pareto_front(final_results)
+
+        rows = []
+        for key, result in final_results.items():
+            rows.append({
+                'params': result['params'],
+                'baseline': key == self.baseline_key,
+                'auc': result['auc'],
+                'auc_delta': result['auc'] - baseline['auc'],
+                'single_row_ms': result['single_row_ms'],
+                'batch_ms': result['batch_ms'],
+                'single_row_speedup': baseline['single_row_ms'] / result['single_row_ms'],
+                'batch_speedup': baseline['batch_ms'] / result['batch_ms'],
+                'n_trees': result['n_trees'],
+                'n_nodes': result['n_nodes'],
+                'pareto': key in front
+            })
+        rows.sort(key=lambda row: row['single_row_ms'])
+
+        acceptable = [row for row in rows if row['auc_delta'] >= -max_auc_drop]
+        return {
+            'target': self.target,
+            'samples': self.rungs[-1],
+            'max_auc_drop': max_auc_drop,
+            'baseline': next(row for row in rows if row['baseline']),
+            'recommended': acceptable[0] if acceptable else None,
+            'candidates': rows
+        }
+
+
+def run_search(target='rf', n_candidates=27, **kwargs):
+    """Main entry point: run or resume a search and return its report."""
+    return HyperparameterSearch(target, n_candidates, **kwargs).run()
+
+
+if __name__ == '__main__':
+    search_target = sys.argv[1] if len(sys.argv) > 1 else 'rf'
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 27
+    result = run_search(search_target, count)
+
+    print(f"\n{'AUC':>7} {'dAUC':>8} {'1-row ms':>9} {'x':>6} {'1k ms':>8} {'x':>6}  pareto  params")
+    for row in result['candidates']:
+        marker = '*' if row['baseline'] else ('P' if row['pareto'] else ' ')
+        print(f"{row['auc']:7.4f} {row['auc_delta']:+8.4f} {row['single_row_ms']:9.3f} "
+              f"{row['single_row_speedup']:6.2f} {row['batch_ms']:8.2f} {row['batch_speedup']:6.2f}  "
+              f"{marker:^6}  {row['params']}")
+    print(f"\nRecommended (max AUC drop {result['max_auc_drop']}): {result['recommended']}")
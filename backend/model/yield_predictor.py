@@ -6,6 +6,7 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 import pickle
 import os
+from backend.model.registry import load_artifact
 
 def train_yield_model():
     """Train a yield prediction model"""
@@ -67,17 +68,14 @@ def train_yield_model():
     return model
 
 def load_yield_model():
-    """Load the trained yield model"""
+    """Load the trained yield model (cached in the model registry)"""
     model_path = 'backend/model/saved/yield_model.pkl'
     
     if not os.path.exists(model_path):
         print("Yield model not found. Training new model...")
         return train_yield_model()
     
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    
-    return model
+    return load_artifact(model_path)
 
 def predict_yield(ndvi, rainfall_deviation, soil_moisture, temp_anomaly, pest_frequency, crop_type='Rice'):
     """Predict yield for given conditions"""
@@ -1,41 +1,164 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import numpy as np
 import pandas as pd
-from backend.utils.helpers import setup_logger, log_step
+from backend.utils.config import INGESTION_DEADLINES, INGESTION_MAX_WORKERS
+from backend.utils.helpers import (
+    setup_logger, log_step, mock_ndvi_data, mock_weather_data, mock_soil_data, mock_pest_data
+)
+from backend.utils.http_client import call_deadline
 from backend.ingestion.openweather import get_weather_data
 from backend.ingestion.modis import get_ndvi_data, extract_ndvi_features
 from backend.ingestion.gldas import get_soil_moisture
-from backend.ingestion.soil import get_soil_data
+from backend.ingestion.soil import get_soil_data, SOIL_TYPE_ENCODING
 from backend.ingestion.pest import get_pest_data
 
 logger = setup_logger(__name__)
 
+# Model input column order shared by every trained model
+FEATURE_NAMES = [
+    'ndvi_mean', 'ndvi_trend', 'ndvi_variance',
+    'rainfall_deviation', 'temperature_anomaly',
+    'soil_moisture_index', 'soil_type_encoded',
+    'pest_frequency'
+]
+
+def _ingestion_sources(state, district, crop, season):
+    """Fetch callables for each data source, keyed by source name."""
+    return {
+        'ndvi': lambda: get_ndvi_data(district, crop, season),          # NASA MODIS
+        'weather': lambda: get_weather_data(state, district),           # OpenWeather API
+        'soil_moisture': lambda: get_soil_moisture(district),           # NASA GLDAS
+        'soil': lambda: get_soil_data(district),                        # NBSS&LUP
+        'pest': lambda: get_pest_data(district, season)                 # State Agricultural Dept
+    }
+
+def _ingestion_fallbacks(state, district, crop, season):
+    """Mock-data fallbacks used when a source misses its deadline or fails."""
+    def soil_fallback():
+        soil = mock_soil_data(district)
+        return {
+            'soil_type': soil['soil_type'],
+            'soil_type_encoded': SOIL_TYPE_ENCODING.get(soil['soil_type'], 0),
+            'organic_carbon': soil['organic_carbon'],
+            'soil_depth': soil['soil_depth']
+        }
+    
+    return {
+        'ndvi': lambda: mock_ndvi_data(district, crop, season),
+        'weather': lambda: dict(mock_weather_data(state, district), source='mock'),
+        'soil_moisture': lambda: {'soil_moisture_index': mock_soil_data(district)['soil_moisture']},
+        'soil': soil_fallback,
+        'pest': lambda: mock_pest_data(district, season)
+    }
+
+def _timed(fetch, deadline):
+    """
+    Run a source fetch, returning (payload, elapsed_ms).
+    
+    Outbound HTTP calls made by the fetch are bounded by the source's
+    deadline, so a hung provider releases its pool worker once the caller
+    has moved on to the fallback.
+    """
+    start = time.monotonic()
+    with call_deadline(deadline):
+        payload = fetch()
+    return payload, round((time.monotonic() - start) * 1000, 1)
+
+# Shared pool for ingestion fan-out (sources are I/O bound)
+_ingestion_pool = ThreadPoolExecutor(
+    max_workers=INGESTION_MAX_WORKERS, thread_name_prefix='ingestion'
+)
+
+def _submit_sources(state, district, crop, season):
+    """Submit every source fetch to the ingestion pool; returns (start, futures)."""
+    start = time.monotonic()
+    futures = {
+        name: _ingestion_pool.submit(_timed, fetch, start + INGESTION_DEADLINES.get(name, 5.0))
+        for name, fetch in _ingestion_sources(state, district, crop, season).items()
+    }
+    return start, futures
+
+def _collect_sources(start, futures, fallbacks):
+    """Wait for submitted fetches up to their deadlines; returns (data, report)."""
+    data = {}
+    sources = {}
+    for name in sorted(futures, key=lambda n: INGESTION_DEADLINES.get(n, 0)):
+        deadline = start + INGESTION_DEADLINES.get(name, 5.0)
+        try:
+            data[name], elapsed_ms = futures[name].result(timeout=max(0.0, deadline - time.monotonic()))
+            status = {'status': 'live', 'elapsed_ms': elapsed_ms}
+            if isinstance(data[name], dict) and data[name].get('source') == 'mock':
+                status = {'status': 'degraded', 'reason': 'upstream unavailable', 'elapsed_ms': elapsed_ms}
+        except FutureTimeoutError:
+            # Only drops fetches still queued; running ones stop at their call deadline
+            futures[name].cancel()
+            logger.warning(f"Ingestion source '{name}' missed its deadline; using fallback")
+            data[name] = fallbacks[name]()
+            status = {'status': 'degraded', 'reason': 'deadline exceeded'}
+        except Exception as e:
+            logger.warning(f"Ingestion source '{name}' failed: {e}; using fallback")
+            data[name] = fallbacks[name]()
+            status = {'status': 'degraded', 'reason': str(e)}
+        sources[name] = status
+    
+    report = {
+        'sources': sources,
+        'live': [name for name, info in sources.items() if info['status'] == 'live'],
+        'degraded': [name for name, info in sources.items() if info['status'] == 'degraded']
+    }
+    return data, report
+
+def fetch_sources_concurrently(state, district, crop, season):
+    """
+    Run all ingestion sources in parallel with per-source deadlines.
+    
+    Sources that raise or miss their deadline are replaced by mock data,
+    so worst-case latency is the slowest deadline rather than the sum of
+    all sources.
+    
+    Returns:
+        (data, report) where data maps source name to its payload and
+        report is {'sources': {name: {'status', 'elapsed_ms', ...}},
+                   'live': [...], 'degraded': [...]}
+    """
+    start, futures = _submit_sources(state, district, crop, season)
+    return _collect_sources(start, futures, _ingestion_fallbacks(state, district, crop, season))
+
 class FeatureEngineer:
     """Create features from raw data sources."""
     
     @staticmethod
-    def engineer_features(state, district, crop, season):
+    def engineer_features(state, district, crop, season, fetched=None):
         """
         Aggregate all 7 data sources into ML-ready feature vector.
-        Returns: dict with all features
+        Sources are fetched concurrently; see fetch_sources_concurrently().
+        `fetched` is an already collected (data, report) pair, as used by
+        prepare_feature_batch().
+        Returns: dict with all features, plus an 'ingestion' report of
+        which sources were live and which were degraded
         """
         
         log_step("Feature Engineering - Start", "in_progress")
         
+        if fetched is None:
+            fetched = fetch_sources_concurrently(state, district, crop, season)
+        data, report = fetched
+        
         # 1. NDVI features (NASA MODIS)
-        ndvi_data = get_ndvi_data(district, crop, season)
-        ndvi_features = extract_ndvi_features(ndvi_data)
+        ndvi_features = extract_ndvi_features(data['ndvi'])
         
         # 2. Weather features (OpenWeather API)
-        weather_data = get_weather_data(state, district)
+        weather_data = data['weather']
         
         # 3. Soil moisture (NASA GLDAS)
-        soil_moisture_data = get_soil_moisture(district)
+        soil_moisture_data = data['soil_moisture']
         
         # 4. Static soil properties (NBSS&LUP)
-        soil_props = get_soil_data(district)
+        soil_props = data['soil']
         
         # 5. Pest incidents (State Agricultural Dept)
-        pest_data = get_pest_data(district, season)
+        pest_data = data['pest']
         
         # Combine all features
         features = {
@@ -59,18 +182,25 @@ class FeatureEngineer:
             
             # Categorical features
             'crop': crop,
-            'season': season
+            'season': season,
+            
+            # Source health
+            'ingestion': report
         }
         
-        log_step("Feature Engineering - Complete", "success")
+        if report['degraded']:
+            log_step("Feature Engineering - Complete", "success (degraded)",
+                     f"(fallback: {', '.join(report['degraded'])})")
+        else:
+            log_step("Feature Engineering - Complete", "success")
         return features
 
-def prepare_feature_vector(state, district, crop, season):
+def prepare_feature_vector(state, district, crop, season, fetched=None):
     """
     Prepare normalized feature vector for model input.
     """
     engineer = FeatureEngineer()
-    raw_features = engineer.engineer_features(state, district, crop, season)
+    raw_features = engineer.engineer_features(state, district, crop, season, fetched)
     
     # Normalize features to 0-1 range
     normalized_features = {
@@ -85,3 +215,76 @@ def prepare_feature_vector(state, district, crop, season):
     }
     
     return normalized_features, raw_features
+
+class FeatureContext:
+    """
+    Request-scoped feature snapshot.
+    
+    Ingestion runs once when the context is built; the ensemble prediction,
+    SHAP explanation and counterfactual stages all consume the same
+    features, so the explanation describes the prediction that was served.
+    """
+    
+    def __init__(self, state, district, crop, season, normalized_features, raw_features):
+        self.state = state
+        self.district = district
+        self.crop = crop
+        self.season = season
+        self.normalized_features = normalized_features
+        self.raw_features = raw_features
+        self.feature_matrix = build_feature_matrix([normalized_features])
+    
+    @classmethod
+    def build(cls, state, district, crop, season):
+        """Run ingestion and feature engineering once for a request."""
+        norm_features, raw_features = prepare_feature_vector(state, district, crop, season)
+        return cls(state, district, crop, season, norm_features, raw_features)
+
+def build_feature_context(state, district, crop, season):
+    """Public interface for request-scoped features."""
+    return FeatureContext.build(state, district, crop, season)
+
+def build_feature_matrix(normalized_features_list):
+    """Stack normalized feature dicts into an (N, 8) model input matrix."""
+    return np.array([
+        [norm_features[name] for name in FEATURE_NAMES]
+        for norm_features in normalized_features_list
+    ], dtype=float).reshape(-1, len(FEATURE_NAMES))
+
+def prepare_feature_batch(items):
+    """
+    Prepare normalized feature vectors for many requests.
+    
+    Args:
+        items: list of dicts with 'state', 'district', 'crop', 'season'
+    
+    Returns:
+        list aligned with items; each entry is either a
+        (normalized_features, raw_features) tuple or the exception raised
+        while preparing that item.
+    """
+    log_step("Batch Feature Preparation", "in_progress", f"({len(items)} items)")
+    
+    # Submit every item's fetches up front so the whole batch shares one
+    # round of source deadlines instead of paying them item by item
+    submitted = []
+    for item in items:
+        try:
+            submitted.append(_submit_sources(item['state'], item['district'], item['crop'], item['season']))
+        except Exception as e:
+            submitted.append(e)
+    
+    prepared = []
+    for item, pending in zip(items, submitted):
+        try:
+            if isinstance(pending, Exception):
+                raise pending
+            args = (item['state'], item['district'], item['crop'], item['season'])
+            fetched = _collect_sources(*pending, _ingestion_fallbacks(*args))
+            prepared.append(prepare_feature_vector(*args, fetched=fetched))
+        except Exception as e:
+            logger.warning(f"Feature preparation failed for {item}: {e}")
+            prepared.append(e)
+    
+    log_step("Batch Feature Preparation", "success")
+    return prepared
@@ -0,0 +1,201 @@
+"""
+Synthetic Training Data - Vectorised generators for the model trainers
+
+Draws whole columns at once from a seeded np.random.Generator, in place of
+per-sample loops of scalar np.random calls:
+- NDVI health category per row (healthy / stressed / critical)
+- Conditional uniform ranges picked per row from small bound tables
+- Interaction effects applied as boolean masks
+
+Two profiles reproduce the two trainers' distributions:
+- 'single': ModelTrainer (soil types 1-3 with moisture retention effects;
+  labels from LabelGenerator's rules, with noise from the same generator)
+- 'ensemble': EnsembleTrainer (soil types 1-5; labels drawn from
+  per-category failure rates)
+
+Large datasets are produced in chunks. Each chunk has its own child seed,
+so output is reproducible for a given (seed, chunk_size) and chunks can be
+streamed to disk without holding the full dataset in memory:
+    python -m backend.preprocessing.synthetic_data 1000000 data/stress ensemble
+"""
+
+import sys
+import time
+import numpy as np
+from numpy.lib.format import open_memmap
+from backend.utils.helpers import setup_logger, log_step, ensure_dir_exists
+
+logger = setup_logger(__name__)
+
+N_FEATURES = 8
+DEFAULT_SEED = 42
+DEFAULT_CHUNK_SIZE = 100_000
+
+# NDVI health categories: healthy, stressed, critical
+CATEGORY_PROBS = [0.65, 0.25, 0.10]
+
+# (low, high) per category
+NDVI_MEAN_RANGES = np.array([[0.55, 0.85], [0.3, 0.55], [0.15, 0.35]])
+SOIL_MOISTURE_BASE_RANGES = np.array([[0.5, 0.9], [0.3, 0.6], [0.1, 0.4]])
+PEST_FREQ_BASE_RANGES = np.array([[0.0, 0.4], [0.3, 0.7], [0.5, 0.95]])
+TEMP_ANOMALY_RANGES = np.array([[-2, 2], [-4, 5], [-8, 8]])
+
+# (low, high) by NDVI band: > 0.6, > 0.4, otherwise
+NDVI_TREND_RANGES = np.array([[-0.02, 0.05], [-0.05, 0.02], [-0.08, -0.01]])
+# (low, high) by NDVI band: > 0.6, otherwise
+NDVI_VARIANCE_RANGES = np.array([[0.01, 0.04], [0.04, 0.1]])
+# (low, high) by soil moisture band: > 0.6, > 0.3, otherwise
+RAINFALL_DEV_RANGES = np.array([[-15, 20], [-30, 10], [-50, -15]])
+
+# Ensemble profile: failure rate per category
+CATEGORY_FAILURE_RATES = np.array([0.05, 0.35, 0.75])
+
+
+def _uniform(rng, ranges, index):
+    """One uniform draw per row from ranges[index[row]] = (low, high)."""
+    low = ranges[index, 0]
+    high = ranges[index, 1]
+    return low + (high - low) * rng.random(len(index))
+
+
+def _band(values, thresholds):
+    """Index of the first threshold each value exceeds (len(thresholds) if none)."""
+    band = np.full(len(values), len(thresholds))
+    for i, threshold in reversed(list(enumerate(thresholds))):
+        band[values > threshold] = i
+    return band
+
+
+def _base_features(rng, n):
+    """Columns shared by both profiles, correlated through the NDVI category."""
+    category = rng.choice(3, size=n, p=CATEGORY_PROBS)
+    ndvi_mean = _uniform(rng, NDVI_MEAN_RANGES, category)
+    soil_moisture_base = _uniform(rng, SOIL_MOISTURE_BASE_RANGES, category)
+    pest_freq_base = _uniform(rng, PEST_FREQ_BASE_RANGES, category)
+
+    ndvi_trend = _uniform(rng, NDVI_TREND_RANGES, _band(ndvi_mean, [0.6, 0.4]))
+    ndvi_variance = _uniform(rng, NDVI_VARIANCE_RANGES, _band(ndvi_mean, [0.6]))
+    rainfall_dev = _uniform(rng, RAINFALL_DEV_RANGES, _band(soil_moisture_base, [0.6, 0.3]))
+    temp_anom = _uniform(rng, TEMP_ANOMALY_RANGES, category)
+
+    return category, ndvi_mean, soil_moisture_base, pest_freq_base, ndvi_trend, ndvi_variance, rainfall_dev, temp_anom
+
+
+def generate_single_model_chunk(rng, n):
+    """
+    ModelTrainer distribution: (n, 8) features and LabelGenerator labels,
+    whose noise is drawn from `rng` after the features.
+    """
+    from backend.preprocessing.labeling import LabelGenerator
+
+    (category, ndvi_mean, soil_moisture_base, pest_freq_base,
+     ndvi_trend, ndvi_variance, rainfall_dev, temp_anom) = _base_features(rng, n)
+
+    soil_moisture = np.clip(soil_moisture_base + rng.uniform(-0.1, 0.1, n), 0.1, 1.0)
+
+    # Soil type (1=sandy, 2=loamy, 3=clay) - affects moisture retention
+    soil_type = rng.choice([1, 2, 3], size=n, p=[0.25, 0.50, 0.25])
+    sandy = soil_type == 1
+    clay = soil_type == 3
+    soil_moisture[sandy] *= rng.uniform(0.7, 0.9, sandy.sum())
+    soil_moisture[clay] *= rng.uniform(1.0, 1.15, clay.sum())
+    soil_moisture = np.clip(soil_moisture, 0.1, 1.0)
+
+    pest_freq = np.clip(pest_freq_base + rng.uniform(-0.15, 0.15, n), 0.0, 1.0)
+
+    # High temperature increases pest activity
+    hot = temp_anom > 3
+    pest_freq[hot] = np.clip(pest_freq[hot] * 1.3, 0, 1)
+
+    # Low moisture worsens NDVI
+    dry = (soil_moisture < 0.3) & (ndvi_mean > 0.4)
+    ndvi_mean[dry] *= rng.uniform(0.7, 0.9, dry.sum())
+
+    X = np.column_stack([
+        ndvi_mean, ndvi_trend, ndvi_variance,
+        rainfall_dev, temp_anom,
+        soil_moisture, soil_type, pest_freq
+    ])
+    return X, LabelGenerator.generate_labels(X, rng=rng)
+
+
+def generate_ensemble_chunk(rng, n):
+    """
+    EnsembleTrainer distribution: (n, 8) features and labels drawn from
+    the per-category failure rates.
+    """
+    (category, ndvi_mean, soil_moisture_base, pest_freq_base,
+     ndvi_trend, ndvi_variance, rainfall_dev, temp_anom) = _base_features(rng, n)
+
+    soil_moisture = np.clip(soil_moisture_base + rng.uniform(-0.05, 0.05, n), 0.1, 0.95)
+    soil_type = rng.integers(1, 6, size=n)
+    pest_freq = np.clip(pest_freq_base + rng.uniform(-0.05, 0.05, n), 0.0, 1.0)
+
+    y = (rng.random(n) < CATEGORY_FAILURE_RATES[category]).astype(int)
+
+    X = np.column_stack([
+        ndvi_mean, ndvi_trend, ndvi_variance,
+        rainfall_dev, temp_anom,
+        soil_moisture, soil_type, pest_freq
+    ])
+    return X, y
+
+
+PROFILES = {
+    'single': generate_single_model_chunk,
+    'ensemble': generate_ensemble_chunk
+}
+
+
+def iter_training_chunks(n_samples, profile='ensemble', seed=DEFAULT_SEED, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (X, y) chunks totalling n_samples rows."""
+    generate = PROFILES[profile]
+    n_chunks = max(1, -(-n_samples // chunk_size))
+    for child, start in zip(np.random.SeedSequence(seed).spawn(n_chunks), range(0, n_samples, chunk_size)):
+        yield generate(np.random.default_rng(child), min(chunk_size, n_samples - start))
+
+
+def generate_training_data(n_samples, profile='ensemble', seed=DEFAULT_SEED, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generate a full in-memory dataset: (X, y), reproducible for a given seed."""
+    chunks = list(iter_training_chunks(n_samples, profile, seed, chunk_size))
+    X = np.concatenate([X for X, _ in chunks])
+    y = np.concatenate([y for _, y in chunks])
+    return X, y
+
+
+def write_training_data(path_prefix, n_samples, profile='ensemble', seed=DEFAULT_SEED,
+                        chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a dataset to `{path_prefix}_X.npy` and `{path_prefix}_y.npy`
+    one chunk at a time; memory use is bounded by chunk_size.
+
+    Returns:
+        (X_path, y_path)
+    """
+    ensure_dir_exists(path_prefix.rsplit('/', 1)[0] if '/' in path_prefix else '.')
+    X_path, y_path = f'{path_prefix}_X.npy', f'{path_prefix}_y.npy'
+    X_out = open_memmap(X_path, mode='w+', dtype=np.float64, shape=(n_samples, N_FEATURES))
+    y_out = open_memmap(y_path, mode='w+', dtype=np.int64, shape=(n_samples,))
+
+    log_step("Synthetic Data Export", "in_progress", f"({n_samples} rows, profile: {profile})")
+    start = 0
+    for X, y in iter_training_chunks(n_samples, profile, seed, chunk_size):
+        X_out[start:start + len(X)] = X
+        y_out[start:start + len(X)] = y
+        start += len(X)
+    X_out.flush()
+    y_out.flush()
+    del X_out, y_out
+
+    log_step("Synthetic Data Export", "success", f"({X_path}, {y_path})")
+    return X_path, y_path
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    prefix = sys.argv[2] if len(sys.argv) > 2 else 'data/synthetic'
+    profile = sys.argv[3] if len(sys.argv) > 3 else 'ensemble'
+
+    started = time.perf_counter()
+    write_training_data(prefix, n, profile=profile)
+    logger.info(f"Wrote {n} rows in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,101 @@
+"""
+Multi-Worker Serving - Pre-fork model loading for gunicorn
+
+Usage:
+    gunicorn -c backend/serving.py backend.app:app
+
+The master process imports the app and loads every model (ensemble,
+single RF, SHAP explainers, yield model, crop recommender) once, then
+forks the workers. Model memory is shared copy-on-write instead of being
+unpickled again in each worker:
+- Flattened tree arrays are read-only NumPy buffers, so no worker
+  writes to (and privately copies) their pages
+- gc.freeze() moves every preloaded object into the permanent generation
+  before forking, so garbage collection in a worker does not touch their
+  headers and dirty the shared pages
+
+If retraining changes an artifact on disk, each worker reloads it into its
+own memory through the model registry. Restart the server to share it
+again.
+
+Per-worker memory is read from /proc (Linux, see utils/memory.py) and
+served at /api/diagnostics/memory.
+"""
+
+import gc
+import os
+import time
+from backend.utils.memory import MASTER_PID_ENV, process_memory
+
+# gunicorn settings (overridable through the environment)
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+threads = int(os.getenv('WORKER_THREADS', '1'))
+timeout = int(os.getenv('WORKER_TIMEOUT', '120'))
+preload_app = True
+
+
+def preload_models():
+    """
+    Load every model artifact into this process. Training is never
+    triggered here: the ensemble, SHAP explainers and single model would
+    train on first use if their artifacts are missing, so they are skipped
+    with an error entry instead (train before starting the server). Missing
+    optional artifacts are skipped as well.
+
+    Returns:
+        {name: seconds or error message}
+    """
+    from backend.utils.config import MODEL_PATH
+    from backend.model.ensemble import ENSEMBLE_MODELS_PATH, get_ensemble_predictor
+    from backend.model.predict import get_model_predictor
+    from backend.model.shap_explainer import get_shap_explainer
+    from backend.model.registry import get_model_registry
+
+    timings = {}
+    # (name, loader, artifact that must exist so that loading does not train)
+    loaders = [
+        ('ensemble', get_ensemble_predictor, ENSEMBLE_MODELS_PATH),
+        ('single_model', get_model_predictor, MODEL_PATH),
+        ('shap_explainer', get_shap_explainer, ENSEMBLE_MODELS_PATH),
+        ('yield_model', lambda: get_model_registry().load_optional('backend/model/saved/yield_model.pkl'), None),
+        ('crop_recommender', lambda: get_model_registry().load_optional('backend/model/saved/crop_recommender.pkl'), None)
+    ]
+    for name, loader, required in loaders:
+        if required is not None and not os.path.exists(required):
+            timings[name] = f'failed: {required} not found (not trained in the master)'
+            continue
+        start = time.perf_counter()
+        try:
+            loader()
+            timings[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            timings[name] = f'failed: {e}'
+    return timings
+
+
+# gunicorn server hooks
+
+def when_ready(server):
+    """Master: load all models once, then freeze them out of the GC before forking."""
+    from backend.utils.helpers import log_step
+
+    log_step("Pre-fork Model Warm-up", "in_progress")
+    timings = preload_models()
+    server.log.info(f"Preloaded models: {timings}")
+
+    gc.collect()
+    gc.freeze()
+    os.environ[MASTER_PID_ENV] = str(os.getpid())
+
+    memory = process_memory()
+    log_step("Pre-fork Model Warm-up", "success", f"(master RSS {memory.get('vmrss_mb')} MB)")
+
+
+def post_worker_init(worker):
+    """Worker: log its memory right after fork."""
+    memory = process_memory()
+    worker.log.info(
+        f"Worker {worker.pid} ready: RSS {memory.get('vmrss_mb')} MB, "
+        f"private dirty {memory.get('private_dirty_mb')} MB"
+    )
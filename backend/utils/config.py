@@ -14,6 +14,97 @@ FEATURE_IMPORTANCE_PATH = 'backend/model/feature_importance.pkl'
 # Database paths
 DATA_DIR = 'data/'
 
+# Ingestion fan-out: per-source deadlines (seconds) before falling back to mock data
+INGESTION_DEADLINES = {
+    'ndvi': 3.0,
+    'weather': 6.0,  # Geocoding + current weather, each with a 5s HTTP timeout
+    'soil_moisture': 3.0,
+    'soil': 3.0,
+    'pest': 3.0
+}
+INGESTION_MAX_WORKERS = 32
+
+# Geocode cache: district coordinates persisted across restarts
+GEOCODE_CACHE_PATH = os.path.join(DATA_DIR, 'geocode_cache.sqlite3')
+GEOCODE_CACHE_SIZE = 1024
+GEOCODE_NEGATIVE_TTL = 24 * 3600  # District not found by the API
+GEOCODE_ERROR_TTL = 300  # Network/API error; retry sooner
+
+# Outbound HTTP: connection pooling, retries and per-host circuit breaker
+HTTP_POOL_SIZE = 20
+HTTP_MAX_RETRIES = 2
+HTTP_BACKOFF_BASE = 0.25  # seconds; doubled per attempt, with full jitter
+HTTP_BACKOFF_MAX = 2.0
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before failing fast
+CIRCUIT_RESET_TIMEOUT = 30  # seconds before a half-open trial request
+
+# Weather cache: bucket length and stale-while-revalidate window (seconds)
+CURRENT_WEATHER_TTL = 600  # Upstream refreshes current conditions ~every 10 min
+CURRENT_WEATHER_STALE_TTL = 300
+FORECAST_TTL = 3 * 3600  # Forecasts are published every 3 hours
+FORECAST_STALE_TTL = 3600
+WEATHER_CACHE_SIZE = 4096
+
+# Flattened tree evaluator: used for batches up to these sizes, beyond which
+# the native sklearn/XGBoost predict_proba is faster
+USE_FLAT_TREES = os.getenv('USE_FLAT_TREES', '1') == '1'
+FLAT_TREE_MAX_ROWS_RF = 128
+FLAT_TREE_MAX_ROWS_XGB = 8
+
+# Load the ensemble from the memory-mapped artifact bundle when one exists
+USE_ARTIFACT_BUNDLE = os.getenv('USE_ARTIFACT_BUNDLE', '1') == '1'
+
+# Which bundle the predictor serves: 'full' or 'compressed' (see compression.py)
+ENSEMBLE_VARIANT = os.getenv('ENSEMBLE_VARIANT', 'full')
+
+# Minimal counterfactual search: max candidates scored, wall-clock deadline and batch size
+COUNTERFACTUAL_SEARCH_BUDGET = 4096
+COUNTERFACTUAL_SEARCH_DEADLINE = 0.25  # seconds
+COUNTERFACTUAL_SEARCH_BATCH = 256
+
+# Startup: load lazy subsystems (SHAP, PDF export) and models in a background thread
+PREWARM_ON_STARTUP = os.getenv('PREWARM_ON_STARTUP', '0') == '1'
+
+# Ensemble training: process pool size for the K-fold pass (0 = one per CPU)
+# and XGBoost early stopping rounds per fold (0 = disabled)
+TRAINING_WORKERS = int(os.getenv('TRAINING_WORKERS', '0'))
+XGB_EARLY_STOPPING_ROUNDS = int(os.getenv('XGB_EARLY_STOPPING_ROUNDS', '0'))
+
+# Incremental retraining: trees/rounds added per refresh, RF size cap (oldest
+# trees are dropped beyond it) and the largest holdout AUC drop still promoted
+INCREMENTAL_RF_TREES = 50
+INCREMENTAL_XGB_ROUNDS = 50
+INCREMENTAL_MAX_RF_TREES = 600
+INCREMENTAL_MAX_AUC_DROP = 0.02
+
+# Hyperparameter search: resumable JSONL results and the AUC loss accepted for speed
+TUNING_PATH = 'backend/model/saved/tuning/'
+TUNING_MAX_AUC_DROP = 0.003
+
+# Model compression: largest holdout AUC drop accepted for a compressed ensemble
+COMPRESSION_MAX_AUC_DROP = 0.005
+
+# Sweep jobs: SQLite job/result store, scoring threads per process, items per chunk
+# and most results returned by one results page or stream call
+SWEEP_DB_PATH = os.path.join(DATA_DIR, 'jobs.sqlite3')
+SWEEP_WORKERS = int(os.getenv('SWEEP_WORKERS', '2'))
+SWEEP_CHUNK_SIZE = 250
+SWEEP_RESULTS_PAGE_MAX = 1000
+
+# Precomputed risk table: nightly build location, row freshness (a day plus
+# slack for the build itself) and how often the deployed model is re-checked
+RISK_TABLE_PATH = os.path.join(DATA_DIR, 'risk_table/')
+RISK_TABLE_TTL = 26 * 3600
+RISK_TABLE_KEEP_VERSIONS = 2
+RISK_TABLE_IDENTITY_RECHECK = 5.0  # seconds
+USE_RISK_TABLE = os.getenv('USE_RISK_TABLE', '1') == '1'
+
+# Explain/advisory response cache: LRU size and rounding of the normalized
+# features that form the cache key
+USE_RESPONSE_CACHE = os.getenv('USE_RESPONSE_CACHE', '1') == '1'
+RESPONSE_CACHE_SIZE = 2048
+RESPONSE_CACHE_DECIMALS = 3
+
 # District and crop mappings (Expanded with all major districts)
 STATES = {
     'Andhra Pradesh': ['Visakhapatnam', 'Vijayawada', 'Guntur', 'Nellore', 'Kurnool', 'Kadapa', 'Anantapur', 'Chittoor', 'Prakasam', 'East Godavari', 'West Godavari', 'Krishna', 'Srikakulam'],
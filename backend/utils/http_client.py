@@ -0,0 +1,210 @@
+"""
+Outbound HTTP Client - Pooled sessions, retries and circuit breaking
+
+All calls to external APIs (OpenWeather geocoding, current weather and
+forecasts) go through one shared client:
+- Keep-alive connection pooling via a single requests.Session
+- Bounded retries with full-jitter exponential backoff on connection
+  errors, timeouts and retryable status codes (429/5xx)
+- A per-host circuit breaker: after repeated failures the host is skipped
+  for a cool-down period and calls fail fast with CircuitOpenError, so
+  callers drop straight to their mock fallback instead of waiting out
+  the timeout
+- An optional per-thread deadline (see call_deadline) that clamps each
+  attempt's timeout and stops retrying once the caller's budget is spent,
+  so a slow host cannot hold a worker past the caller's deadline
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from backend.utils.config import (
+    HTTP_POOL_SIZE, HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+)
+from backend.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_deadline_state = threading.local()
+
+
+@contextmanager
+def call_deadline(deadline):
+    """
+    Bound every outbound call made by this thread until `deadline`
+    (a time.monotonic() value). Nested scopes keep the earlier deadline.
+    """
+    previous = getattr(_deadline_state, 'deadline', None)
+    _deadline_state.deadline = deadline if previous is None else min(deadline, previous)
+    try:
+        yield
+    finally:
+        _deadline_state.deadline = previous
+
+
+def _remaining_budget():
+    """Seconds left before this thread's call deadline, or None if unbounded."""
+    deadline = getattr(_deadline_state, 'deadline', None)
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open trial after a cool-down."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """True if a call may be attempted now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: let exactly one trial request through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """Shared outbound HTTP client with pooling, retries and per-host circuit breakers."""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES,
+                 backoff_base=HTTP_BACKOFF_BASE, backoff_max=HTTP_BACKOFF_MAX,
+                 failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, host):
+        """Circuit breaker for a host (created on first use)."""
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, params=None, timeout=5, retries=None):
+        """
+        GET with retries and circuit breaking.
+
+        Returns the final response (which may still carry a retryable
+        status code once retries are exhausted). Raises CircuitOpenError
+        if the host's circuit is open, or the last transport error.
+        Inside a call_deadline() scope each attempt's timeout is clamped to
+        the remaining budget, and requests.exceptions.Timeout is raised
+        once the budget is spent.
+        """
+        host = urlparse(url).netloc
+        breaker = self.breaker(host)
+        retries = self.max_retries if retries is None else retries
+
+        last_error = None
+        response = None
+        for attempt in range(retries + 1):
+            attempt_timeout = timeout
+            remaining = _remaining_budget()
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                attempt_timeout = min(timeout, remaining)
+
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {host}; skipping request")
+
+            try:
+                response = self.session.get(url, params=params, timeout=attempt_timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                last_error = e
+                response = None
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                last_error = None
+
+            if attempt < retries:
+                delay = self._backoff(attempt)
+                remaining = _remaining_budget()
+                if remaining is not None and delay >= remaining:
+                    break
+                logger.debug(f"Retrying {host} in {delay:.2f}s (attempt {attempt + 2}/{retries + 1})")
+                time.sleep(delay)
+
+        if last_error is not None:
+            raise last_error
+        if response is None:
+            raise requests.exceptions.Timeout(f"Call deadline exceeded before requesting {host}")
+        return response
+
+
+# Singleton instance
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Get or create singleton outbound HTTP client."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
@@ -0,0 +1,100 @@
+"""
+Process Memory - Per-process and per-worker memory from /proc
+
+Reads RSS and proportional set size (Pss) for this process and, when
+served by the pre-fork gunicorn config (backend/serving.py), for the
+master and each of its workers. Linux only; elsewhere the values are
+simply missing from the report.
+"""
+
+import os
+
+# Set by the gunicorn master (backend/serving.py) before forking workers
+MASTER_PID_ENV = 'SERVING_MASTER_PID'
+
+# /proc fields reported per process (values in kB)
+STATUS_FIELDS = ('VmRSS', 'RssAnon', 'RssFile', 'RssShmem')
+SMAPS_FIELDS = ('Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def _read_kb_fields(path, fields):
+    """Parse 'Name:   1234 kB' lines from a /proc file into {name: MB}."""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in fields:
+                    values[name] = int(rest.split()[0]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def process_memory(pid='self'):
+    """
+    Memory of one process in MB: RSS breakdown from /proc/<pid>/status and
+    proportional/shared/private totals from /proc/<pid>/smaps_rollup.
+    Pss splits shared pages between the processes mapping them, so summing
+    Pss across workers gives their real combined footprint.
+    """
+    memory = _read_kb_fields(f'/proc/{pid}/status', STATUS_FIELDS)
+    memory.update(_read_kb_fields(f'/proc/{pid}/smaps_rollup', SMAPS_FIELDS))
+    return {
+        name.lower() + '_mb': round(value, 1)
+        for name, value in memory.items()
+    }
+
+
+def _child_pids(parent_pid):
+    """PIDs of the processes whose parent is `parent_pid` (scans /proc)."""
+    children = []
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return children
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Fields after the parenthesised command name: state, ppid, ...
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == parent_pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return sorted(children)
+
+
+def memory_report():
+    """
+    Memory of this process and, when running under this config, of the
+    master and every sibling worker.
+    """
+    report = {
+        'pid': os.getpid(),
+        'current': process_memory()
+    }
+
+    master_pid = os.getenv(MASTER_PID_ENV)
+    if master_pid is None:
+        report['mode'] = 'single_process'
+        return report
+
+    master_pid = int(master_pid)
+    workers_memory = [
+        dict(pid=pid, **process_memory(pid)) for pid in _child_pids(master_pid)
+    ]
+    report.update({
+        'mode': 'prefork',
+        'master': dict(pid=master_pid, **process_memory(master_pid)),
+        'workers': workers_memory,
+        'totals': {
+            'workers': len(workers_memory),
+            'rss_mb': round(sum(w.get('vmrss_mb', 0) for w in workers_memory), 1),
+            'pss_mb': round(sum(w.get('pss_mb', 0) for w in workers_memory), 1)
+        }
+    })
+    return report
@@ -0,0 +1,172 @@
+"""
+Startup Diagnostics - Lazy subsystem pre-warming and import-time profiling
+
+The heavy subsystems (SHAP explainers, counterfactuals, PDF export) are
+imported on first use by their endpoints, so a worker can answer
+/api/health as soon as Flask is up. Setting PREWARM_ON_STARTUP=1 loads
+them (and the ensemble/SHAP models) in a background thread instead, so
+the first real request does not pay for it.
+
+import_time_profile() re-imports the app in a subprocess under
+`python -X importtime` and reports the slowest modules.
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from backend.utils.config import PREWARM_ON_STARTUP
+from backend.utils.helpers import setup_logger, log_step
+
+logger = setup_logger(__name__)
+
+# Imported lazily by the API; pre-warmed in this order
+LAZY_MODULES = [
+    'backend.model.counterfactual',
+    'backend.model.shap_explainer',
+    'shap',
+    'backend.utils.pdf_export'
+]
+
+# Model singletons built by the pre-warm thread after the imports
+PREWARM_LOADERS = [
+    ('ensemble', 'backend.model.ensemble', 'get_ensemble_predictor'),
+    ('shap_explainer', 'backend.model.shap_explainer', 'get_shap_explainer')
+]
+
+_prewarm_status = {'state': 'not_started', 'steps': {}}
+_prewarm_thread = None
+_prewarm_lock = threading.Lock()
+
+_import_profile = None
+_import_profile_lock = threading.Lock()
+
+
+def prewarm():
+    """Import the lazy subsystems and build model singletons, recording timings."""
+    _prewarm_status['state'] = 'running'
+    log_step("Subsystem Pre-warm", "in_progress")
+
+    for module in LAZY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+            _prewarm_status['steps'][module] = {'status': 'ok', 'seconds': time.perf_counter() - start}
+        except Exception as e:
+            logger.warning(f"Pre-warm import of {module} failed: {e}")
+            _prewarm_status['steps'][module] = {'status': 'failed', 'error': str(e)}
+
+    for name, module, getter in PREWARM_LOADERS:
+        start = time.perf_counter()
+        try:
+            getattr(importlib.import_module(module), getter)()
+            _prewarm_status['steps'][name] = {'status': 'ok', 'seconds': time.perf_counter() - start}
+        except Exception as e:
+            logger.warning(f"Pre-warm of {name} failed: {e}")
+            _prewarm_status['steps'][name] = {'status': 'failed', 'error': str(e)}
+
+    _prewarm_status['state'] = 'done'
+    log_step("Subsystem Pre-warm", "success")
+
+
+def start_prewarm_thread(enabled=PREWARM_ON_STARTUP):
+    """Start the background pre-warm once per process if enabled."""
+    global _prewarm_thread
+    if not enabled:
+        return None
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=prewarm, name='prewarm', daemon=True)
+            _prewarm_thread.start()
+    return _prewarm_thread
+
+
+def parse_importtime(output):
+    """
+    Parse `python -X importtime` stderr.
+
+    Returns:
+        list of {'module', 'self_us', 'cumulative_us', 'depth'} in import order
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            rows.append({
+                'module': name.strip(),
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(name) - len(name.lstrip())) // 2
+            })
+        except ValueError:
+            continue
+    return rows
+
+
+def import_time_profile(module='backend.app', top=25, refresh=False):
+    """
+    Import `module` in a fresh interpreter under -X importtime.
+
+    The result is cached for the life of the process (pass refresh=True to
+    re-run); the subprocess takes as long as a cold import.
+
+    Returns:
+        {
+            'module': str,
+            'total_seconds': float,
+            'slowest_cumulative': [...top N rows by cumulative time...],
+            'slowest_self': [...top N rows by self time...]
+        }
+    """
+    global _import_profile
+    with _import_profile_lock:
+        if _import_profile is not None and _import_profile['module'] == module and not refresh:
+            return _import_profile
+
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, PREWARM_ON_STARTUP='0')
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=root, env=env, capture_output=True, text=True, timeout=120
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed: {completed.stderr.strip().splitlines()[-1:]}")
+
+        rows = parse_importtime(completed.stderr)
+        total = next((row for row in rows if row['module'] == module), None)
+        _import_profile = {
+            'module': module,
+            'total_seconds': total['cumulative_us'] / 1e6 if total else None,
+            'slowest_cumulative': sorted(rows, key=lambda r: r['cumulative_us'], reverse=True)[:top],
+            'slowest_self': sorted(rows, key=lambda r: r['self_us'], reverse=True)[:top]
+        }
+        return _import_profile
+
+
+def startup_report(app_import_seconds=None, include_profile=False):
+    """Startup diagnostics: app import time, lazy module state, pre-warm progress."""
+    report = {
+        'pid': os.getpid(),
+        'app_import_seconds': app_import_seconds,
+        'lazy_modules_loaded': {module: module in sys.modules for module in LAZY_MODULES},
+        'prewarm': {
+            'enabled': PREWARM_ON_STARTUP,
+            'state': _prewarm_status['state'],
+            'steps': dict(_prewarm_status['steps'])
+        }
+    }
+    if include_profile:
+        report['import_profile'] = import_time_profile()
+    return report
+
+
+if __name__ == '__main__':
+    profile = import_time_profile()
+    print(f"{profile['module']}: {profile['total_seconds']:.2f}s")
+    for row in profile['slowest_cumulative']:
+        print(f"{row['cumulative_us'] / 1000:10.1f} ms  {'  ' * row['depth']}{row['module']}")
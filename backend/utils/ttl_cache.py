@@ -0,0 +1,128 @@
+"""
+Time-Bucketed TTL Cache - Shared upstream fetches for slowly-changing data
+
+Used for weather data, which upstream only refreshes every ~10 minutes
+(current conditions) or ~3 hours (forecasts):
+- Expiry is aligned to wall-clock buckets of `ttl` seconds, so every entry
+  for a product turns over together when upstream publishes new data
+- Stale-while-revalidate: for `stale_ttl` seconds after expiry the old
+  value is served immediately while one background refresh runs
+- Request coalescing: concurrent misses for the same key share a single
+  upstream fetch instead of each calling the API
+Failed fetches are never cached; the error propagates to the caller.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from backend.utils.config import WEATHER_CACHE_SIZE
+from backend.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def bucket_expiry(now, ttl):
+    """End of the wall-clock bucket of length `ttl` containing `now`."""
+    return (int(now // ttl) + 1) * ttl
+
+
+class TimeBucketCache:
+    """Thread-safe TTL cache with bucket-aligned expiry, stale-while-revalidate and coalescing."""
+
+    def __init__(self, max_entries=4096, refresh_workers=4):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._inflight = {}  # key -> Future shared by concurrent callers
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='cache-refresh')
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def get_or_fetch(self, key, fetch, ttl, stale_ttl=0):
+        """
+        Return the cached value for `key`, calling `fetch()` on a miss.
+
+        Args:
+            key: Hashable cache key, e.g. (lat, lon, product)
+            fetch: Zero-argument callable returning the fresh value
+            ttl: Bucket length in seconds
+            stale_ttl: Seconds past expiry during which the old value is
+                served while a background refresh runs
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                if now < expires_at + stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        future = Future()
+                        self._inflight[key] = future
+                        self._refresh_pool.submit(self._run_fetch, key, fetch, ttl, future)
+                    return value
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if owner:
+            self._run_fetch(key, fetch, ttl, future)
+        return future.result()
+
+    def _run_fetch(self, key, fetch, ttl, future):
+        """Fetch a value, store it, and resolve everyone waiting on `future`."""
+        try:
+            value = fetch()
+        except Exception as e:
+            logger.debug(f"Cache fetch failed for {key}: {e}")
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = (value, bucket_expiry(time.time(), ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything if `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# Singleton instance
+_weather_cache = None
+_weather_cache_lock = threading.Lock()
+
+
+def get_weather_cache():
+    """Get or create singleton cache shared by current-weather and forecast lookups."""
+    global _weather_cache
+    if _weather_cache is None:
+        with _weather_cache_lock:
+            if _weather_cache is None:
+                _weather_cache = TimeBucketCache(max_entries=WEATHER_CACHE_SIZE)
+    return _weather_cache
+
+
+def weather_cache_key(lat, lon, product):
+    """Cache key for a weather product at a location (~10m coordinate precision)."""
+    return (round(float(lat), 4), round(float(lon), 4), product)
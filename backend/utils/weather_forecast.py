@@ -3,76 +3,86 @@ Weather Forecast Integration
 Fetches 7-day weather forecast and predicts risk for each day
 """
 import os
-import requests
 from datetime import datetime, timedelta
+from backend.ingestion.openweather import OpenWeatherIngestion
+from backend.utils.config import FORECAST_TTL, FORECAST_STALE_TTL
+from backend.utils.http_client import get_http_client
+from backend.utils.ttl_cache import get_weather_cache, weather_cache_key
+
+# Used when a district cannot be geocoded (Bengaluru)
+DEFAULT_COORDINATES = (12.9716, 77.5946)
 
 def get_7day_forecast(state, district):
     """Get 7-day weather forecast for a location"""
     api_key = os.getenv('OPENWEATHER_API_KEY', 'YOUR_API_KEY')
     
-    # District coordinates (sample - expand as needed)
-    coordinates = {
-        'Bengaluru Urban': (12.9716, 77.5946),
-        'Mysuru': (12.2958, 76.6394),
-        'Pune': (18.5204, 73.8567),
-        'Mumbai': (19.0760, 72.8777),
-        'Delhi': (28.7041, 77.1025),
-    }
-    
-    lat, lon = coordinates.get(district, (12.9716, 77.5946))
+    # District coordinates from the shared geocode cache
+    lat, lon = OpenWeatherIngestion().geocode(state, district)
+    if lat is None or lon is None:
+        lat, lon = DEFAULT_COORDINATES
     
     try:
-        url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-        response = requests.get(url, timeout=5)
-        data = response.json()
-        
-        # Process forecast data (API returns 3-hour intervals for 5 days)
-        daily_forecasts = []
-        current_date = None
-        day_data = {'temp_sum': 0, 'temp_count': 0, 'rain_sum': 0, 'humidity_sum': 0, 'humidity_count': 0}
-        
-        for item in data.get('list', []):
-            date = datetime.fromtimestamp(item['dt']).date()
-            
-            if current_date != date:
-                if current_date is not None:
-                    # Calculate averages for previous day
-                    avg_temp = day_data['temp_sum'] / day_data['temp_count']
-                    avg_humidity = day_data['humidity_sum'] / day_data['humidity_count']
-                    
-                    daily_forecasts.append({
-                        'date': current_date.strftime('%Y-%m-%d'),
-                        'temperature': round(avg_temp, 1),
-                        'rainfall': round(day_data['rain_sum'], 1),
-                        'humidity': round(avg_humidity, 1),
-                        'description': day_data.get('description', 'Clear')
-                    })
-                
-                # Reset for new day
-                current_date = date
-                day_data = {
-                    'temp_sum': 0,
-                    'temp_count': 0,
-                    'rain_sum': 0,
-                    'humidity_sum': 0,
-                    'humidity_count': 0,
-                    'description': item['weather'][0]['description']
-                }
-            
-            # Accumulate data
-            day_data['temp_sum'] += item['main']['temp']
-            day_data['temp_count'] += 1
-            day_data['humidity_sum'] += item['main']['humidity']
-            day_data['humidity_count'] += 1
-            day_data['rain_sum'] += item.get('rain', {}).get('3h', 0)
-        
-        return daily_forecasts[:7]  # Return 7 days
+        return get_weather_cache().get_or_fetch(
+            weather_cache_key(lat, lon, 'forecast'),
+            lambda: _fetch_forecast(lat, lon, api_key),
+            ttl=FORECAST_TTL,
+            stale_ttl=FORECAST_STALE_TTL
+        )
         
     except Exception as e:
         print(f"Error fetching forecast: {str(e)}")
         # Return dummy data for demonstration
         return generate_dummy_forecast()
 
+def _fetch_forecast(lat, lon, api_key):
+    """Fetch and aggregate the 5-day/3-hour forecast into daily values; raises on failure."""
+    url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={api_key}&units=metric"
+    response = get_http_client().get(url, timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    
+    # Process forecast data (API returns 3-hour intervals for 5 days)
+    daily_forecasts = []
+    current_date = None
+    day_data = {'temp_sum': 0, 'temp_count': 0, 'rain_sum': 0, 'humidity_sum': 0, 'humidity_count': 0}
+    
+    for item in data.get('list', []):
+        date = datetime.fromtimestamp(item['dt']).date()
+        
+        if current_date != date:
+            if current_date is not None:
+                # Calculate averages for previous day
+                avg_temp = day_data['temp_sum'] / day_data['temp_count']
+                avg_humidity = day_data['humidity_sum'] / day_data['humidity_count']
+                
+                daily_forecasts.append({
+                    'date': current_date.strftime('%Y-%m-%d'),
+                    'temperature': round(avg_temp, 1),
+                    'rainfall': round(day_data['rain_sum'], 1),
+                    'humidity': round(avg_humidity, 1),
+                    'description': day_data.get('description', 'Clear')
+                })
+            
+            # Reset for new day
+            current_date = date
+            day_data = {
+                'temp_sum': 0,
+                'temp_count': 0,
+                'rain_sum': 0,
+                'humidity_sum': 0,
+                'humidity_count': 0,
+                'description': item['weather'][0]['description']
+            }
+        
+        # Accumulate data
+        day_data['temp_sum'] += item['main']['temp']
+        day_data['temp_count'] += 1
+        day_data['humidity_sum'] += item['main']['humidity']
+        day_data['humidity_count'] += 1
+        day_data['rain_sum'] += item.get('rain', {}).get('3h', 0)
+    
+    return daily_forecasts[:7]  # Return 7 days
+
 def generate_dummy_forecast():
     """Generate dummy forecast data for testing"""
     forecasts = []
@@ -92,10 +102,10 @@ def generate_dummy_forecast():
 
 def predict_daily_risks(forecast_data, current_ndvi, current_soil_moisture, pest_frequency):
     """Predict risk for each forecasted day"""
-    from backend.model.predict import ModelPredictor
+    from backend.model.predict import get_model_predictor
     import numpy as np
     
-    predictor = ModelPredictor()
+    predictor = get_model_predictor()
     model = predictor.model
     scaler = predictor.scaler
     daily_risks = []